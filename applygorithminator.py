@@ -1,12 +1,27 @@
-import openai
 import os
 import sys
 import time
 import json
 import argparse
 import re
+import itertools
+import difflib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from config import OPENAI_API_KEY
+from utils.config import OPENAI_API_KEY, OPENAI_MAX_TOKENS, API_HEALTH_TTL_SECONDS, METRICS_TEXTFILE
+from utils.health_check import cached_health_check
+from utils.token_budget import pack_stories, count_tokens
+from utils.speculation import SpeculativeTask, SpeculationStats
+from utils.intent_classifier import classify_intent, evaluate, EVALUATION_SAMPLES
+from utils.text_parsing import format_dict_list
+from utils.skill_index import canonical_skill
+from memory.conversation import ConversationMemory
+from utils.profiling import span, traced, enable_profiling, finish_profiling, default_trace_file
+from utils.metrics import llm_call, llm_tokens, write_textfile, registry
+from utils.resume_sections import PROMPT_SECTIONS, parse_resume_sections, find_section, splice_section
+from utils.resume_edits import EDIT_OPS_INSTRUCTION, EditError, apply_edits, parse_edit_response
+from utils.hedging import hedging_enabled, hedged_call
 
 def show_thinking(message="Processing", thinking_messages=None):
     """Show a thinking indicator with rotating messages"""
@@ -40,14 +55,54 @@ def show_thinking(message="Processing", thinking_messages=None):
         i = (i + 1) % len(spinner)
         yield
 
+CUSTOMIZATION_MODEL = "gpt-4-turbo-preview"
+CUSTOMIZATION_SYSTEM_PROMPT = "You are a professional resume writer and ATS optimization expert."
+REFINEMENT_INSTRUCTION = "Apply the user's refinement below to the current resume and return the full updated resume."
+# What each of the Prompt #8 variants emphasizes, so the concurrent requests diverge
+VARIANT_FOCUSES = [
+    "technical depth, tools and hands-on delivery",
+    "leadership, collaboration and people impact",
+    "business outcomes, metrics and domain expertise",
+]
+
+edit_ops_results = registry.counter("applygorithminator_edit_ops_total",
+                                    "Customization steps answered as edit operations, by whether they applied", ("result",))
+
+def _usage_value(obj, name):
+    """Read a usage field from either an SDK object or a plain dict (older SDKs keep unknown fields as dicts)"""
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
 class Applygorithminator:
     def __init__(self):
-        self.client = openai.OpenAI(api_key=OPENAI_API_KEY)
+        self._client = None
         self.resumes_dir = "resources/resumes"
         self.job_descriptions_dir = "resources/job_descriptions"
         self.stories_dir = "resources/stories"
         self.prompts = self._load_prompts()
+        self.usage_log = []
+        self._static_context_cache = {}
+        # Tags usage entries recorded on speculative threads so their tokens can be attributed
+        self._usage_context = threading.local()
+        self._speculation_ids = itertools.count(1)
+        # How user replies were classified (locally or by the LLM) and the time spent on each
+        self.intent_stats = {"local": 0, "llm": 0, "local_seconds": 0.0, "llm_seconds": 0.0}
         
+    @property
+    def client(self):
+        """The OpenAI client, created (and the SDK imported) on first use so --cleanup etc. start fast"""
+        if self._client is None:
+            import openai
+            self._client = openai.OpenAI(api_key=OPENAI_API_KEY)
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
+
     def _load_prompts(self):
         """Load prompts from prompts.txt"""
         prompts = {}
@@ -74,6 +129,7 @@ class Applygorithminator:
             print("Warning: prompts.txt not found. Using default prompts.")
             return {}
 
+    @traced("stories:read")
     def _load_stories(self):
         """Load existing stories from JSON file"""
         stories_file = os.path.join(self.stories_dir, "stories.json")
@@ -82,6 +138,19 @@ class Applygorithminator:
                 return json.load(f)
         return {"stories": []}
 
+    def _stories_context(self, fixed_parts, relevance_text):
+        """Format relevant stories, packed to fit the customization model's context budget"""
+        stories = self._load_stories()
+        relevant_stories = [s for s in stories["stories"] if s["has_experience"]]
+        packed, report = pack_stories(relevant_stories, CUSTOMIZATION_MODEL, fixed_parts,
+                                      max_output_tokens=OPENAI_MAX_TOKENS, relevance_text=relevance_text)
+        if report["dropped"] or report["summarized"]:
+            print(f"\n(Trimmed stories to fit the prompt: summarized {len(report['summarized'])}, dropped {len(report['dropped'])})")
+        if not packed:
+            return relevant_stories, ""
+        return relevant_stories, format_dict_list(packed, ["skill", "story"], section_title="Additional Experience Stories")
+
+    @traced("stories:write")
     def _save_stories(self, stories):
         """Save stories to JSON file"""
         stories_file = os.path.join(self.stories_dir, "stories.json")
@@ -99,6 +168,7 @@ class Applygorithminator:
         })
         self._save_stories(stories)
     
+    @traced("save_resume")
     def save_resume(self, resume_text, is_original=True):
         """Save resume text to a file"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -122,10 +192,20 @@ class Applygorithminator:
     
     def read_file(self, filepath):
         """Read content from a file"""
-        with open(filepath, "r") as f:
+        with span("read_file", path=filepath), open(filepath, "r") as f:
             return f.read()
     
-    def test_api_connection(self):
+    def test_api_connection(self, ttl_seconds=API_HEALTH_TTL_SECONDS):
+        """
+        Test the OpenAI API connection, reusing a successful result younger than ttl_seconds
+        instead of paying for a round trip on every start
+        """
+        healthy, from_cache = cached_health_check(self._check_api_connection, OPENAI_API_KEY, ttl_seconds)
+        if from_cache:
+            print("✅ API connection verified recently (cached)")
+        return healthy
+
+    def _check_api_connection(self):
         """
         Test the OpenAI API connection with a simple prompt
         """
@@ -150,16 +230,10 @@ class Applygorithminator:
         Analyze if the combined resume and stories are a good fit for the job description and generate behavioral questions for true gaps only.
         """
         try:
-            # Load all existing stories with has_experience=True
-            stories = self._load_stories()
-            relevant_stories = [s for s in stories["stories"] if s["has_experience"]]
-            
-            # Combine resume and stories as the candidate's total experience
-            stories_context = ""
-            if relevant_stories:
-                stories_context = "\nAdditional Experience Stories:\n"
-                for story in relevant_stories:
-                    stories_context += f"\nSkill: {story['skill']}\nStory: {story['story']}\n"
+            # Load existing stories with has_experience=True, packed to the context budget
+            with span("prompt:analyze_fit"):
+                relevant_stories, stories_context = self._stories_context(
+                    {"resume": resume_text, "job_description": job_description}, job_description)
             
             combined_experience = f"Resume:\n{resume_text}\n{stories_context}"
             
@@ -188,45 +262,32 @@ class Applygorithminator:
             print("Response:")
             
             # Use streaming API for analysis
-            stream = self.client.chat.completions.create(
-                model="gpt-4-turbo-preview",
-                messages=[
-                    {"role": "system", "content": "You are a professional career advisor and job matching expert."},
-                    {"role": "user", "content": analysis_prompt}
-                ],
-                stream=True
-            )
-            
-            # Collect the full response while showing it in real-time
-            full_response = ""
-            for chunk in stream:
-                if chunk.choices[0].delta.content is not None:
-                    content = chunk.choices[0].delta.content
-                    print(content, end="", flush=True)
-                    full_response += content
-            
-            print("\n")  # Add a newline after the response
+            full_response = self._stream_completion([
+                {"role": "system", "content": "You are a professional career advisor and job matching expert."},
+                {"role": "user", "content": analysis_prompt}
+            ], "analyze_fit")
             
             # Extract gaps and questions from the response
-            gaps_section = full_response.split("GAPS:")[1] if "GAPS:" in full_response else ""
-            gaps = []
-            current_gap = None
-            
-            for line in gaps_section.split("\n"):
-                line = line.strip()
-                if line and not line.startswith("["):
-                    if "Tell me about a time" in line:
-                        if current_gap:
-                            gaps.append((current_gap, line))
-                    else:
-                        current_gap = line
+            with span("parse_gaps"):
+                gaps_section = full_response.split("GAPS:")[1] if "GAPS:" in full_response else ""
+                gaps = []
+                current_gap = None
+
+                for line in gaps_section.split("\n"):
+                    line = line.strip()
+                    if line and not line.startswith("["):
+                        if "Tell me about a time" in line:
+                            if current_gap:
+                                gaps.append((current_gap, line))
+                        else:
+                            current_gap = line
             
             # Only prompt for new stories for gaps not already covered by stories
-            existing_skills = set(s["skill"].strip().lower() for s in relevant_stories)
+            existing_skills = set(canonical_skill(s["skill"]) for s in relevant_stories)
             if gaps:
                 print("\nLet's collect some stories to help strengthen your resume:")
                 for skill, question in gaps:
-                    skill_key = skill.strip().lower()
+                    skill_key = canonical_skill(skill)
                     if skill_key in existing_skills:
                         print(f"\n[Already have a story for: {skill}] Skipping.")
                         continue
@@ -246,65 +307,321 @@ class Applygorithminator:
             print(f"\nAn error occurred: {str(e)}")
             return None
 
-    def apply_prompt(self, resume_text, job_description, prompt_number):
+    def _stream_completion(self, messages, label, echo=True, cancel_event=None):
+        """
+        Stream a chat completion, echoing it as it arrives, and record the token usage
+        (including provider-cached prompt tokens) reported in the final chunk.
+        Setting cancel_event stops reading and closes the stream; the usage is then estimated.
+        """
+        with span(f"llm:{label}", "llm", model=CUSTOMIZATION_MODEL), llm_call("customize", CUSTOMIZATION_MODEL):
+            return self._read_stream(messages, label, echo, cancel_event)
+
+    def _read_stream(self, messages, label, echo, cancel_event):
+        stream = self.client.chat.completions.create(
+            model=CUSTOMIZATION_MODEL,
+            messages=messages,
+            stream=True,
+            extra_body={"stream_options": {"include_usage": True}}
+        )
+        full_response = ""
+        usage = None
+        for chunk in stream:
+            if cancel_event is not None and cancel_event.is_set():
+                stream.close()
+                prompt_text = "".join(m["content"] for m in messages)
+                self._record_usage(label, {"prompt_tokens": count_tokens(prompt_text, CUSTOMIZATION_MODEL),
+                                           "completion_tokens": count_tokens(full_response, CUSTOMIZATION_MODEL)},
+                                   echo, estimated=True)
+                return full_response
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+            # The usage chunk arrives last and carries no choices
+            if chunk.choices and chunk.choices[0].delta.content is not None:
+                content = chunk.choices[0].delta.content
+                if echo:
+                    print(content, end="", flush=True)
+                full_response += content
+        if echo:
+            print("\n")  # Add a newline after the response
+        self._record_usage(label, usage, echo)
+        return full_response
+
+    def _record_usage(self, label, usage, echo=True, estimated=False):
+        """Keep per-call token counts so prompt caching of the shared prefix can be verified"""
+        if usage is None:
+            return
+        details = _usage_value(usage, "prompt_tokens_details")
+        entry = {
+            "label": label,
+            "prompt_tokens": _usage_value(usage, "prompt_tokens") or 0,
+            "cached_tokens": _usage_value(details, "cached_tokens") or 0,
+            "completion_tokens": _usage_value(usage, "completion_tokens") or 0,
+            "estimated": estimated,
+            "tag": getattr(self._usage_context, "tag", None),
+        }
+        self.usage_log.append(entry)
+        for kind in ("prompt", "completion"):
+            llm_tokens.inc(entry[f"{kind}_tokens"], chain="customize", model=CUSTOMIZATION_MODEL, kind=kind)
+        llm_tokens.inc(entry["cached_tokens"], chain="customize", model=CUSTOMIZATION_MODEL, kind="cached_prompt")
+        if echo:
+            print(f"(tokens: prompt {entry['prompt_tokens']}, cached {entry['cached_tokens']}, completion {entry['completion_tokens']})")
+
+    def usage_summary(self):
+        """Totals over the session, including the share of prompt tokens served from the provider cache"""
+        prompt_tokens = sum(e["prompt_tokens"] for e in self.usage_log)
+        cached_tokens = sum(e["cached_tokens"] for e in self.usage_log)
+        return {
+            "calls": len(self.usage_log),
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "completion_tokens": sum(e["completion_tokens"] for e in self.usage_log),
+            "cached_ratio": cached_tokens / prompt_tokens if prompt_tokens else 0.0,
+        }
+
+    def speculate(self, fn):
+        """
+        Start fn(cancel_event) in the background; usage recorded while it runs is tagged
+        with the task's tag so discarded work can be counted
+        """
+        tag = f"speculative-{next(self._speculation_ids)}"
+
+        def run(cancel_event):
+            self._usage_context.tag = tag
+            try:
+                return fn(cancel_event)
+            finally:
+                self._usage_context.tag = None
+
+        task = SpeculativeTask(run)
+        task.tag = tag
+        return task
+
+    def tokens_for_tag(self, tag):
+        return sum(e["prompt_tokens"] + e["completion_tokens"] for e in self.usage_log if e["tag"] == tag)
+
+    @traced("prompt:static_context")
+    def _static_context_messages(self, original_resume, job_description, include_resume=True):
+        """
+        Build (once per resume/JD pair) the messages every customization step starts with.
+        They must stay byte-identical across steps so the provider can cache the prefix,
+        which is why the stories are packed against the job description only.
+        Section-scoped steps leave the resume out and send just the section they rewrite.
+        """
+        key = (original_resume, job_description, include_resume)
+        if key not in self._static_context_cache:
+            _, stories_context = self._stories_context(
+                # The current resume sent in each step is roughly the size of the original
+                {"resume": original_resume, "current_resume": original_resume, "job_description": job_description},
+                job_description)
+            static_context = f"Job Description:\n{job_description}\n{stories_context}"
+            if include_resume:
+                static_context += f"\nOriginal Resume:\n{original_resume}"
+            self._static_context_cache[key] = [
+                {"role": "system", "content": CUSTOMIZATION_SYSTEM_PROMPT},
+                {"role": "user", "content": static_context},
+            ]
+        return self._static_context_cache[key]
+
+    def _section_for_prompt(self, resume_text, prompt_number):
+        """Return the resume section a prompt rewrites, or None if it needs the whole resume"""
+        key = PROMPT_SECTIONS.get(prompt_number)
+        if key is None:
+            return None
+        return find_section(parse_resume_sections(resume_text), key)
+
+    def apply_prompt(self, resume_text, job_description, prompt_number, refinement=None, original_resume=None,
+                     section_scoped=False, echo=True, cancel_event=None, edit_ops=False):
         """
-        Apply a specific prompt to customize the resume
+        Apply a specific prompt to customize the resume.
+        The static context (system message, JD, stories, original resume) comes first and the
+        per-step instruction last, so consecutive steps share a cacheable prompt prefix.
+        With section_scoped, prompts that target one section (see PROMPT_SECTIONS) only send
+        and rewrite that section, which is spliced back into the resume locally.
+        With edit_ops, the model returns edit operations that are applied locally; if they
+        don't apply cleanly the step falls back to a rewrite.
         """
         try:
             prompt = self.prompts.get(f"Prompt #{prompt_number}")
             if not prompt:
                 return None, "Prompt not found"
             
-            # Load existing stories
-            stories = self._load_stories()
-            relevant_stories = [s for s in stories["stories"] if s["has_experience"]]
-            
-            # Add stories to the prompt if available
-            stories_context = ""
-            if relevant_stories:
-                stories_context = "\nAdditional Experience Stories:\n"
-                for story in relevant_stories:
-                    stories_context += f"\nSkill: {story['skill']}\nStory: {story['story']}\n"
-            
-            full_prompt = f"""
-            {prompt}
+            original_resume = original_resume or resume_text
+            if edit_ops:
+                edited = self._apply_edit_ops(resume_text, job_description, prompt_number, prompt, refinement,
+                                              original_resume, echo, cancel_event)
+                if edited is not None:
+                    return edited, None
+                if cancel_event is not None and cancel_event.is_set():
+                    return None, "Cancelled"
+            section = self._section_for_prompt(resume_text, prompt_number) if section_scoped else None
+            if section is not None:
+                return self._apply_section_prompt(resume_text, job_description, prompt_number, prompt, section,
+                                                  refinement, original_resume, echo, cancel_event)
+            messages = self._full_resume_messages(resume_text, job_description, prompt, refinement, original_resume)
             
-            Resume:
-            {resume_text}
-            
-            Job Description:
-            {job_description}
-            {stories_context}
-            """
-            
-            print("\nApplying customization...")
-            print("Response:")
+            if echo:
+                print("\nApplying customization...")
+                print("Response:")
             
             # Use streaming API
-            stream = self.client.chat.completions.create(
-                model="gpt-4-turbo-preview",
-                messages=[
-                    {"role": "system", "content": "You are a professional resume writer and ATS optimization expert."},
-                    {"role": "user", "content": full_prompt}
-                ],
-                stream=True
-            )
-            
-            # Collect the full response while showing it in real-time
-            full_response = ""
-            for chunk in stream:
-                if chunk.choices[0].delta.content is not None:
-                    content = chunk.choices[0].delta.content
-                    print(content, end="", flush=True)
-                    full_response += content
-            
-            print("\n")  # Add a newline after the response
+            full_response = self._stream_completion(messages, f"Prompt #{prompt_number}", echo, cancel_event)
             return full_response, None
             
         except Exception as e:
             print(f"\nAn error occurred: {str(e)}")
             return None, str(e)
 
+    def _apply_edit_ops(self, resume_text, job_description, prompt_number, prompt, refinement, original_resume,
+                        echo=True, cancel_event=None):
+        """Ask for edit operations and apply them to the current resume; None means fall back to a rewrite"""
+        messages = self._full_resume_messages(resume_text, job_description, f"{prompt}\n\n{EDIT_OPS_INSTRUCTION}",
+                                              refinement, original_resume)
+        if echo:
+            print("\nApplying customization as edits...")
+        response = self._stream_completion(messages, f"Prompt #{prompt_number} (edits)", False, cancel_event)
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+        try:
+            with span("apply_edits"):
+                edited, notes = apply_edits(resume_text, parse_edit_response(response))
+        except EditError as e:
+            edit_ops_results.inc(result="fallback")
+            if echo:
+                print(f"(The edits didn't apply cleanly: {e}. Falling back to a full rewrite.)")
+            return None
+        edit_ops_results.inc(result="applied")
+        if echo:
+            print("\n".join(f"  {note}" for note in notes) or "  (no changes)")
+            print(f"\n{edited}\n")
+        return edited
+
+    @traced("prompt:full_resume")
+    def _full_resume_messages(self, resume_text, job_description, instruction, refinement, original_resume):
+        """Shared static prefix followed by the current resume and the step's instruction"""
+        messages = list(self._static_context_messages(original_resume, job_description))
+        if resume_text == original_resume:
+            step_prompt = "Current Resume: unchanged from the original resume above."
+        else:
+            step_prompt = f"Current Resume:\n{resume_text}"
+        step_prompt += f"\n\nInstruction:\n{instruction}"
+        if refinement:
+            step_prompt += f"\n\n[User refinement/additional info:]\n{refinement}"
+        messages.append({"role": "user", "content": step_prompt})
+        return messages
+
+    def refine_resume(self, resume_text, job_description, refinement, original_resume=None):
+        """Apply a free-form user refinement to a whole resume draft"""
+        try:
+            original_resume = original_resume or resume_text
+            messages = self._full_resume_messages(resume_text, job_description, REFINEMENT_INSTRUCTION, refinement,
+                                                  original_resume)
+            print("\nApplying refinement...")
+            print("Response:")
+            return self._stream_completion(messages, "refinement"), None
+        except Exception as e:
+            print(f"\nAn error occurred: {str(e)}")
+            return None, str(e)
+
+    def parallel_section_prompts(self, resume_text, prompt_numbers):
+        """The prompts that can run concurrently: those whose target section exists in the resume"""
+        return [n for n in prompt_numbers
+                if f"Prompt #{n}" in self.prompts and self._section_for_prompt(resume_text, n) is not None]
+
+    def apply_section_prompts_parallel(self, resume_text, job_description, prompt_numbers, original_resume=None,
+                                       max_workers=4):
+        """
+        Run section-scoped prompts concurrently and merge their sections into one draft.
+        Prompts that target the same section (e.g. #3 titles and #4 bullets) run in order
+        within one worker so they don't overwrite each other.
+        Returns (merged resume, list of error messages).
+        """
+        original_resume = original_resume or resume_text
+        groups = {}
+        for prompt_number in prompt_numbers:
+            groups.setdefault(PROMPT_SECTIONS[prompt_number], []).append(prompt_number)
+        # Build the shared prefix once up front instead of racing to build it in every worker
+        self._static_context_messages(original_resume, job_description, include_resume=False)
+
+        def run_group(numbers):
+            working = resume_text
+            for prompt_number in numbers:
+                section = self._section_for_prompt(working, prompt_number)
+                if section is None:
+                    raise ValueError(f"no {PROMPT_SECTIONS[prompt_number]} section in the current resume")
+                prompt = self.prompts[f"Prompt #{prompt_number}"]
+                working, _ = self._apply_section_prompt(working, job_description, prompt_number, prompt, section,
+                                                        None, original_resume, echo=False)
+            return working
+
+        print(f"\nApplying {', '.join(f'Prompt #{n}' for n in prompt_numbers)} in parallel...")
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {key: pool.submit(run_group, numbers) for key, numbers in groups.items()}
+        merged = resume_text
+        errors = []
+        for key, future in futures.items():
+            try:
+                working = future.result()
+            except Exception as e:
+                errors.append(f"{key}: {e}")
+                continue
+            # Offsets shift after each splice, so locate the section afresh in the merged text
+            section = find_section(parse_resume_sections(working), key)
+            target = find_section(parse_resume_sections(merged), key)
+            if section is not None and target is not None:
+                merged = splice_section(merged, target, section["body"])
+        return merged, errors
+
+    def generate_variants(self, resume_text, job_description, prompt_number, refinement=None, original_resume=None,
+                          focuses=VARIANT_FOCUSES):
+        """Generate the resume versions Prompt #8 asks for as concurrent requests, one per focus"""
+        try:
+            prompt = self.prompts.get(f"Prompt #{prompt_number}")
+            if not prompt:
+                return None, "Prompt not found"
+            original_resume = original_resume or resume_text
+            self._static_context_messages(original_resume, job_description)
+
+            def run_variant(index, focus):
+                instruction = (f"{prompt}\n\nWrite only version {index} of {len(focuses)}, "
+                               f"emphasizing {focus}. Return the full resume for this version.")
+                messages = self._full_resume_messages(resume_text, job_description, instruction, refinement,
+                                                      original_resume)
+                return self._stream_completion(messages, f"Prompt #{prompt_number} (version {index})", echo=False)
+
+            print(f"\nGenerating {len(focuses)} versions in parallel...")
+            with ThreadPoolExecutor(max_workers=len(focuses)) as pool:
+                futures = [pool.submit(run_variant, i, focus) for i, focus in enumerate(focuses, start=1)]
+                versions = [future.result() for future in futures]
+            result = "\n\n".join(f"=== Version {i}: {focus} ===\n{version.strip()}"
+                                  for i, (focus, version) in enumerate(zip(focuses, versions), start=1))
+            print(result + "\n")
+            return result, None
+        except Exception as e:
+            print(f"\nAn error occurred: {str(e)}")
+            return None, str(e)
+
+    def _apply_section_prompt(self, resume_text, job_description, prompt_number, prompt, section, refinement,
+                              original_resume, echo=True, cancel_event=None):
+        """Rewrite a single resume section and splice the result back into the full resume"""
+        messages = list(self._static_context_messages(original_resume, job_description, include_resume=False))
+        heading = section["heading"] or section["key"]
+        step_prompt = (
+            f"Current resume section ({heading}):\n{section['body'].strip()}\n\n"
+            f"Instruction:\n{prompt}"
+        )
+        if refinement:
+            step_prompt += f"\n\n[User refinement/additional info:]\n{refinement}"
+        step_prompt += (
+            "\n\nRespond with only the final rewritten text of this section, without its heading "
+            "and without commentary, so it can replace the section in the resume as-is."
+        )
+        messages.append({"role": "user", "content": step_prompt})
+        if echo:
+            print(f"\nApplying customization to the {heading} section...")
+            print("Response:")
+        new_body = self._stream_completion(messages, f"Prompt #{prompt_number} ({section['key']})", echo, cancel_event)
+        return splice_section(resume_text, section, new_body), None
+
     def cleanup_files(self):
         """
         Remove temporary files (timestamped files) while preserving original files
@@ -339,7 +656,51 @@ class Applygorithminator:
         
         print("Cleanup complete!")
 
-    def interpret_user_intent(self, user_message, last_result, next_prompt_summary=None):
+    def interpret_user_intent(self, user_message, last_result, next_prompt_summary=None, use_local=True):
+        """
+        Interpret the user's intent: refine, move on, or clarify.
+        Confident replies ("looks good", "add X") are classified locally; only ambiguous
+        messages make an OpenAI round trip.
+        Returns a dict: {"action": "refine"/"move_on"/"clarify", "refinement": str or None}
+        """
+        if use_local:
+            started = time.perf_counter()
+            local = classify_intent(user_message)
+            if local is not None:
+                self.intent_stats["local"] += 1
+                self.intent_stats["local_seconds"] += time.perf_counter() - started
+                return local
+        started = time.perf_counter()
+        result = self._interpret_user_intent_llm(user_message, last_result, next_prompt_summary)
+        self.intent_stats["llm"] += 1
+        self.intent_stats["llm_seconds"] += time.perf_counter() - started
+        return result
+
+    def _stream_intent(self, messages, attempt):
+        """One attempt of a hedged intent call: returns (content, usage) and stops early if the attempt is cancelled"""
+        stream = self.client.chat.completions.create(
+            model=CUSTOMIZATION_MODEL,
+            messages=messages,
+            stream=True,
+            extra_body={"stream_options": {"include_usage": True}}
+        )
+        content, usage = "", None
+        for chunk in stream:
+            if attempt.cancel_event.is_set():
+                stream.close()
+                break
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                attempt.first_token()
+                content += chunk.choices[0].delta.content
+        if usage is not None:
+            attempt.tokens = (_usage_value(usage, "prompt_tokens") or 0) + (_usage_value(usage, "completion_tokens") or 0)
+        else:
+            attempt.tokens = count_tokens("".join(m["content"] for m in messages) + content, CUSTOMIZATION_MODEL)
+        return content, usage
+
+    def _interpret_user_intent_llm(self, user_message, last_result, next_prompt_summary=None):
         """
         Use OpenAI to interpret the user's intent: refine, move on, or clarify.
         Returns a dict: {"action": "refine"/"move_on"/"clarify", "refinement": str or None}
@@ -355,22 +716,211 @@ class Applygorithminator:
         user_prompt = f"Previous result:\n{last_result[:1000]}\n\nUser message:\n{user_message}"
         if next_prompt_summary:
             user_prompt += f"\n\nThe next section is: {next_prompt_summary[:200]}"
-        response = self.client.chat.completions.create(
-            model="gpt-4-turbo-preview",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ]
-        )
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+        with span("llm:intent", "llm", model=CUSTOMIZATION_MODEL), llm_call("intent", CUSTOMIZATION_MODEL) as call:
+            if hedging_enabled():
+                content, usage = hedged_call("intent", lambda attempt: self._stream_intent(messages, attempt),
+                                             count_tokens(system_prompt + user_prompt, CUSTOMIZATION_MODEL))
+            else:
+                response = self.client.chat.completions.create(model=CUSTOMIZATION_MODEL, messages=messages)
+                content, usage = None, getattr(response, "usage", None)
+            call.usage(usage)
         import json as pyjson
         try:
-            content = response.choices[0].message.content
-            result = pyjson.loads(content)
+            if content is None:
+                content = response.choices[0].message.content
+            with span("json_extract"):
+                result = pyjson.loads(content)
             return result
         except Exception:
             # Fallback: if parsing fails, ask for clarification
             return {"action": "clarify", "refinement": None}
 
+def build_customization_steps(customizer, resume_text, job_description, args):
+    """
+    Turn the prompts into steps. Each step has a label, the prompt text it shows,
+    run(base) -> (result, error) and refine(base, result, refinement) -> (result, error).
+    Steps marked speculative also accept run(base, echo=False, cancel_event=...) so they can
+    be prefetched in the background.
+    In parallel mode the section prompts collapse into one step reviewed once, and
+    Prompt #8's versions are generated concurrently.
+    """
+    prompt_numbers = [i for i in range(1, 9) if f"Prompt #{i}" in customizer.prompts]
+    parallel_numbers = customizer.parallel_section_prompts(resume_text, prompt_numbers) if args.parallel else []
+    steps = []
+
+    def prompt_step(prompt_num):
+        if args.parallel and prompt_num == 8:
+            run = lambda base: customizer.generate_variants(base, job_description, prompt_num,
+                                                            original_resume=resume_text)
+            speculative = False
+            refine = lambda base, result, refinement: customizer.generate_variants(
+                base, job_description, prompt_num, refinement=refinement, original_resume=resume_text)
+        else:
+            run = lambda base, **options: customizer.apply_prompt(base, job_description, prompt_num,
+                                                                  original_resume=resume_text,
+                                                                  section_scoped=args.section_scoped,
+                                                                  edit_ops=args.edit_ops, **options)
+            speculative = True
+            # Re-run the same prompt with the user's refinement at the end of the prompt
+            refine = lambda base, result, refinement: customizer.apply_prompt(
+                base, job_description, prompt_num, refinement=refinement, original_resume=resume_text,
+                section_scoped=args.section_scoped, edit_ops=args.edit_ops)
+        return {"label": f"Prompt #{prompt_num}", "prompt": customizer.prompts[f"Prompt #{prompt_num}"],
+                "run": run, "refine": refine, "speculative": speculative}
+
+    for prompt_num in prompt_numbers:
+        if prompt_num in parallel_numbers:
+            if prompt_num == parallel_numbers[0]:
+                label = ", ".join(f"Prompt #{n}" for n in parallel_numbers)
+
+                def run_parallel(base):
+                    draft, errors = customizer.apply_section_prompts_parallel(
+                        base, job_description, parallel_numbers, original_resume=resume_text)
+                    for error in errors:
+                        print(f"\nError in parallel step: {error}")
+                    # One error per failed section group; if none succeeded the draft is just the input
+                    if len(errors) >= len({PROMPT_SECTIONS[n] for n in parallel_numbers}):
+                        return None, "every section rewrite failed: " + "; ".join(errors)
+                    print(f"\n{draft}\n")
+                    return draft, None
+
+                steps.append({
+                    "label": label,
+                    "prompt": "Section rewrites: " + "; ".join(customizer.prompts[f"Prompt #{n}"] for n in parallel_numbers),
+                    "run": run_parallel,
+                    # The merged draft is refined as a whole rather than re-running every section prompt
+                    "refine": lambda base, result, refinement: customizer.refine_resume(
+                        result, job_description, refinement, original_resume=resume_text),
+                    "speculative": False,
+                })
+            continue
+        steps.append(prompt_step(prompt_num))
+    return steps
+
+def describe_revision(old, new, max_lines=3):
+    """Short note of what a refinement changed, kept in memory instead of the whole draft"""
+    added = [line[1:].strip() for line in difflib.unified_diff(old.splitlines(), new.splitlines(), lineterm="", n=0)
+             if line.startswith("+") and not line.startswith("+++") and line[1:].strip()]
+    if not added:
+        return "Returned the draft without visible changes."
+    shown = "; ".join(added[:max_lines])
+    more = f" (+{len(added) - max_lines} more lines)" if len(added) > max_lines else ""
+    return f"Revised {len(added)} line(s): {shown}{more}"
+
+def refinement_with_memory(refinement, memory):
+    """The user's latest request, plus the bounded memory of earlier feedback on this step"""
+    earlier = memory.render()
+    if not earlier:
+        return refinement
+    return f"{refinement}\n\nEarlier feedback on this step (keep honouring it):\n{earlier}"
+
+def review_result(customizer, step, base, result, next_prompt, on_result=None, memory=None):
+    """
+    Conversational review of a step's result; returns the result the user accepts.
+    on_result(result) is called whenever a new result is shown, before waiting for input.
+    Each refinement re-runs from `base`, so earlier feedback on the step travels with it through
+    `memory`, a ConversationMemory that keeps the prompt size bounded however long the review.
+    """
+    memory = memory if memory is not None else ConversationMemory()
+    if on_result:
+        on_result(result)
+    while True:
+        # Conversational user prompt
+        print("\nHow would you like to proceed?\nYou can ask for a refinement (e.g., 'Can you add...'), or say 'That looks good, let's move on.'")
+        user_message = input("Your input: ").strip()
+        intent = customizer.interpret_user_intent(user_message, result, next_prompt)
+        if intent["action"] == "refine" and intent["refinement"]:
+            refined, error = step["refine"](base, result, refinement_with_memory(intent["refinement"], memory))
+            if refined:
+                memory.add("user", intent["refinement"])
+                memory.add("assistant", describe_revision(result, refined))
+                result = refined
+                result_path = customizer.save_resume(result, is_original=False)
+                print(f"\nRefined result saved to: {result_path}")
+                if on_result:
+                    on_result(result)
+            else:
+                print(f"\nError during refinement: {error}")
+            # Loop again for further user input
+            continue
+        elif intent["action"] == "move_on":
+            if next_prompt:
+                print(f"\nMoving on to the next section, which is:\n{next_prompt[:100]}...")
+            else:
+                print("\nCustomization complete!")
+            return result
+        else:
+            print("\nSorry, I didn't understand. Please clarify your instruction.")
+
+def run_customization(customizer, resume_text, job_description, args):
+    """
+    Apply each customization step in turn, with a user review after each.
+    With --speculative, the next step starts in the background while the user reviews,
+    assuming the current result is accepted; it is used on move-on and discarded on refine.
+    """
+    current_resume = resume_text
+    steps = build_customization_steps(customizer, resume_text, job_description, args)
+    stats = SpeculationStats()
+    pending = {}  # base resume -> speculative task for the next step
+
+    def discard_pending():
+        for task in pending.values():
+            task.discard(on_done=lambda t: stats.record_miss(customizer.tokens_for_tag(t.tag)))
+        pending.clear()
+
+    for idx, step in enumerate(steps):
+        next_step = steps[idx + 1] if idx + 1 < len(steps) else None
+        next_prompt = next_step["prompt"] if next_step else None
+        print(f"\n\n=== Applying {step['label']} ===")
+        print(f"Prompt: {step['prompt'][:100]}...")
+        task = pending.pop(current_resume, None)
+        discard_pending()
+        if task is not None:
+            (result, error), saved_seconds = task.take()
+            stats.record_hit(saved_seconds)
+            if result:
+                print("Response (prefetched):")
+                print(result + "\n")
+        else:
+            result, error = step["run"](current_resume)
+        if not result:
+            print(f"\nError applying prompt: {error}")
+            return
+        result_path = customizer.save_resume(result, is_original=False)
+        print(f"\nSaved to: {result_path}")
+
+        def prefetch(result, next_step=next_step):
+            discard_pending()
+            if next_step and next_step.get("speculative"):
+                pending[result] = customizer.speculate(
+                    lambda cancel_event: next_step["run"](result, echo=False, cancel_event=cancel_event))
+
+        on_result = prefetch if getattr(args, "speculative", False) else None
+        current_resume = review_result(customizer, step, current_resume, result, next_prompt, on_result)
+    discard_pending()
+    intents = customizer.intent_stats
+    if intents["local"] or intents["llm"]:
+        print(f"\nReplies classified locally: {intents['local']}, by the LLM: {intents['llm']}")
+    if stats.hits or stats.misses:
+        print(f"\nSpeculation: {stats.summary()}")
+    usage = customizer.usage_summary()
+    if usage["calls"]:
+        print(f"\nToken usage: {usage['prompt_tokens']} prompt ({usage['cached_tokens']} cached, "
+              f"{usage['cached_ratio']:.0%}), {usage['completion_tokens']} completion over {usage['calls']} calls")
+
+def compare_intent_classifiers(customizer, samples=EVALUATION_SAMPLES):
+    """Accuracy, coverage and latency of the local classifier vs the LLM on labeled replies"""
+    local = evaluate(samples, classify_intent)
+    llm = evaluate(samples, lambda message: customizer._interpret_user_intent_llm(message, ""))
+    for name, stats in (("local", local), ("llm", llm)):
+        print(f"{name:>5}: accuracy {stats['accuracy']:.0%} on {stats['coverage']:.0%} of "
+              f"{stats['samples']} samples, {stats['mean_latency_ms']:.1f} ms/message")
+    return local, llm
+
 def main():
     # Print banner
     print("Welcome to the Applygorithminator - Your AI-Powered Resume Customization Tool!")
@@ -379,7 +929,38 @@ def main():
     # Set up argument parser
     parser = argparse.ArgumentParser(description='Applygorithminator - AI-Powered Resume Customization Tool')
     parser.add_argument('--cleanup', action='store_true', help='Clean up temporary files (timestamped files)')
+    parser.add_argument('--section-scoped', action='store_true',
+                        help='Send and rewrite only the targeted resume section for section-specific prompts')
+    parser.add_argument('--parallel', action='store_true',
+                        help='Run the section prompts (#2-#5) concurrently, review the merged draft once, '
+                             'and generate Prompt #8 versions concurrently')
+    parser.add_argument('--speculative', action='store_true',
+                        help='Prefetch the next step while you review the current one')
+    parser.add_argument('--edit-ops', action='store_true',
+                        help='Have the model return edit operations that are applied locally instead of '
+                             'streaming back the full resume (falls back to a rewrite if they do not apply)')
+    parser.add_argument('--eval-intent', nargs='?', const='', metavar='SAMPLES_JSONL',
+                        help='Compare the local intent classifier with the LLM on labeled replies '
+                             '(JSON lines with "message" and "action"; built-in samples if omitted)')
+    parser.add_argument('--profile', nargs='?', const=True, metavar='TRACE_FILE',
+                        help='Time each stage and write a Chrome/Perfetto trace (default: sessions/customize_<timestamp>.json)')
+    parser.add_argument('--cprofile', action='store_true',
+                        help='With --profile, also sample the run with cProfile and print the hottest functions')
     args = parser.parse_args()
+    if args.profile is True or (args.cprofile and not args.profile):
+        args.profile = default_trace_file("customize")
+
+    if args.profile:
+        enable_profiling(cprofile=args.cprofile)
+    try:
+        run_session(args)
+    finally:
+        if args.profile:
+            print("\n" + finish_profiling(args.profile))
+        if METRICS_TEXTFILE:
+            write_textfile(METRICS_TEXTFILE)
+
+def run_session(args):
 
     # Create customizer instance
     customizer = Applygorithminator()
@@ -388,6 +969,14 @@ def main():
     if args.cleanup:
         customizer.cleanup_files()
         return
+
+    if args.eval_intent is not None:
+        samples = EVALUATION_SAMPLES
+        if args.eval_intent:
+            with open(args.eval_intent) as f:
+                samples = [(row["message"], row["action"]) for row in map(json.loads, f) if row]
+        compare_intent_classifiers(customizer, samples)
+        return
     
     # Test API connection first
     if customizer.test_api_connection():
@@ -412,50 +1001,7 @@ def main():
             if fit_analysis:
                 proceed = input("\nWould you like to proceed with resume customization? (y/n): ").strip().lower()
                 if proceed == 'y':
-                    current_resume = resume_text
-                    prompt_keys = [f"Prompt #{i}" for i in range(1, 9) if f"Prompt #{i}" in customizer.prompts]
-                    for idx, prompt_key in enumerate(prompt_keys):
-                        prompt_num = int(prompt_key.split('#')[1])
-                        next_prompt = customizer.prompts[prompt_keys[idx + 1]] if idx + 1 < len(prompt_keys) else None
-                        while True:
-                            print(f"\n\n=== Applying {prompt_key} ===")
-                            print(f"Prompt: {customizer.prompts[prompt_key][:100]}...")
-                            result, error = customizer.apply_prompt(current_resume, job_description, prompt_num)
-                            if result:
-                                result_path = customizer.save_resume(result, is_original=False)
-                                print(f"\nSaved to: {result_path}")
-                                # Conversational user prompt
-                                print("\nHow would you like to proceed?\nYou can ask for a refinement (e.g., 'Can you add...'), or say 'That looks good, let's move on.'")
-                                user_message = input("Your input: ").strip()
-                                intent = customizer.interpret_user_intent(user_message, result, next_prompt)
-                                if intent["action"] == "refine" and intent["refinement"]:
-                                    # Re-run the same prompt with the user's refinement as extra context
-                                    result, error = customizer.apply_prompt(
-                                        current_resume + "\n\n[User refinement/additional info:]\n" + intent["refinement"],
-                                        job_description,
-                                        prompt_num
-                                    )
-                                    if result:
-                                        result_path = customizer.save_resume(result, is_original=False)
-                                        print(f"\nRefined result saved to: {result_path}")
-                                        current_resume = result
-                                    else:
-                                        print(f"\nError during refinement: {error}")
-                                    # Loop again for further user input
-                                    continue
-                                elif intent["action"] == "move_on":
-                                    current_resume = result
-                                    if next_prompt:
-                                        print(f"\nMoving on to the next section, which is:\n{next_prompt[:100]}...")
-                                    else:
-                                        print("\nCustomization complete!")
-                                    break
-                                else:
-                                    print("\nSorry, I didn't understand. Please clarify your instruction.")
-                                    continue
-                            else:
-                                print(f"\nError applying prompt: {error}")
-                                return
+                    run_customization(customizer, resume_text, job_description, args)
                 else:
                     print("\nResume customization skipped.")
         except FileNotFoundError as e:
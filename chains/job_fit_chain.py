@@ -1,10 +1,27 @@
 from langchain.prompts import PromptTemplate
 from langchain_openai import ChatOpenAI
-from utils.config import OPENAI_MODEL, OPENAI_MAX_TOKENS
+from chains.llm_pool import chat_model
+import logging
+from utils.config import OPENAI_MODEL, OPENAI_MAX_TOKENS, JOB_FIT_TWO_STAGE, COMPACT_LLM_OUTPUT
+from utils.token_budget import prompt_budget, output_budget
+from utils.profiling import span
+from utils.metrics import llm_call, record_cache
+from utils.hedging import hedged_invoke, hedge_llm_options
+from utils.text_parsing import (
+    extract_json_from_llm_result, extract_json_from_string, extract_llm_content, extract_compact_job_fit, finish_reason,
+    is_truncated_json, LLMJsonParseError,
+)
+from utils.requirements_cache import default_cache, normalize_requirements, format_requirements, format_numbered_requirements
+from utils.analysis_cache import format_analysis
 
-job_fit_prompt = PromptTemplate(
-    input_variables=["combined_experience", "job_description"],
-    template="""
+# Per-item output bounds used to size max_tokens: an aligned line or a gap with its question
+JOB_FIT_ITEM_TOKENS = 60
+JOB_FIT_BASE_TOKENS = 40
+# A compact item is an ID, or an ID plus a one-sentence question
+JOB_FIT_COMPACT_ITEM_TOKENS = 48
+JOB_FIT_COMPACT_BASE_TOKENS = 20
+
+JOB_FIT_TEMPLATE = """
 Compare my combined experience (resume plus additional stories) to this job description and identify:
 1. Key skills and experiences that are well-aligned
 2. Important skills or experiences from the job description that are missing or could be strengthened (i.e., not covered by either the resume or the stories)
@@ -23,14 +40,231 @@ GAPS:
   {{"skill": "Hands-on Leadership", "question": "Tell me about a time when you had to take on a player/coach role in leading a team."}},
   {{"skill": "Technologist", "question": "Can you share a specific scenario where you embraced technology to up-level your team's productivity and impact?"}}
 ]
+
+Job Description:
+{job_description}
+
+Combined Experience:
+{combined_experience}
+"""
+
+JD_REQUIREMENTS_TEMPLATE = """
+Extract the requirements from this job description: every skill, experience, qualification and responsibility a candidate is expected to bring.
+Write each requirement as a short, self-contained phrase (e.g. "5+ years of backend development in Python", "Experience mentoring engineers"), merging duplicates.
+Mark each as "required" or "preferred" ("nice to have", "bonus", "a plus" and similar are preferred).
+
+Respond ONLY with a JSON array of objects with "requirement" and "priority" fields, for example:
+[
+  {{"requirement": "Hands-on technical leadership of a small team", "priority": "required"}},
+  {{"requirement": "Experience with Kubernetes", "priority": "preferred"}}
+]
+
+Job Description:
+{job_description}
+"""
+
+JOB_FIT_MATCH_TEMPLATE = """
+Compare my combined experience (resume plus additional stories) to the requirements of a job and identify:
+1. Key skills and experiences that are well-aligned with the requirements
+2. Requirements that are missing or could be strengthened (i.e., not covered by either the resume or the stories); required items matter more than preferred ones
+3. For each gap, generate a specific behavioral question in the format 'Tell me about a time when you [specific scenario related to the missing skill/experience]'
+
+IMPORTANT: Before listing a requirement as a gap, carefully check both the resume and all provided stories. If any story clearly addresses it, do NOT list it as a gap, even if it is not in the resume. Only list true gaps that are not covered by either the resume or any of the stories.
+
+Format your response as follows:
+ALIGNMENT:
+[List aligned skills/experiences]
+
+GAPS:
+Return the GAPS section as a JSON array, where each item is an object with "skill" and "question" fields. For example:
+GAPS:
+[
+  {{"skill": "Hands-on Leadership", "question": "Tell me about a time when you had to take on a player/coach role in leading a team."}}
+]
+
+Job Requirements:
+{requirements}
+
+Combined Experience:
+{combined_experience}
+"""
+
+JOB_FIT_COMPACT_TEMPLATE = """
+Compare my combined experience (resume plus additional stories) to the numbered job requirements below.
+A requirement is covered if the resume or any story clearly addresses it. For each requirement that is not covered (required items matter more than preferred ones), write a specific behavioral question in the format 'Tell me about a time when you [specific scenario]'.
+
+Respond ONLY in this format, citing requirements by ID and listing every covered one after ALIGNED. For each gap, "skill" is the short name of the missing skill (one to three words, e.g. "Kubernetes"), not the whole requirement:
+ALIGNED: R1, R4
+GAPS: [{{"id": "R2", "skill": "Kubernetes", "q": "Tell me about a time when you ..."}}]
+
+Job Requirements:
+{requirements}
+
+Combined Experience:
+{combined_experience}
+"""
+
+JOB_FIT_DELTA_TEMPLATE = """
+I previously compared my resume to this job description. I have since edited the resume; the changes are shown below as a unified diff (lines starting with - were removed, + were added).
+
+Re-evaluate ONLY what the changed lines affect. Do not repeat items that are unaffected.
+- ALIGNMENT: new aligned skills/experiences the added lines now support
+- REMOVED: previously aligned items (copied exactly) that the removed lines no longer support
+- RESOLVED: previous gap skills (copied exactly) that the added lines now cover
+- GAPS: new gaps introduced by the change, as a JSON array of objects with "skill" and "question" fields, where each question is in the format 'Tell me about a time when you ...'
+
+Write "None" under a heading with nothing to report, and use [] for no new gaps.
+
+Format your response as follows:
+ALIGNMENT:
+- ...
+REMOVED:
+- ...
+RESOLVED:
+- ...
+GAPS:
+[]
+
+Job Description:
+{job_description}
+
+Previous Analysis:
+{previous_analysis}
+
+Resume Changes:
+{resume_diff}
 """
+
+job_fit_prompt = PromptTemplate(
+    input_variables=["combined_experience", "job_description"],
+    template=JOB_FIT_TEMPLATE
+)
+
+jd_requirements_prompt = PromptTemplate(
+    input_variables=["job_description"],
+    template=JD_REQUIREMENTS_TEMPLATE
+)
+
+job_fit_match_prompt = PromptTemplate(
+    input_variables=["requirements", "combined_experience"],
+    template=JOB_FIT_MATCH_TEMPLATE
 )
 
-def run_job_fit_chain(combined_experience, job_description, openai_api_key):
-    llm = ChatOpenAI(api_key=openai_api_key, model=OPENAI_MODEL, temperature=0.2, max_tokens=OPENAI_MAX_TOKENS)
+job_fit_compact_prompt = PromptTemplate(
+    input_variables=["requirements", "combined_experience"],
+    template=JOB_FIT_COMPACT_TEMPLATE
+)
+
+def extract_job_requirements(job_description, openai_api_key, cache=None):
+    """
+    Stage one: the job description's requirements as [{"requirement", "priority"}], extracted once
+    per posting and then served from the cache. A reply cut off by max_tokens is used but not cached.
+    Raises LLMJsonParseError if the reply is unusable.
+    """
+    cache = cache or default_cache()
+    requirements = cache.load(job_description)
+    record_cache("jd_requirements", requirements is not None)
+    if requirements is not None:
+        return requirements
+    llm = chat_model(ChatOpenAI, api_key=openai_api_key, model=OPENAI_MODEL, temperature=0.0, max_tokens=OPENAI_MAX_TOKENS,
+                     **hedge_llm_options())
+    chain = jd_requirements_prompt | llm
+    with span("llm:jd_requirements", "llm", model=OPENAI_MODEL), llm_call("jd_requirements", OPENAI_MODEL) as call:
+        result = hedged_invoke(chain, {"job_description": job_description}, "jd_requirements")
+        call.usage(result)
+    with span("json_extract"):
+        requirements = normalize_requirements(extract_json_from_llm_result(result))
+    if not requirements:
+        raise LLMJsonParseError("No requirements could be extracted from the job description")
+    if finish_reason(result) == "length" or is_truncated_json(extract_json_from_string(extract_llm_content(result))):
+        logging.warning("Requirements reply was cut off; using %d requirements without caching them", len(requirements))
+        return requirements
+    cache.save(job_description, requirements)
+    return requirements
+
+def run_job_fit_match_chain(combined_experience, requirements, openai_api_key, compact=None):
+    """
+    Stage two: matches a resume and stories against already-extracted requirements. max_tokens is
+    sized from the requirement count. In compact mode the model cites requirements by ID and the
+    reply is expanded locally into the usual ALIGNMENT/GAPS text.
+    """
+    compact = COMPACT_LLM_OUTPUT if compact is None else compact
+    if compact:
+        template, prompt = JOB_FIT_COMPACT_TEMPLATE, job_fit_compact_prompt
+        requirements_text = format_numbered_requirements(requirements)
+        max_tokens = output_budget(len(requirements), JOB_FIT_COMPACT_ITEM_TOKENS, JOB_FIT_COMPACT_BASE_TOKENS)
+    else:
+        template, prompt = JOB_FIT_MATCH_TEMPLATE, job_fit_match_prompt
+        requirements_text = format_requirements(requirements)
+        max_tokens = output_budget(len(requirements), JOB_FIT_ITEM_TOKENS, JOB_FIT_BASE_TOKENS)
+    with span("prompt:job_fit_match"):
+        prompt_budget(OPENAI_MODEL, {
+            "instructions": template,
+            "requirements": requirements_text,
+            "combined_experience": combined_experience,
+        }, max_tokens)
+    llm = chat_model(ChatOpenAI, api_key=openai_api_key, model=OPENAI_MODEL, temperature=0.2, max_tokens=max_tokens,
+                     **hedge_llm_options())
+    chain = prompt | llm
+    with span("llm:job_fit_match", "llm", model=OPENAI_MODEL), llm_call("job_fit_match", OPENAI_MODEL) as call:
+        result = hedged_invoke(chain, {"requirements": requirements_text, "combined_experience": combined_experience},
+                               "job_fit_match")
+        call.usage(result)
+    if not compact:
+        return result
+    with span("json_extract"):
+        return format_analysis(*extract_compact_job_fit(extract_llm_content(result), requirements))
+
+def run_job_fit_chain(combined_experience, job_description, openai_api_key, two_stage=None, requirements_cache=None,
+                      compact=None):
+    """
+    Alignment and gaps for a resume against a job description. By default (JOB_FIT_TWO_STAGE) the
+    JD's requirements are extracted once and cached, and only the match runs per resume; if the
+    extraction can't be parsed, this falls back to the one-shot prompt. With HEDGE_REQUESTS, slow
+    calls are hedged (see utils.hedging).
+    """
+    if JOB_FIT_TWO_STAGE if two_stage is None else two_stage:
+        try:
+            requirements = extract_job_requirements(job_description, openai_api_key, requirements_cache)
+        except LLMJsonParseError:
+            logging.warning("Requirements extraction failed, using the one-shot job fit prompt", exc_info=True)
+        else:
+            return run_job_fit_match_chain(combined_experience, requirements, openai_api_key, compact)
+    # Resume and JD can't be trimmed, but measure them so oversized inputs are logged before the call
+    with span("prompt:job_fit"):
+        prompt_budget(OPENAI_MODEL, {
+            "instructions": JOB_FIT_TEMPLATE,
+            "job_description": job_description,
+            "combined_experience": combined_experience,
+        }, OPENAI_MAX_TOKENS)
+    llm = chat_model(ChatOpenAI, api_key=openai_api_key, model=OPENAI_MODEL, temperature=0.2, max_tokens=OPENAI_MAX_TOKENS,
+                     **hedge_llm_options())
     chain = job_fit_prompt | llm
-    result = chain.invoke({
-        "combined_experience": combined_experience,
-        "job_description": job_description
-    })
-    return result 
\ No newline at end of file
+    with span("llm:job_fit", "llm", model=OPENAI_MODEL), llm_call("job_fit", OPENAI_MODEL) as call:
+        result = hedged_invoke(chain, {
+            "combined_experience": combined_experience,
+            "job_description": job_description
+        }, "job_fit")
+        call.usage(result)
+    return result
+
+job_fit_delta_prompt = PromptTemplate(
+    input_variables=["resume_diff", "previous_analysis", "job_description"],
+    template=JOB_FIT_DELTA_TEMPLATE
+)
+
+def run_job_fit_delta_chain(resume_diff, previous_analysis, job_description, openai_api_key):
+    """Asks only for the alignment and gap changes caused by an edit, so the output stays small"""
+    # Each changed line can add or remove at most about one item
+    changed = sum(1 for line in resume_diff.splitlines() if line[:1] in "+-" and not line.startswith(("+++", "---")))
+    max_tokens = output_budget(changed, JOB_FIT_ITEM_TOKENS, JOB_FIT_BASE_TOKENS)
+    llm = chat_model(ChatOpenAI, api_key=openai_api_key, model=OPENAI_MODEL, temperature=0.2, max_tokens=max_tokens)
+    chain = job_fit_delta_prompt | llm
+    with span("llm:job_fit_delta", "llm", model=OPENAI_MODEL), llm_call("job_fit_delta", OPENAI_MODEL) as call:
+        result = chain.invoke({
+            "resume_diff": resume_diff,
+            "previous_analysis": previous_analysis,
+            "job_description": job_description
+        })
+        call.usage(result)
+    return result
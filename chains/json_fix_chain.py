@@ -0,0 +1,26 @@
+from langchain.prompts import PromptTemplate
+from langchain_openai import ChatOpenAI
+from chains.llm_pool import chat_model
+from utils.text_parsing import extract_llm_content
+from utils.profiling import span
+from utils.metrics import llm_call
+
+json_fix_prompt = PromptTemplate(
+    input_variables=["broken_json"],
+    template="""
+The following text was meant to be valid JSON but fails to parse. Fix only the syntax (quotes, commas, brackets, escaping) without changing any values, and if the last element is cut off, drop it.
+Respond ONLY with the corrected JSON.
+
+{broken_json}
+"""
+)
+
+def fix_json_llm(broken_json, openai_api_key):
+    # Output is roughly the size of the input; ~1 token per 3 characters plus headroom
+    max_tokens = min(4000, len(broken_json) // 3 + 100)
+    llm = chat_model(ChatOpenAI, api_key=openai_api_key, model="gpt-3.5-turbo", temperature=0.0, max_tokens=max_tokens)
+    chain = json_fix_prompt | llm
+    with span("llm:json_fix", "llm", model="gpt-3.5-turbo"), llm_call("json_fix", "gpt-3.5-turbo") as call:
+        result = chain.invoke({"broken_json": broken_json})
+        call.usage(result)
+    return extract_llm_content(result)
@@ -0,0 +1,17 @@
+# Long-running processes (the daemon, the service) enable pooling so identically configured
+# chat models share one client and its HTTP connections; one-shot CLI runs don't need it.
+_pool = None
+
+def enable_client_pool():
+    global _pool
+    if _pool is None:
+        _pool = {}
+
+def chat_model(factory, **kwargs):
+    """Builds factory(**kwargs), or reuses the pooled instance for the same configuration."""
+    if _pool is None:
+        return factory(**kwargs)
+    key = (factory, tuple(sorted(kwargs.items())))
+    if key not in _pool:
+        _pool[key] = factory(**kwargs)
+    return _pool[key]
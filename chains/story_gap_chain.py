@@ -1,20 +1,21 @@
 from langchain.prompts import PromptTemplate
 from langchain_openai import ChatOpenAI
+from chains.llm_pool import chat_model
 from utils.text_parsing import extract_json_from_llm_result, extract_llm_content, LLMJsonParseError, format_dict_list
+from utils.token_budget import pack_stories, output_budget, summarize_story
+from utils.config import GAP_CHECK_MODELS, GAP_CHECK_UNCERTAIN_BAND, COMPACT_LLM_OUTPUT
+from utils.profiling import span
+from utils.metrics import llm_call, session_stats
 import json
+import time
 import logging
 
-def format_stories_context(stories):
-    return format_dict_list(stories, ["skill", "story"], section_title="Additional Experience Stories")
+GAP_CHECK_MAX_TOKENS = 300
+# A compact verdict is ~20 tokens of JSON plus ~4 per cited story ID
+COMPACT_VERDICT_BASE_TOKENS = 20
+COMPACT_VERDICT_ID_TOKENS = 4
 
-def story_answers_gap_llm(gap_skill, question, relevant_stories, openai_api_key):
-    if not relevant_stories:
-        return False, None, None
-    # Format stories context for the LLM prompt
-    stories_context = format_stories_context(relevant_stories)
-    prompt = PromptTemplate(
-        input_variables=["gap_skill", "question", "stories_context"],
-        template="""
+STORY_GAP_TEMPLATE = """
 You are helping a user prepare for a job application. For the following skill gap and behavioral question, review the user's provided stories. If any story answers the question, respond with a JSON object: {{"answered": true, "summary": "[summary of how the story answers the question]", "confidence": [confidence score between 0 and 1]}}.
 If none of the stories are relevant, respond with {{"answered": false, "summary": "", "confidence": [confidence score between 0 and 1]}}.
 
@@ -36,23 +37,177 @@ Behavioral Question: {question}
 User's Stories:
 {stories_context}
 """
+
+COMPACT_GAP_TEMPLATE = """
+You are helping a user prepare for a job application. Decide whether any of the user's stories answers the behavioral question for this skill gap.
+Respond ONLY with compact JSON: {{"a": true or false, "ids": [IDs of the stories that answer it], "c": confidence between 0 and 1}}
+Confidence: 1.0 the story directly addresses the scenario; 0.8-0.9 clearly shows the skill in a different context; 0.6-0.7 partial match; 0.4-0.5 tangential; 0.0-0.3 not relevant.
+
+Skill Gap: {gap_skill}
+Behavioral Question: {question}
+
+User's Stories:
+{stories_context}
+"""
+
+class CascadeStats:
+    """Per-tier call counts and latency for the gap-verification cascade, plus how often tiers disagree"""
+    def __init__(self):
+        self.tiers = {}
+        self.escalations = 0
+        self.comparisons = 0
+        self.disagreements = 0
+
+    def record_call(self, model, seconds, parse_failed=False):
+        tier = self.tiers.setdefault(model, {"calls": 0, "seconds": 0.0, "parse_failures": 0})
+        tier["calls"] += 1
+        tier["seconds"] += seconds
+        tier["parse_failures"] += parse_failed
+
+    def record_escalation(self):
+        self.escalations += 1
+
+    def record_comparison(self, previous_answered, answered):
+        """A stronger tier re-judged a gap a cheaper tier was unsure about"""
+        self.comparisons += 1
+        self.disagreements += previous_answered != answered
+
+    @property
+    def disagreement_rate(self):
+        return self.disagreements / self.comparisons if self.comparisons else 0.0
+
+    def summary(self):
+        tiers = ", ".join(f"{model}: {t['calls']} calls, {t['seconds'] / t['calls']:.2f}s avg"
+                          for model, t in self.tiers.items() if t["calls"])
+        return f"{tiers}; {self.escalations} escalations, {self.disagreement_rate:.0%} disagreed"
+
+# Process-wide; each session's own figures are in session_cascade_stats()
+cascade_stats = CascadeStats()
+
+def session_cascade_stats():
+    """The cascade figures of the session running on this thread (see metrics.start_session_stats)"""
+    return session_stats().setdefault("cascade", CascadeStats())
+
+def _record(method, *args, **kwargs):
+    for stats in (cascade_stats, session_cascade_stats()):
+        getattr(stats, method)(*args, **kwargs)
+
+def is_uncertain(confidence, band=None):
+    low, high = band or GAP_CHECK_UNCERTAIN_BAND
+    return not isinstance(confidence, (int, float)) or low <= confidence <= high
+
+def format_stories_context(stories):
+    return format_dict_list(stories, ["skill", "story"], section_title="Additional Experience Stories")
+
+def format_compact_stories(stories):
+    """Stories labelled S1, S2, ... so a compact verdict can cite them by ID"""
+    return "\n".join(f"S{i} [{s.get('skill', '')}] {s.get('story', '')}" for i, s in enumerate(stories, 1))
+
+def cited_summary(story_ids, stories):
+    """Local stand-in for the free-text summary: the cited stories' skills and opening sentences"""
+    cited = []
+    for story_id in story_ids if isinstance(story_ids, list) else []:
+        digits = str(story_id).strip().upper().lstrip("S")
+        if digits.isdigit() and 1 <= int(digits) <= len(stories):
+            story = stories[int(digits) - 1]
+            if story not in cited:
+                cited.append(story)
+    return "; ".join(f"[{s.get('skill', '')}] {summarize_story(s)['story']}" for s in cited)
+
+def story_answers_gap_llm(gap_skill, question, relevant_stories, openai_api_key, json_fixer=None, compact=None,
+                          pinned=()):
+    """
+    Returns (answered, summary, confidence). In compact mode (COMPACT_LLM_OUTPUT) the model only
+    cites story IDs, the summary is built locally from the cited stories, and max_tokens is sized
+    from the number of stories; explain_gap_verdict() fetches a prose summary when one is needed.
+    Stories in `pinned` are the last to be trimmed when the prompt is packed.
+    """
+    if not relevant_stories:
+        return False, None, None
+    compact = COMPACT_LLM_OUTPUT if compact is None else compact
+    template = COMPACT_GAP_TEMPLATE if compact else STORY_GAP_TEMPLATE
+    with span("prompt:gap_check", stories=len(relevant_stories)):
+        # Keep the stories within the gap-check model's context, most relevant first
+        relevant_stories, _ = pack_stories(
+            relevant_stories,
+            GAP_CHECK_MODELS[0],
+            {"instructions": template, "gap": f"{gap_skill}\n{question}"},
+            max_output_tokens=GAP_CHECK_MAX_TOKENS,
+            relevance_text=f"{gap_skill} {question}",
+            pinned=pinned,
+        )
+        # Format stories context for the LLM prompt
+        stories_context = format_compact_stories(relevant_stories) if compact else format_stories_context(relevant_stories)
+    prompt = PromptTemplate(
+        input_variables=["gap_skill", "question", "stories_context"],
+        template=template
     )
-    llm = ChatOpenAI(api_key=openai_api_key, model="gpt-3.5-turbo", temperature=0.0, max_tokens=300)
-    chain = prompt | llm
-    result = chain.invoke({
+    max_tokens = GAP_CHECK_MAX_TOKENS
+    if compact:
+        max_tokens = output_budget(len(relevant_stories), COMPACT_VERDICT_ID_TOKENS, COMPACT_VERDICT_BASE_TOKENS,
+                                   GAP_CHECK_MAX_TOKENS)
+    inputs = {
         "gap_skill": gap_skill,
         "question": question,
         "stories_context": stories_context
-    })
-    try:
-        response_json = extract_json_from_llm_result(result)
-        answered = response_json.get('answered', False)
-        summary = response_json.get('summary', '')
-        confidence = response_json.get('confidence', None)
-        # Sanity check: if summary contains phrases indicating no match, treat as not answered
-        if answered and any(phrase in summary.lower() for phrase in ["not directly addressed", "no relevant story", "not covered"]):
-            answered = False
-        return answered, summary, confidence
-    except LLMJsonParseError as e:
-        logging.error("Failed to parse LLM JSON response", exc_info=True)
-        raise 
\ No newline at end of file
+    }
+    # Cheapest model first; escalate while the verdict is uncertain or unparseable
+    previous_answered = None
+    for tier, model in enumerate(GAP_CHECK_MODELS):
+        last_tier = tier == len(GAP_CHECK_MODELS) - 1
+        started = time.perf_counter()
+        try:
+            # Only the last tier re-asks for broken JSON; earlier tiers escalate instead
+            verdict = _verify_gap(prompt, inputs, model, openai_api_key, json_fixer if last_tier else None,
+                                  relevant_stories, max_tokens)
+        except LLMJsonParseError:
+            _record("record_call", model, time.perf_counter() - started, parse_failed=True)
+            if last_tier:
+                logging.error("Failed to parse LLM JSON response", exc_info=True)
+                raise
+            logging.info("Gap check with %s returned unparseable JSON, escalating", model)
+            _record("record_escalation")
+            previous_answered = None
+            continue
+        _record("record_call", model, time.perf_counter() - started)
+        if previous_answered is not None:
+            _record("record_comparison", previous_answered, verdict[0])
+        if last_tier or not is_uncertain(verdict[2]):
+            return verdict
+        logging.info("Gap check with %s was uncertain (confidence %s), escalating", model, verdict[2])
+        _record("record_escalation")
+        previous_answered = verdict[0]
+
+def _verify_gap(prompt, inputs, model, openai_api_key, json_fixer, stories=(), max_tokens=GAP_CHECK_MAX_TOKENS):
+    llm = chat_model(ChatOpenAI, api_key=openai_api_key, model=model, temperature=0.0, max_tokens=max_tokens)
+    chain = prompt | llm
+    with span("llm:gap_check", "llm", model=model), llm_call("gap_check", model) as call:
+        result = chain.invoke(inputs)
+        call.usage(result)
+    with span("json_extract"):
+        response_json = extract_json_from_llm_result(result, reask=json_fixer)
+    # Full verdicts use answered/summary/confidence; compact ones a/ids/c
+    answered = response_json.get('answered', response_json.get('a', False))
+    if 'summary' in response_json:
+        summary = response_json.get('summary') or ''
+    else:
+        summary = cited_summary(response_json.get('ids', []), list(stories))
+    confidence = response_json.get('confidence', response_json.get('c'))
+    # Sanity check: if summary contains phrases indicating no match, treat as not answered
+    if answered and any(phrase in summary.lower() for phrase in ["not directly addressed", "no relevant story", "not covered"]):
+        answered = False
+    return answered, summary, confidence
+
+def explain_gap_verdict(gap_skill, question, stories, openai_api_key, model=None):
+    """On-demand prose summary of how the stories answer a gap, for callers that need more than cited IDs"""
+    if not stories:
+        return ""
+    prompt = PromptTemplate(input_variables=["gap_skill", "question", "stories_context"], template=STORY_GAP_TEMPLATE)
+    model = model or GAP_CHECK_MODELS[-1]
+    llm = chat_model(ChatOpenAI, api_key=openai_api_key, model=model, temperature=0.0, max_tokens=GAP_CHECK_MAX_TOKENS)
+    chain = prompt | llm
+    with span("llm:gap_explain", "llm", model=model), llm_call("gap_explain", model) as call:
+        result = chain.invoke({"gap_skill": gap_skill, "question": question,
+                               "stories_context": format_stories_context(stories)})
+        call.usage(result)
+    return extract_json_from_llm_result(result).get("summary", "")
@@ -30,6 +30,15 @@ def display_story_saved():
 def display_no_experience():
     print("Noted that you don't have this experience.")
 
+def display_story_deferred(skill):
+    print(f"No answer provided for {skill}; saved for later.")
+
+def display_unmatched_gaps(count, path):
+    print(f"\n{count} gap(s) had no answer. Fill in the stories in {path} and pass it back with --answers.")
+
+def display_profile_report(report):
+    print(f"\n{report}")
+
 def display_session_log_path(session_file):
     print(f"\nSession log saved to: {session_file}")
 
@@ -39,6 +48,19 @@ def display_collect_stories_intro():
 def display_error(message):
     print(f"Error: {message}")
 
+def display_analysis_mode(mode, similarity=None):
+    if mode == "reused" and similarity is not None:
+        print(f"This resume was already analyzed against a {similarity:.0%} similar posting; reusing that analysis "
+              "(run with --no-reuse for a fresh one).")
+        return
+    messages = {
+        "cached": "Resume unchanged since the last analysis of this job description; reusing it.",
+        "incremental": "Re-evaluated only the resume changes since the last analysis.",
+        "full": "Ran a full analysis.",
+        "reused": "This resume was already analyzed against a near-identical posting; reusing that analysis.",
+    }
+    print(messages.get(mode, mode))
+
 def display_analyzing_job_fit():
     print("\nAnalyzing job fit...\n")
 
@@ -0,0 +1,83 @@
+import os
+import json
+import logging
+import argparse
+import socketserver
+from utils.config import OPENAI_API_KEY, DAEMON_SOCKET
+from utils.token_budget import count_tokens
+from chains.llm_pool import enable_client_pool
+# Imported eagerly: keeping langchain and the prompt templates loaded is the point of the daemon
+from chains.job_fit_chain import run_job_fit_chain, run_job_fit_delta_chain
+from chains.story_gap_chain import story_answers_gap_llm, explain_gap_verdict
+from chains.json_fix_chain import fix_json_llm
+
+DEFAULT_SOCKET = "/tmp/applygorithminator.sock"
+
+def handle_request(request):
+    """Dispatches one decoded request to the matching chain and returns a JSON-serializable result"""
+    op = request.get("op")
+    params = request.get("params", {})
+    api_key = params.get("api_key") or OPENAI_API_KEY
+    if op == "ping":
+        return "pong"
+    if op == "job_fit":
+        # Same string form main.py gets from an in-process call, so parsing is identical
+        return str(run_job_fit_chain(params["combined_experience"], params["job_description"], api_key))
+    if op == "job_fit_delta":
+        return str(run_job_fit_delta_chain(params["resume_diff"], params["previous_analysis"],
+                                           params["job_description"], api_key))
+    if op == "gap_check":
+        return list(story_answers_gap_llm(params["gap_skill"], params["question"], params["relevant_stories"],
+                                          api_key, json_fixer=lambda broken: fix_json_llm(broken, api_key),
+                                          pinned=params.get("pinned", ())))
+    if op == "gap_explain":
+        return explain_gap_verdict(params["gap_skill"], params["question"], params["stories"], api_key)
+    if op == "fix_json":
+        return fix_json_llm(params["broken_json"], api_key)
+    raise ValueError(f"Unknown op: {op}")
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                reply = {"result": handle_request(json.loads(line))}
+            except Exception as e:
+                logging.exception("Daemon request failed")
+                reply = {"error": str(e), "type": type(e).__name__}
+            self.wfile.write(json.dumps(reply).encode() + b"\n")
+            self.wfile.flush()
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def create_server(socket_path):
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    # The socket carries API keys and resumes, so only this user may connect
+    old_umask = os.umask(0o177)
+    try:
+        server = DaemonServer(socket_path, DaemonHandler)
+    finally:
+        os.umask(old_umask)
+    enable_client_pool()
+    count_tokens("warm up the tokenizer")
+    return server
+
+def main():  # pragma: no cover
+    parser = argparse.ArgumentParser(description='Keep the Applygorithminator chains warm behind a Unix socket')
+    parser.add_argument('--socket', default=DAEMON_SOCKET or DEFAULT_SOCKET, help='Unix socket path')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    server = create_server(args.socket)
+    print(f"Applygorithminator daemon listening on {args.socket}")
+    print(f"Run the CLI with APPLYGORITHMINATOR_SOCKET={args.socket} to use it.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(args.socket)
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
@@ -1,6 +1,8 @@
-from utils.config import OPENAI_API_KEY
-from chains.job_fit_chain import run_job_fit_chain
-from chains.story_gap_chain import story_answers_gap_llm, format_stories_context
+import re
+import argparse
+from utils.config import (OPENAI_API_KEY, DAEMON_SOCKET, STORY_EMBEDDING_TOP_K, METRICS_TEXTFILE, METRICS_PORT, RESULTS_DB,
+                          HISTORY_INDEX_DB)
+from utils.lazy import lazy_function
 from utils.text_parsing import (
     extract_alignment_section,
     extract_gaps_json,
@@ -11,51 +13,188 @@ from utils.text_parsing import (
     LLMJsonParseError,
     format_dict_list,
     GapsJsonParseError,
+    session_parse_stats,
+    extract_list_section,
 )
 from utils.story_manager import StoryManager
+from utils.embedding_index import EmbeddingIndex
 from utils.session_logger import SessionLogger
+from utils.profiling import span, traced, enable_profiling, finish_profiling, default_trace_file
+from utils.metrics import (record_cache, write_textfile, serve_metrics, start_call_log, stop_call_log,
+                           start_session_stats, session_stats)
+from utils.results_store import ResultsStore
+from utils.history_index import HistoryIndex
+from utils.jd_feed import normalize_posting
+from utils.daemon_client import DaemonClient
+from utils.answers_file import AnswersFileIO, AnswersFileError, load_answers
+from utils.skill_index import canonical_skill
+from utils.token_budget import summarize_story
+from utils.analysis_cache import (
+    AnalysisCache,
+    INCREMENTAL_MAX_CHANGE,
+    diff_resume,
+    format_analysis,
+    merge_delta,
+    stories_fingerprint,
+)
 import cli
 
+# The chains pull in langchain, so they're imported on first use rather than at startup
+run_job_fit_chain = lazy_function("chains.job_fit_chain", "run_job_fit_chain")
+run_job_fit_delta_chain = lazy_function("chains.job_fit_chain", "run_job_fit_delta_chain")
+story_answers_gap_llm = lazy_function("chains.story_gap_chain", "story_answers_gap_llm")
+explain_gap_verdict = lazy_function("chains.story_gap_chain", "explain_gap_verdict")
+fix_json_llm = lazy_function("chains.json_fix_chain", "fix_json_llm")
+
+def use_daemon(client):
+    """Route the LLM chains through a warm daemon instead of importing them in this process"""
+    global run_job_fit_chain, run_job_fit_delta_chain, story_answers_gap_llm, explain_gap_verdict, fix_json_llm
+    run_job_fit_chain = client.run_job_fit_chain
+    run_job_fit_delta_chain = client.run_job_fit_delta_chain
+    story_answers_gap_llm = client.story_answers_gap_llm
+    explain_gap_verdict = client.explain_gap_verdict
+    fix_json_llm = client.fix_json_llm
+
 def get_resume_and_job_description(cli):
     resume_path = cli.prompt_for_resume_path("resources/resumes/original_resume.txt")
     job_description_path = cli.prompt_for_job_description_path("resources/job_descriptions/job_description.txt")
     return resume_path, job_description_path
 
+@traced("read_inputs")
 def read_inputs(resume_path, job_description_path):
     resume_text = read_file_or_exit(resume_path, "resume")
     job_description = read_file_or_exit(job_description_path, "job description")
     return resume_text, job_description
 
+@traced("job_fit_analysis")
 def run_job_fit_analysis(resume_text, job_description, api_key):
     combined_experience = f"Resume:\n{resume_text}"
     result = run_job_fit_chain(combined_experience, job_description, api_key)
     return cleanse_llm_response(result)
 
-def parse_job_fit_output(output):
+def make_json_fixer(api_key):
+    """Returns a callable that asks a cheap model to fix malformed JSON, used only after local repair fails."""
+    return lambda broken_json: fix_json_llm(broken_json, api_key)
+
+@traced("json_extract")
+def parse_job_fit_output(output, json_fixer=None):
     alignment = extract_alignment_section(output)
-    gaps = extract_gaps_json(output)
+    gaps = extract_gaps_json(output, reask=json_fixer)
     return alignment, gaps
 
-def analyze_gaps_with_llm(gaps, relevant_stories, api_key):
+def analyze_job_fit(resume_text, job_description, api_key, previous=None, json_fixer=None):
+    """Returns (output, alignment, gaps, mode), reusing the previous analysis of this JD where possible.
+
+    mode is "cached" when the resume is unchanged, "incremental" when only the edited lines were
+    re-evaluated, and "full" otherwise.
+    """
+    if previous is not None:
+        if previous["resume"] == resume_text:
+            return format_analysis(previous["alignment"], previous["gaps"]), previous["alignment"], previous["gaps"], "cached"
+        resume_diff, change = diff_resume(previous["resume"], resume_text)
+        if change <= INCREMENTAL_MAX_CHANGE:
+            previous_analysis = format_analysis(previous["alignment"], previous["gaps"])
+            with span("job_fit_delta"):
+                delta = cleanse_llm_response(run_job_fit_delta_chain(resume_diff, previous_analysis, job_description, api_key))
+            with span("json_extract"):
+                alignment, gaps = merge_delta(previous["alignment"], previous["gaps"],
+                                              extract_list_section(delta, "ALIGNMENT"),
+                                              extract_list_section(delta, "REMOVED"),
+                                              extract_list_section(delta, "RESOLVED"),
+                                              extract_gaps_json(delta, reask=json_fixer))
+            return format_analysis(alignment, gaps) + "\n\n--- Changes ---\n" + delta, alignment, gaps, "incremental"
+    output = run_job_fit_analysis(resume_text, job_description, api_key)
+    alignment, gaps = parse_job_fit_output(output, json_fixer)
+    return output, alignment, gaps, "full"
+
+def linked_stories(stories, linked_skill, skill_index):
+    """The stories with the skill a gap was linked to by an earlier verdict"""
+    if linked_skill is None:
+        return []
+    return [s for s in stories if skill_index.canonical(s.get('skill', '')) == linked_skill]
+
+def analyze_gaps_with_llm(gaps, relevant_stories, api_key, json_fixer=None, verdicts=None, story_manager=None):
+    """Checks each gap against the stories.
+
+    With a story_manager, a gap whose skill (or a known alias of it) already has a story is answered
+    by that story, and one the user has no experience in goes straight to unanswered, both without
+    a call; a confident LLM verdict links the gap skill to the story that answered it, and later
+    checks of that skill send that story first and pinned through prompt packing (still asking the LLM). If it has an embedding index
+    and STORY_EMBEDDING_TOP_K is set, each check sends only the most similar stories.
+    Verdicts found in `verdicts` (keyed by canonical skill) are reused without a call, and new
+    ones are added to it.
+    """
     answered = []
     unanswered = []
     for gap in gaps:
         skill = gap.get('skill', '(unknown skill)')
         question = gap.get('question', '(no question)')
-        is_answered, summary, confidence = story_answers_gap_llm(skill, question, relevant_stories, api_key)
+        key = canonical_skill(skill)
+        story = story_manager.find_story(skill) if story_manager is not None else None
+        if story is not None:
+            is_answered, summary, confidence = True, f"[{story['skill']}] {summarize_story(story)['story']}", 1.0
+        elif story_manager is not None and story_manager.has_no_experience(skill):
+            is_answered, summary, confidence = False, '', 0.0
+        elif verdicts is not None and key in verdicts:
+            record_cache("gap_verdict", True)
+            is_answered, summary, confidence = verdicts[key]
+        else:
+            if verdicts is not None:
+                record_cache("gap_verdict", False)
+            gap_stories = relevant_stories
+            if STORY_EMBEDDING_TOP_K and story_manager is not None and story_manager.embedding_index is not None:
+                gap_stories = story_manager.similar_stories(f"{skill}\n{question}", STORY_EMBEDDING_TOP_K) or relevant_stories
+            linked = []
+            if story_manager is not None:
+                linked = linked_stories(gap_stories, story_manager.skill_index.linked_skill(skill),
+                                        story_manager.skill_index)
+                gap_stories = linked + [s for s in gap_stories if s not in linked]
+            with span("gap_check", skill=skill):
+                # Pinned, so the linked stories are never the ones trimmed to fit the prompt
+                is_answered, summary, confidence = story_answers_gap_llm(skill, question, gap_stories, api_key,
+                                                                         json_fixer=json_fixer, pinned=linked)
+            if verdicts is not None:
+                verdicts[key] = [is_answered, summary, confidence]
+            if story_manager is not None:
+                story_manager.skill_index.learn_from_verdict(skill, gap_stories, is_answered, confidence, summary)
         if is_answered:
             answered.append({'gap': gap, 'summary': summary, 'confidence': confidence})
         else:
             unanswered.append(gap)
     return answered, unanswered
 
+def cited_stories(summary, stories):
+    """The stories a locally built summary cites as "[Skill] ...", or all of them if it cites none"""
+    cited = {canonical_skill(skill) for skill in re.findall(r"\[([^\]]+)\]", summary or "")}
+    return [s for s in stories if canonical_skill(s.get('skill', '')) in cited] or stories
+
+def explain_answered(answered, stories, api_key):
+    """
+    Replaces the local summaries of answered gaps (cited story openings) with the LLM's prose
+    explanation, one call per gap; a gap keeps its local summary if the call fails.
+    """
+    for item in answered:
+        gap = item['gap']
+        try:
+            summary = explain_gap_verdict(gap.get('skill', ''), gap.get('question', ''),
+                                          cited_stories(item['summary'], stories), api_key)
+        except LLMJsonParseError:
+            continue
+        if summary:
+            item['summary'] = summary
+
 def process_unanswered_gaps(unanswered_gaps, story_manager, logger, cli):
     for gap in unanswered_gaps:
         skill = gap.get('skill', '(unknown skill)')
         question = gap.get('question', '(no question)')
-        response = cli.prompt_for_story(skill, question)
+        with span("user_input", skill=skill):
+            response = cli.prompt_for_story(skill, question)
         logger.log_story_prompt(skill, question)
-        if response.lower() != 'skip':
+        if response is None:
+            # Non-interactive runs defer gaps they have no answer for instead of recording no experience
+            cli.display_story_deferred(skill)
+            logger.log(f"Deferred: no answer provided for {skill}")
+        elif response.lower() != 'skip':
             story_manager.save_story(skill, response, has_experience=True)
             cli.display_story_saved()
             logger.log_story_response(skill, question, response)
@@ -65,10 +204,39 @@ def process_unanswered_gaps(unanswered_gaps, story_manager, logger, cli):
             logger.log_no_experience(skill, question)
 
 def finalize_session(logger, cli):
+    parse_stats = session_parse_stats()
+    if parse_stats:
+        logger.log("JSON parsing: " + ", ".join(f"{path}={count}" for path, count in sorted(parse_stats.items())))
+    # Only present if this session checked a gap against the stories
+    cascade = session_stats().get("cascade")
+    if cascade is not None and cascade.tiers:
+        logger.log(f"Gap check cascade: {cascade.summary()}")
     logger.save()
     cli.display_session_log_path(logger.session_file)
 
-def run_workflow(api_key, cli, story_manager, logger):
+def gap_verdicts(answered, unanswered, verdicts=None):
+    """Verdict dicts for the results store: answered gaps with their confidence, unanswered ones with any verdict on record"""
+    rows = [{"skill": item['gap'].get('skill'), "answered": True, "summary": item['summary'],
+             "confidence": item['confidence']} for item in answered]
+    for gap in unanswered:
+        verdict = (verdicts or {}).get(canonical_skill(gap.get('skill', '')))
+        rows.append({"skill": gap.get('skill'), "answered": False, "summary": verdict[1] if verdict else None,
+                     "confidence": verdict[2] if verdict else None})
+    return rows
+
+def store_results(results_store, job_description, job_description_path, resume_text, resume_path, alignment, gaps,
+                  verdicts, calls, mode, logger):
+    """Writes the analysis to the results store; postings are keyed like feed postings, so reruns share a row"""
+    posting = normalize_posting({"description": job_description, "id": job_description_path}, job_description_path)
+    if posting is None:
+        return
+    results_store.add_analysis(posting, resume_text, alignment, gaps, verdicts, calls, mode,
+                               resume_path=resume_path, session_file=logger.session_file)
+
+def run_workflow(api_key, cli, story_manager, logger, analysis_cache=None, results_store=None, history_index=None,
+                 explain=False, reuse_history=True):
+    calls = start_call_log()
+    start_session_stats()
     resume_path, job_description_path = get_resume_and_job_description(cli)
     try:
         resume_text, job_description = read_inputs(resume_path, job_description_path)
@@ -76,33 +244,134 @@ def run_workflow(api_key, cli, story_manager, logger):
         cli.display_error(e)
         exit(1)
     logger.log_session_header(resume_path, job_description_path, resume_text, job_description)
-    job_fit_analysis = run_job_fit_analysis(resume_text, job_description, api_key)
-    try:
-        alignment, gaps = parse_job_fit_output(job_fit_analysis)
-    except GapsJsonParseError as e:
-        cli.display_error(e)
-        exit(1)
+    json_fixer = make_json_fixer(api_key)
+    mode = "full"
+    previous = analysis_cache.load(job_description) if analysis_cache is not None else None
+    reused = None
+    if previous is None and history_index is not None and reuse_history:
+        # An earlier session may have analyzed this resume against the same or a reposted job
+        reused = history_index.find_reusable_analysis(resume_text, job_description)
+        record_cache("history", reused is not None)
+    if reused is not None:
+        job_fit_analysis, alignment, gaps, mode = reused["analysis"], reused["alignment"], reused["gaps"], "reused"
+        cli.display_analysis_mode(mode, similarity=reused["similarity"])
+        logger.log(f"Analysis mode: reused from {reused['path']} ({reused['similarity']:.0%} similar posting)")
+    elif analysis_cache is None:
+        try:
+            # Compact replies are expanded inside the chain, so the analysis itself can fail to parse
+            job_fit_analysis = run_job_fit_analysis(resume_text, job_description, api_key)
+            alignment, gaps = parse_job_fit_output(job_fit_analysis, json_fixer)
+        except GapsJsonParseError as e:
+            cli.display_error(e)
+            exit(1)
+    else:
+        try:
+            job_fit_analysis, alignment, gaps, mode = analyze_job_fit(resume_text, job_description, api_key, previous, json_fixer)
+        except GapsJsonParseError as e:
+            cli.display_error(e)
+            exit(1)
+        record_cache("analysis", mode == "cached")
+        cli.display_analysis_mode(mode)
+        logger.log(f"Analysis mode: {mode}")
     cli.display_alignment(alignment)
     cli.display_gaps(gaps)
     logger.log_output(job_fit_analysis)
+    answered, unanswered, verdicts = [], [], None
     if gaps:
         cli.display_collect_stories_intro()
         relevant_stories = story_manager.get_relevant_stories()
+        verdicts = None
+        if analysis_cache is not None:
+            # Verdicts only carry over while the stories they were judged against are unchanged
+            stories_key = stories_fingerprint(relevant_stories)
+            verdicts = dict(previous["verdicts"]) if previous and previous.get("stories_key") == stories_key else {}
         try:
-            answered, unanswered = analyze_gaps_with_llm(gaps, relevant_stories, api_key)
+            answered, unanswered = analyze_gaps_with_llm(gaps, relevant_stories, api_key, json_fixer, verdicts, story_manager)
         except LLMJsonParseError as e:
             cli.display_error(e)
             exit(1)
+        if analysis_cache is not None:
+            analysis_cache.save(job_description, resume_text, alignment, gaps, verdicts, stories_key)
+        if explain:
+            explain_answered(answered, relevant_stories, api_key)
         for item in answered:
             cli.display_story_already_answered(item['gap'].get('skill', '(unknown skill)'), item['summary'])
         process_unanswered_gaps(unanswered, story_manager, logger, cli)
+    elif analysis_cache is not None:
+        analysis_cache.save(job_description, resume_text, alignment, gaps)
+    stop_call_log()
+    if results_store is not None:
+        store_results(results_store, job_description, job_description_path, resume_text, resume_path, alignment, gaps,
+                      gap_verdicts(answered, unanswered, verdicts), calls, mode, logger)
     finalize_session(logger, cli)
+    if history_index is not None:
+        history_index.index_file(logger.session_file, "session")
 
-if __name__ == '__main__':  # pragma: no cover
-    cli.display_banner()  # pragma: no cover
-    story_manager = StoryManager()  # pragma: no cover
-    logger = SessionLogger()  # pragma: no cover
-    run_workflow(OPENAI_API_KEY, cli, story_manager, logger)  # pragma: no cover
-
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Analyze a resume against a job description and collect stories for the gaps')
+    parser.add_argument('--resume', help='Resume file (skips the prompt)')
+    parser.add_argument('--job-description', help='Job description file (skips the prompt)')
+    parser.add_argument('--answers', help='YAML/JSON file mapping skills to stories or "skip"; unmatched gaps are deferred')
+    parser.add_argument('--unmatched-out', default='sessions/unmatched_gaps.json',
+                        help='Where --answers runs write gaps that had no answer (default: %(default)s)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Reuse the last analysis of this job description and only re-evaluate resume edits')
+    parser.add_argument('--interactive-fallback', action='store_true',
+                        help='With --answers, prompt for unmatched gaps instead of deferring them')
+    parser.add_argument('--no-reuse', action='store_true',
+                        help='Run a fresh analysis even if an earlier session analyzed this resume against the same posting')
+    parser.add_argument('--explain', action='store_true',
+                        help='Ask the LLM to explain how the stories answer each already-answered gap (one call per gap)')
+    parser.add_argument('--profile', nargs='?', const=True, metavar='TRACE_FILE',
+                        help='Time each stage and write a Chrome/Perfetto trace (default: sessions/trace_<timestamp>.json)')
+    parser.add_argument('--cprofile', action='store_true',
+                        help='With --profile, also sample the run with cProfile and print the hottest functions')
+    args = parser.parse_args(argv)
+    if args.profile is True or (args.cprofile and not args.profile):
+        args.profile = default_trace_file()
+    return args
 
+def build_io(args, io=cli):
+    """Returns cli itself, or cli wrapped to take input paths and stories from the command line and answers file"""
+    if not (args.answers or args.resume or args.job_description):
+        return io
+    answers = load_answers(args.answers) if args.answers else {}
+    return AnswersFileIO(io, answers, unmatched_file=args.unmatched_out if args.answers else None,
+                         interactive=args.interactive_fallback or not args.answers,
+                         resume_path=args.resume, job_description_path=args.job_description)
 
+if __name__ == '__main__':  # pragma: no cover
+    args = parse_args()  # pragma: no cover
+    if args.profile:  # pragma: no cover
+        enable_profiling(cprofile=args.cprofile)  # pragma: no cover
+    if METRICS_PORT:  # pragma: no cover
+        serve_metrics(METRICS_PORT)  # pragma: no cover
+    try:  # pragma: no cover
+        io = build_io(args)  # pragma: no cover
+    except AnswersFileError as e:  # pragma: no cover
+        cli.display_error(e)  # pragma: no cover
+        exit(1)  # pragma: no cover
+    io.display_banner()  # pragma: no cover
+    if DAEMON_SOCKET and DaemonClient(DAEMON_SOCKET).ping():  # pragma: no cover
+        use_daemon(DaemonClient(DAEMON_SOCKET))  # pragma: no cover
+    embedding_index = EmbeddingIndex() if STORY_EMBEDDING_TOP_K else None  # pragma: no cover
+    story_manager = StoryManager(embedding_index=embedding_index)  # pragma: no cover
+    if embedding_index is not None:  # pragma: no cover
+        story_manager.sync_embedding_index()  # pragma: no cover
+    logger = SessionLogger()  # pragma: no cover
+    analysis_cache = AnalysisCache() if args.incremental else None  # pragma: no cover
+    results_store = ResultsStore(RESULTS_DB) if RESULTS_DB else None  # pragma: no cover
+    history_index = HistoryIndex(HISTORY_INDEX_DB) if HISTORY_INDEX_DB else None  # pragma: no cover
+    if history_index is not None:  # pragma: no cover
+        history_index.refresh()  # pragma: no cover
+    try:  # pragma: no cover
+        run_workflow(OPENAI_API_KEY, io, story_manager, logger, analysis_cache, results_store,  # pragma: no cover
+                     history_index, explain=args.explain, reuse_history=not args.no_reuse)  # pragma: no cover
+    finally:  # pragma: no cover
+        # Also written when the workflow exits early, since a failed run is often the one worth profiling
+        if args.profile:  # pragma: no cover
+            cli.display_profile_report(finish_profiling(args.profile))  # pragma: no cover
+        if METRICS_TEXTFILE:  # pragma: no cover
+            write_textfile(METRICS_TEXTFILE)  # pragma: no cover
+    if getattr(io, 'unmatched', None):  # pragma: no cover
+        cli.display_unmatched_gaps(len(io.unmatched), args.unmatched_out)  # pragma: no cover
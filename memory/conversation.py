@@ -0,0 +1,92 @@
+import re
+from utils.token_budget import count_tokens
+
+DEFAULT_TOKEN_BUDGET = 600
+DEFAULT_WINDOW_TURNS = 6
+# Share of the budget the running summary may use; the rest holds the recent turns
+SUMMARY_SHARE = 0.35
+SUMMARY_LINE_TOKENS = 30
+
+def _truncate(text, max_tokens):
+    if count_tokens(text) <= max_tokens:
+        return text
+    words = text.split()
+    # Shrink by word until it fits; the ~4 chars/token estimate gives a close starting point
+    words = words[:max(1, max_tokens * 4 // 5)]
+    while len(words) > 1 and count_tokens(" ".join(words) + "...") > max_tokens:
+        words = words[:-1]
+    return " ".join(words) + "..."
+
+def extractive_summary(summary, turns, line_tokens=SUMMARY_LINE_TOKENS):
+    """Default summarizer: folds each turn into one short line (its first sentence), appended to the summary"""
+    lines = [summary] if summary else []
+    for turn in turns:
+        first_sentence = re.split(r"(?<=[.!?])\s+", " ".join(turn["content"].split()), maxsplit=1)[0]
+        lines.append(_truncate(f"{turn['role']}: {first_sentence}", line_tokens))
+    return "\n".join(lines)
+
+class ConversationMemory:
+    """
+    Rolling window of recent turns plus a running summary of older ones, kept within a fixed
+    token budget so prompts stop growing with the length of the conversation.
+
+    `summarize(summary, turns)` folds evicted turns into the summary; the default is local and
+    extractive, but an LLM-backed callable can be plugged in. The summary is capped at
+    SUMMARY_SHARE of the budget by dropping its oldest lines.
+    """
+    def __init__(self, token_budget=DEFAULT_TOKEN_BUDGET, window_turns=DEFAULT_WINDOW_TURNS, summarize=None):
+        self.token_budget = token_budget
+        self.window_turns = window_turns
+        self.summarize = summarize or extractive_summary
+        self.summary = ""
+        self.turns = []
+        self.evicted = 0
+
+    @property
+    def summary_budget(self):
+        return int(self.token_budget * SUMMARY_SHARE)
+
+    def _turn_tokens(self):
+        return sum(count_tokens(turn["content"]) for turn in self.turns)
+
+    def tokens(self):
+        return count_tokens(self.summary) + self._turn_tokens()
+
+    def add(self, role, content):
+        # A single turn may never take more than the window's share of the budget
+        content = _truncate(content.strip(), self.token_budget - self.summary_budget)
+        self.turns.append({"role": role, "content": content})
+        self._fit()
+
+    def _fit(self):
+        evicted = []
+        while len(self.turns) > self.window_turns or (
+                len(self.turns) > 1 and self._turn_tokens() > self.token_budget - self.summary_budget):
+            evicted.append(self.turns.pop(0))
+        if evicted:
+            self.evicted += len(evicted)
+            self.summary = self.summarize(self.summary, evicted)
+        lines = self.summary.splitlines()
+        while len(lines) > 1 and count_tokens("\n".join(lines)) > self.summary_budget:
+            lines.pop(0)
+        self.summary = _truncate("\n".join(lines), self.summary_budget) if lines else ""
+
+    def messages(self):
+        """Chat messages: the summary (if any) as a system message, then the recent turns"""
+        messages = []
+        if self.summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{self.summary}"})
+        return messages + [dict(turn) for turn in self.turns]
+
+    def render(self):
+        """The same memory as one text block, for prompts that take a single user message"""
+        parts = []
+        if self.summary:
+            parts.append(f"Earlier (summary):\n{self.summary}")
+        if self.turns:
+            parts.append("Recent:\n" + "\n".join(f"{turn['role']}: {turn['content']}" for turn in self.turns))
+        return "\n\n".join(parts)
+
+    def clear(self):
+        self.summary = ""
+        self.turns = []
@@ -0,0 +1,417 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.config import OPENAI_API_KEY, STORY_COMPACTION_INTERVAL_SECONDS, RESULTS_DB, HISTORY_INDEX_DB
+from utils.story_manager import StoryManager
+from utils.session_logger import SessionLogger
+from utils.text_parsing import format_dict_list
+from utils.skill_index import canonical_skill
+from utils.results_store import ResultsStore
+from utils.history_index import HistoryIndex
+from utils.metrics import registry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from chains.llm_pool import enable_client_pool
+import main
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+STORY_TIMEOUT_SECONDS = 3600
+FINISHED_SESSION_TTL_SECONDS = 600
+MAX_BODY_BYTES = 1024 * 1024
+SESSIONS_DIR = "sessions"
+
+class SessionClosed(Exception):
+    """Raised inside a workflow thread when its session is closed while it waits for a story"""
+
+class ServiceIO:
+    """Stands in for the cli module: display calls become events, story prompts wait for posted stories.
+
+    Every method runs on the workflow thread; notify is called after each event so the
+    event loop can wake up any streaming readers.
+    """
+    def __init__(self, resume_path, job_description_path, notify=None, story_timeout=STORY_TIMEOUT_SECONDS):
+        self.resume_path = resume_path
+        self.job_description_path = job_description_path
+        self.notify = notify or (lambda: None)
+        self.story_timeout = story_timeout
+        self.events = []
+        self.gaps = []
+        self.answered = []
+        self.pending = None
+        self._stories = {}
+        self._story_ready = threading.Condition()
+        self._closed = False
+
+    def emit(self, event, **data):
+        self.events.append({"event": event, **data})
+        self.notify()
+
+    def add_stories(self, stories):
+        """Queues answers keyed by skill; they can arrive before or after the matching prompt"""
+        with self._story_ready:
+            for skill, story in stories.items():
+                self._stories[canonical_skill(skill)] = story
+            self._story_ready.notify_all()
+
+    def close(self):
+        with self._story_ready:
+            self._closed = True
+            self._story_ready.notify_all()
+
+    def prompt_for_resume_path(self, default_path):
+        return self.resume_path
+
+    def prompt_for_job_description_path(self, default_path):
+        return self.job_description_path
+
+    def prompt_for_story(self, skill, question):
+        self.pending = {"skill": skill, "question": question}
+        self.emit("story_prompt", skill=skill, question=question)
+        key = canonical_skill(skill)
+        with self._story_ready:
+            found = self._story_ready.wait_for(lambda: key in self._stories or self._closed, self.story_timeout)
+            if self._closed:
+                raise SessionClosed(f"Session closed while waiting for a story about {skill}")
+            if not found:
+                raise SessionClosed(f"Timed out waiting for a story about {skill}")
+            story = self._stories.pop(key)
+        self.pending = None
+        return story.strip()
+
+    def display_alignment(self, alignment):
+        self.emit("alignment", alignment=alignment)
+
+    def display_gaps(self, gaps):
+        self.gaps = gaps
+        self.emit("gaps", gaps=gaps, text=format_dict_list(gaps, ["skill", "question"], section_title="Gaps"))
+
+    def display_story_already_answered(self, skill, summary):
+        self.answered.append({"skill": skill, "summary": summary})
+        self.emit("story_already_answered", skill=skill, summary=summary)
+
+    def display_story_saved(self):
+        self.emit("story_saved")
+
+    def display_no_experience(self):
+        self.emit("no_experience")
+
+    def display_story_deferred(self, skill):
+        self.emit("story_deferred", skill=skill)
+
+    def display_session_log_path(self, session_file):
+        self.emit("session_log", path=session_file)
+
+    def display_collect_stories_intro(self):
+        self.emit("collect_stories")
+
+    def display_error(self, message):
+        self.emit("error", message=str(message))
+
+    def display_analysis_mode(self, mode, similarity=None):
+        if similarity is None:
+            self.emit("analysis_mode", mode=mode)
+        else:
+            self.emit("analysis_mode", mode=mode, similarity=similarity)
+
+    def display_analyzing_job_fit(self):
+        self.emit("analyzing")
+
+    def display_banner(self):
+        pass
+
+class Session:
+    def __init__(self, session_id, io, logger, changed):
+        self.id = session_id
+        self.io = io
+        self.logger = logger
+        self.status = "running"
+        self.changed = changed
+        self.ended_at = None
+
+    def snapshot(self):
+        return {"session_id": self.id, "status": self.status, "gaps": self.io.gaps,
+                "answered": self.io.answered, "pending": self.io.pending}
+
+class WorkflowService:
+    """Runs many main.run_workflow sessions on one event loop.
+
+    Workflows are blocking, so each runs on a worker thread; they share the story store,
+    the results store, the history index, the pooled chat clients and the loaded chains.
+    Finished sessions are dropped `finished_ttl` seconds after their end event; their logs stay on disk.
+    """
+    def __init__(self, api_key=OPENAI_API_KEY, story_manager=None, sessions_dir=SESSIONS_DIR,
+                 max_workers=8, story_timeout=STORY_TIMEOUT_SECONDS, results_store=None, history_index=None,
+                 finished_ttl=FINISHED_SESSION_TTL_SECONDS):
+        self.api_key = api_key
+        self.results_store = results_store
+        self.history_index = history_index
+        self.story_manager = story_manager or StoryManager()
+        self.sessions_dir = sessions_dir
+        self.story_timeout = story_timeout
+        self.finished_ttl = finished_ttl
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="workflow")
+        self.sessions = {}
+        self._compaction_task = None
+
+    def start_session(self, resume_text, job_description, api_key=None):
+        """Stores the inputs under the session directory and starts the workflow; returns the Session"""
+        loop = asyncio.get_running_loop()
+        self.evict_finished()
+        session_id = uuid.uuid4().hex[:12]
+        session_dir = os.path.join(self.sessions_dir, "service", session_id)
+        os.makedirs(session_dir, exist_ok=True)
+        resume_path = os.path.join(session_dir, "resume.txt")
+        job_description_path = os.path.join(session_dir, "job_description.txt")
+        for path, text in ((resume_path, resume_text), (job_description_path, job_description)):
+            with open(path, "w") as f:
+                f.write(text)
+        changed = asyncio.Event()
+        io = ServiceIO(resume_path, job_description_path, lambda: loop.call_soon_threadsafe(changed.set), self.story_timeout)
+        logger = SessionLogger(session_file=os.path.join(session_dir, "session.txt"))
+        session = Session(session_id, io, logger, changed)
+        self.sessions[session_id] = session
+        future = loop.run_in_executor(self.executor, self._run, session, api_key or self.api_key)
+        future.add_done_callback(lambda _: session.changed.set())
+        return session
+
+    def _run(self, session, api_key):
+        try:
+            session.io.display_analyzing_job_fit()
+            main.run_workflow(api_key, session.io, self.story_manager, session.logger, results_store=self.results_store,
+                              history_index=self.history_index)
+            session.status = "done"
+        except SystemExit:
+            # run_workflow exits after reporting the error through the adapter
+            session.status = "failed"
+        except SessionClosed as e:
+            session.status = "closed"
+            session.io.emit("closed", message=str(e))
+        except Exception as e:
+            logging.exception("Workflow session %s failed", session.id)
+            session.status = "failed"
+            session.io.emit("error", message=str(e))
+        session.io.emit("end", status=session.status)
+        session.ended_at = time.monotonic()
+
+    def evict_finished(self, now=None):
+        """Forgets sessions that ended more than `finished_ttl` seconds ago; returns how many were dropped"""
+        now = time.monotonic() if now is None else now
+        expired = [sid for sid, s in self.sessions.items()
+                   if s.ended_at is not None and now - s.ended_at >= self.finished_ttl]
+        for session_id in expired:
+            del self.sessions[session_id]
+        return len(expired)
+
+    async def stream_events(self, session):
+        """Yields every event for the session, from the first, until the workflow ends"""
+        sent = 0
+        while True:
+            session.changed.clear()
+            events = session.io.events
+            while sent < len(events):
+                yield events[sent]
+                sent += 1
+            if session.status != "running" and sent == len(session.io.events):
+                return
+            await session.changed.wait()
+
+    def start_background_compaction(self, interval=STORY_COMPACTION_INTERVAL_SECONDS):
+        """Compacts the shared story bank every `interval` seconds while the service runs"""
+        if interval > 0 and self._compaction_task is None:
+            self._compaction_task = asyncio.get_running_loop().create_task(self._compact_periodically(interval))
+
+    async def _compact_periodically(self, interval):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                report = await loop.run_in_executor(self.executor, self.story_manager.compact)
+            except Exception:
+                logging.exception("Story compaction failed")
+                continue
+            if report["stories_after"] < report["stories_before"]:
+                logging.info("Compacted stories %d -> %d, prompt tokens %d -> %d",
+                             report["stories_before"], report["stories_after"],
+                             report["prompt_tokens_before"], report["prompt_tokens_after"])
+
+    def close(self):
+        if self._compaction_task is not None:
+            self._compaction_task.cancel()
+        for session in self.sessions.values():
+            session.io.close()
+        self.executor.shutdown(wait=False)
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+def _response_head(status, content_type, extra=None):
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", f"Content-Type: {content_type}", "Connection: close"]
+    lines += extra or []
+    return ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+async def _send(writer, status, body, content_type="application/json"):
+    data = (json.dumps(body) if content_type == "application/json" else body).encode()
+    writer.write(_response_head(status, content_type, [f"Content-Length: {len(data)}"]) + data)
+    await writer.drain()
+
+async def _read_request(reader):
+    request_line = (await reader.readline()).decode("latin-1").strip()
+    if not request_line:
+        return None
+    try:
+        method, target, _ = request_line.split(" ", 2)
+    except ValueError:
+        raise HttpError(400, "Malformed request line")
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1").strip()
+        if not line:
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length") or 0)
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413, "Request body too large")
+    body = {}
+    if length:
+        try:
+            body = json.loads(await reader.readexactly(length))
+        except json.JSONDecodeError:
+            raise HttpError(400, "Request body must be JSON")
+        if not isinstance(body, dict):
+            raise HttpError(400, "Request body must be a JSON object")
+    return method.upper(), target.split("?", 1)[0].rstrip("/"), body
+
+def _stories_from_body(body):
+    """Accepts {"skill": ..., "story": ...}, {"stories": [{...}]} or {"stories": {skill: story}}"""
+    stories = body.get("stories", [body] if "skill" in body else [])
+    if isinstance(stories, dict):
+        stories = [{"skill": skill, "story": story} for skill, story in stories.items()]
+    result = {}
+    for item in stories:
+        if not isinstance(item, dict) or not isinstance(item.get("skill"), str) or not isinstance(item.get("story"), str):
+            raise HttpError(400, "Each story needs a 'skill' and a 'story' string")
+        result[item["skill"]] = item["story"]
+    if not result:
+        raise HttpError(400, "No stories given")
+    return result
+
+class HttpFrontend:
+    """Minimal HTTP/1.1 JSON front end for a WorkflowService.
+
+    POST /sessions                {"resume", "job_description"} -> session id
+    GET  /sessions/<id>/events    NDJSON stream of workflow events
+    GET  /sessions/<id>/gaps      gaps, already-answered gaps and the pending story prompt
+    POST /sessions/<id>/stories   answers for gaps, by skill ("skip" for no experience)
+    GET  /sessions/<id>/log       the session log text
+    GET  /metrics                 Prometheus text-format metrics
+    """
+    def __init__(self, service):
+        self.service = service
+
+    async def handle(self, reader, writer):
+        try:
+            request = await _read_request(reader)
+            if request is not None:
+                await self.dispatch(writer, *request)
+        except HttpError as e:
+            await _send(writer, e.status, {"error": str(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            logging.exception("Request failed")
+            await _send(writer, 500, {"error": str(e)})
+        finally:
+            writer.close()
+
+    def _session(self, session_id):
+        session = self.service.sessions.get(session_id)
+        if session is None:
+            raise HttpError(404, f"Unknown session: {session_id}")
+        return session
+
+    async def dispatch(self, writer, method, path, body):
+        parts = path.strip("/").split("/")
+        if parts == ["metrics"] and method == "GET":
+            return await _send(writer, 200, registry.render(), METRICS_CONTENT_TYPE)
+        if parts == ["sessions"]:
+            if method != "POST":
+                raise HttpError(405, "Use POST to start a session")
+            resume, job_description = body.get("resume"), body.get("job_description")
+            if not isinstance(resume, str) or not isinstance(job_description, str):
+                raise HttpError(400, "Both 'resume' and 'job_description' text are required")
+            session = self.service.start_session(resume, job_description, body.get("api_key"))
+            return await _send(writer, 201, {"session_id": session.id})
+        if len(parts) != 3 or parts[0] != "sessions":
+            raise HttpError(404, f"No route for {path}")
+        session, action = self._session(parts[1]), parts[2]
+        if (method, action) == ("GET", "events"):
+            return await self.stream(writer, session)
+        if (method, action) == ("GET", "gaps"):
+            return await _send(writer, 200, session.snapshot())
+        if (method, action) == ("POST", "stories"):
+            if session.status != "running":
+                raise HttpError(409, f"Session is {session.status}")
+            session.io.add_stories(_stories_from_body(body))
+            return await _send(writer, 200, session.snapshot())
+        if (method, action) == ("GET", "log"):
+            return await _send(writer, 200, "\n".join(session.logger.entries) + "\n", "text/plain; charset=utf-8")
+        raise HttpError(404, f"No route for {method} {path}")
+
+    async def stream(self, writer, session):
+        writer.write(_response_head(200, "application/x-ndjson", ["Transfer-Encoding: chunked"]))
+        async for event in self.service.stream_events(session):
+            chunk = (json.dumps(event) + "\n").encode()
+            writer.write(f"{len(chunk):X}\r\n".encode() + chunk + b"\r\n")
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, service=None):
+    """Starts the HTTP front end and returns (server, service); the caller owns both"""
+    enable_client_pool()
+    service = service or WorkflowService()
+    server = await asyncio.start_server(HttpFrontend(service).handle, host, port)
+    return server, service
+
+def run():  # pragma: no cover
+    parser = argparse.ArgumentParser(description='Serve Applygorithminator sessions over local HTTP/JSON')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='Interface to bind (default: localhost only)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Port to listen on')
+    parser.add_argument('--workers', type=int, default=8, help='Maximum concurrently running workflows')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    async def serve_forever():
+        results_store = ResultsStore(RESULTS_DB) if RESULTS_DB else None
+        history_index = HistoryIndex(HISTORY_INDEX_DB, sessions_dir=SESSIONS_DIR) if HISTORY_INDEX_DB else None
+        if history_index is not None:
+            history_index.refresh()
+        server, service = await serve(args.host, args.port, WorkflowService(max_workers=args.workers,
+                                                                            results_store=results_store,
+                                                                            history_index=history_index))
+        service.start_background_compaction()
+        print(f"Applygorithminator service listening on http://{args.host}:{args.port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            service.close()
+
+    try:
+        asyncio.run(serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':  # pragma: no cover
+    run()
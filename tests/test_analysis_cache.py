@@ -0,0 +1,46 @@
+import os
+import tempfile
+from utils.analysis_cache import AnalysisCache, diff_resume, format_analysis, merge_delta, stories_fingerprint
+from utils.text_parsing import extract_alignment_section, extract_gaps_json
+
+RESUME = "Jane Doe\n\nEXPERIENCE\n- Built Python services\n- Led a team of 4\n- Ran on-call\n\nSKILLS\nPython, SQL\n"
+
+def test_diff_resume_reports_only_changed_lines():
+    edited = RESUME.replace("Led a team of 4", "Led a team of 6 across two sites")
+    diff, change = diff_resume(RESUME, edited)
+    assert "-- Led a team of 4" in diff and "+- Led a team of 6 across two sites" in diff
+    assert "Jane Doe" not in diff
+    assert 0 < change < 0.2
+    assert diff_resume(RESUME, RESUME) == ("", 0.0)
+
+def test_format_analysis_round_trips_through_parsers():
+    gaps = [{"skill": "Go", "question": "Tell me about Go"}]
+    text = format_analysis(["Python", "Leadership"], gaps)
+    assert extract_alignment_section(text) == ["Python", "Leadership"]
+    assert extract_gaps_json(text) == gaps
+
+def test_merge_delta_keeps_unaffected_items():
+    alignment = ["Python", "Leadership"]
+    gaps = [{"skill": "Go", "question": "q1"}, {"skill": "Kubernetes", "question": "q2"}]
+    merged_alignment, merged_gaps = merge_delta(
+        alignment, gaps,
+        added_alignment=["Kubernetes", "python"],
+        removed_alignment=["leadership"],
+        resolved=["KUBERNETES"],
+        new_gaps=[{"skill": "Rust", "question": "q3"}, {"skill": "go", "question": "dup"}])
+    assert merged_alignment == ["Python", "Kubernetes"]
+    assert merged_gaps == [{"skill": "Go", "question": "q1"}, {"skill": "Rust", "question": "q3"}]
+
+def test_stories_fingerprint_ignores_timestamps():
+    story = {"skill": "Python", "story": "s", "timestamp": "1"}
+    assert stories_fingerprint([story]) == stories_fingerprint([{**story, "timestamp": "2"}])
+    assert stories_fingerprint([story]) != stories_fingerprint([story, {"skill": "Go", "story": "t"}])
+
+def test_analysis_cache_is_keyed_by_job_description():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = AnalysisCache(os.path.join(temp_dir, "analysis"))
+        assert cache.load("JD one") is None
+        cache.save("JD one", RESUME, ["Python"], [], {"go": [False, "", 0.1]}, "stories")
+        entry = cache.load("JD one\n")
+        assert entry["resume"] == RESUME and entry["verdicts"] == {"go": [False, "", 0.1]}
+        assert cache.load("JD two") is None
@@ -0,0 +1,72 @@
+import os
+import json
+import tempfile
+import pytest
+from unittest.mock import MagicMock
+from utils.answers_file import AnswersFileIO, AnswersFileError, load_answers, write_unmatched_gaps
+from utils.skill_index import normalize_skill
+
+def write(temp_dir, name, text):
+    path = os.path.join(temp_dir, name)
+    with open(path, "w") as f:
+        f.write(text)
+    return path
+
+def test_normalize_skill():
+    assert normalize_skill("  Project   Management ") == "project management"
+
+def test_load_answers_json_and_yaml():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        json_path = write(temp_dir, "answers.json", json.dumps({"Python ": "Wrote a script.", "Go": "skip", "Rust": ""}))
+        assert load_answers(json_path) == {"python": "Wrote a script.", "go": "skip"}
+        yaml_path = write(temp_dir, "answers.yaml", "answers:\n  Kubernetes: |\n    Ran clusters.\n  COBOL: skip\n")
+        assert load_answers(yaml_path) == {"kubernetes": "Ran clusters.", "cobol": "skip"}
+
+def test_load_answers_accepts_filled_in_unmatched_file():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "out", "unmatched.json")
+        write_unmatched_gaps(path, [{"skill": "Go", "question": "Tell me about Go"}, {"skill": "Rust", "question": "q"}])
+        with open(path) as f:
+            entries = json.load(f)
+        assert entries[0] == {"skill": "Go", "question": "Tell me about Go", "story": ""}
+        entries[0]["story"] = "Built a Go service."
+        with open(path, "w") as f:
+            json.dump(entries, f)
+        assert load_answers(path) == {"go": "Built a Go service."}
+
+def test_load_answers_errors():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with pytest.raises(AnswersFileError):
+            load_answers(os.path.join(temp_dir, "missing.json"))
+        with pytest.raises(AnswersFileError):
+            load_answers(write(temp_dir, "bad.json", "{not json"))
+        with pytest.raises(AnswersFileError):
+            load_answers(write(temp_dir, "list.json", '["Python"]'))
+
+def test_answers_file_io_answers_defers_and_delegates():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cli = MagicMock()
+        unmatched_file = os.path.join(temp_dir, "unmatched.json")
+        io = AnswersFileIO(cli, {"python": "A Python story", "go": "skip"}, unmatched_file, resume_path="r.txt")
+        assert io.prompt_for_story("PYTHON", "q") == "A Python story"
+        assert io.prompt_for_story("Go", "q") == "skip"
+        assert io.prompt_for_story("Rust", "Tell me about Rust") is None
+        cli.prompt_for_story.assert_not_called()
+        with open(unmatched_file) as f:
+            assert [e["skill"] for e in json.load(f)] == ["Rust"]
+        assert io.prompt_for_resume_path("default") == "r.txt"
+        cli.prompt_for_job_description_path.return_value = "jd.txt"
+        assert io.prompt_for_job_description_path("default") == "jd.txt"
+        io.display_story_saved()
+        cli.display_story_saved.assert_called_once()
+
+def test_answers_file_io_interactive_fallback():
+    cli = MagicMock()
+    cli.prompt_for_story.return_value = "typed story"
+    io = AnswersFileIO(cli, {}, interactive=True)
+    assert io.prompt_for_story("Rust", "q") == "typed story"
+    assert io.unmatched == []
+
+def test_answers_match_skill_synonyms():
+    io = AnswersFileIO(MagicMock(), {"kubernetes": "Ran clusters."})
+    assert io.prompt_for_story("K8s", "q") == "Ran clusters."
@@ -0,0 +1,33 @@
+import argparse
+from unittest.mock import MagicMock
+from applygorithminator import build_customization_steps
+
+PROMPTS = {f"Prompt #{n}": f"Rewrite step {n}" for n in range(1, 9)}
+
+def parallel_steps(errors, draft="merged draft"):
+    customizer = MagicMock()
+    customizer.prompts = PROMPTS
+    customizer.parallel_section_prompts.return_value = [2, 3, 4, 5]
+    customizer.apply_section_prompts_parallel.return_value = (draft, errors)
+    args = argparse.Namespace(parallel=True, section_scoped=True, edit_ops=False)
+    return customizer, build_customization_steps(customizer, "resume", "job", args)
+
+def test_parallel_section_prompts_collapse_into_one_step():
+    customizer, steps = parallel_steps([])
+    assert [step["label"] for step in steps] == ["Prompt #1", "Prompt #2, Prompt #3, Prompt #4, Prompt #5",
+                                                 "Prompt #6", "Prompt #7", "Prompt #8"]
+    assert steps[1]["speculative"] is False
+    assert steps[1]["run"]("base") == ("merged draft", None)
+    customizer.apply_section_prompts_parallel.assert_called_once_with("base", "job", [2, 3, 4, 5],
+                                                                      original_resume="resume")
+
+def test_parallel_step_keeps_partial_results():
+    _, steps = parallel_steps(["skills: no skills section in the current resume"])
+    assert steps[1]["run"]("base") == ("merged draft", None)
+
+def test_parallel_step_fails_when_every_section_group_fails():
+    errors = ["summary: timeout", "experience: timeout", "skills: timeout"]
+    _, steps = parallel_steps(errors, draft="base")
+    result, error = steps[1]["run"]("base")
+    assert result is None
+    assert error == "every section rewrite failed: " + "; ".join(errors)
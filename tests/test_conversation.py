@@ -0,0 +1,60 @@
+from unittest.mock import patch
+import pytest
+from memory.conversation import ConversationMemory, extractive_summary
+
+@pytest.fixture(autouse=True)
+def estimated_tokens():
+    # ~4 characters per token, so the budgets below don't depend on tiktoken
+    with patch('utils.token_budget._encoder', return_value=None):
+        yield
+
+def test_recent_turns_are_kept_verbatim():
+    memory = ConversationMemory(token_budget=500, window_turns=4)
+    memory.add("user", "Make the summary shorter.")
+    memory.add("assistant", "Revised 1 line(s): Senior engineer...")
+    assert memory.summary == ""
+    assert memory.messages() == [{"role": "user", "content": "Make the summary shorter."},
+                                 {"role": "assistant", "content": "Revised 1 line(s): Senior engineer..."}]
+
+def test_old_turns_fold_into_summary():
+    memory = ConversationMemory(token_budget=500, window_turns=2)
+    memory.add("user", "Mention Kubernetes. Also other things.")
+    memory.add("assistant", "Done.")
+    memory.add("user", "Drop the hobbies section.")
+    assert [t["content"] for t in memory.turns] == ["Done.", "Drop the hobbies section."]
+    assert memory.summary == "user: Mention Kubernetes."
+    assert memory.messages()[0]["role"] == "system"
+    assert "Earlier (summary):\nuser: Mention Kubernetes." in memory.render()
+
+def test_size_stays_bounded_over_a_long_session():
+    memory = ConversationMemory(token_budget=200, window_turns=6)
+    sizes = []
+    for i in range(200):
+        memory.add("user", f"Request {i}: please rework bullet {i} to stress impact and metrics. " * 3)
+        memory.add("assistant", f"Revised 2 line(s): bullet {i} now leads with the result.")
+        sizes.append(memory.tokens())
+    assert max(sizes) <= 200
+    assert min(sizes[50:]) > 100  # the summary keeps older context once the window is full
+    assert memory.evicted == 400 - len(memory.turns)
+    assert "Request 199" in memory.render()
+
+def test_oversized_turn_is_truncated():
+    memory = ConversationMemory(token_budget=100)
+    memory.add("user", "word " * 1000)
+    assert memory.tokens() <= 100
+    assert memory.turns[0]["content"].endswith("...")
+
+def test_pluggable_summarizer():
+    calls = []
+    def summarize(summary, turns):
+        calls.append([t["content"] for t in turns])
+        return "condensed"
+    memory = ConversationMemory(token_budget=500, window_turns=1, summarize=summarize)
+    memory.add("user", "first")
+    memory.add("user", "second")
+    assert calls == [["first"]] and memory.summary == "condensed"
+    memory.clear()
+    assert memory.render() == ""
+
+def test_extractive_summary_appends_lines():
+    assert extractive_summary("user: a", [{"role": "assistant", "content": "Did b. Then c."}]) == "user: a\nassistant: Did b."
@@ -0,0 +1,58 @@
+import os
+import tempfile
+import threading
+import pytest
+from unittest.mock import patch, MagicMock
+import daemon
+from utils.daemon_client import DaemonClient
+from utils.text_parsing import LLMJsonParseError
+
+def test_handle_request_ping():
+    assert daemon.handle_request({"op": "ping"}) == "pong"
+
+def test_handle_request_unknown_op():
+    with pytest.raises(ValueError):
+        daemon.handle_request({"op": "nope"})
+
+def test_handle_request_job_fit_uses_caller_key():
+    with patch('daemon.run_job_fit_chain', return_value="content='ALIGNMENT:'") as mock_chain:
+        result = daemon.handle_request({"op": "job_fit", "params": {
+            "combined_experience": "Resume:\nr", "job_description": "jd", "api_key": "caller-key"}})
+    assert result == "content='ALIGNMENT:'"
+    mock_chain.assert_called_once_with("Resume:\nr", "jd", "caller-key")
+
+def test_handle_request_gap_explain():
+    stories = [{"skill": "Go", "story": "Built a CLI."}]
+    with patch('daemon.explain_gap_verdict', return_value="The Go story shows it") as mock_explain:
+        result = daemon.handle_request({"op": "gap_explain", "params": {
+            "gap_skill": "Go", "question": "q", "stories": stories, "api_key": "k"}})
+    assert result == "The Go story shows it"
+    mock_explain.assert_called_once_with("Go", "q", stories, "k")
+
+@pytest.fixture
+def running_daemon():
+    socket_path = os.path.join(tempfile.mkdtemp(), "daemon.sock")
+    with patch('daemon.enable_client_pool'):
+        server = daemon.create_server(socket_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield socket_path
+    server.shutdown()
+    server.server_close()
+
+def test_client_round_trip(running_daemon):
+    client = DaemonClient(running_daemon, timeout=5)
+    assert client.ping()
+    with patch('daemon.story_answers_gap_llm', return_value=(True, 'Matched', 0.9)):
+        verdict = client.story_answers_gap_llm('Python', 'Tell me', [{'skill': 'Python', 'story': 's'}], 'key')
+    assert verdict == (True, 'Matched', 0.9)
+    assert oct(os.stat(running_daemon).st_mode & 0o777) == oct(0o600)
+
+def test_client_reraises_parse_errors(running_daemon):
+    client = DaemonClient(running_daemon, timeout=5)
+    with patch('daemon.story_answers_gap_llm', side_effect=LLMJsonParseError('bad json')):
+        with pytest.raises(LLMJsonParseError, match='bad json'):
+            client.story_answers_gap_llm('Python', 'Tell me', [], 'key')
+
+def test_client_ping_without_daemon():
+    assert DaemonClient(os.path.join(tempfile.mkdtemp(), "missing.sock")).ping() is False
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import numpy as np
+from unittest.mock import patch
+from utils import embedding_index
+from utils.embedding_index import EmbeddingIndex, HashingVectorizer
+from tools.bench_embedding_index import bench
+
+def test_hashing_vectorizer_is_deterministic_and_normalized():
+    embed = HashingVectorizer(64)
+    vector = embed("Led a Kubernetes migration")
+    assert vector.shape == (64,) and vector.dtype == np.float32
+    assert np.isclose(np.linalg.norm(vector), 1.0)
+    assert np.array_equal(vector, embed("led a kubernetes migration!"))
+    assert not embed("").any()
+
+def test_search_ranks_by_cosine_and_survives_reopen():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        index = EmbeddingIndex(temp_dir, dimensions=128)
+        index.add("k8s", "Migrated services onto Kubernetes clusters")
+        index.add("py", "Built Python data pipelines")
+        index.add("hire", "Ran hiring and mentored engineers")
+        assert index.search("kubernetes clusters", 1)[0][0] == "k8s"
+        reopened = EmbeddingIndex(temp_dir, dimensions=128)
+        assert len(reopened) == 3 and reopened.ids() == ["k8s", "py", "hire"]
+        assert [item_id for item_id, _ in reopened.search("python pipelines", 2)][0] == "py"
+        assert EmbeddingIndex(os.path.join(temp_dir, "empty")).search("anything") == []
+
+def test_chunked_search_matches_brute_force():
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((1000, 16)).astype(np.float32)
+    query = rng.standard_normal(16).astype(np.float32)
+    with tempfile.TemporaryDirectory() as temp_dir, patch.object(embedding_index, "SEARCH_CHUNK_ROWS", 37):
+        index = EmbeddingIndex(temp_dir, dimensions=16)
+        index.add_vectors([str(i) for i in range(1000)], vectors)
+        results = index.search("", 7, vector=query)
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:7]
+    assert [int(item_id) for item_id, _ in results] == list(expected)
+
+def test_half_written_row_is_ignored_and_trimmed():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        index = EmbeddingIndex(temp_dir, dimensions=8)
+        index.add_vectors(["a"], [np.ones(8)])
+        with open(index.vectors_file, "ab") as f:
+            f.write(b"\0" * 12)
+        reopened = EmbeddingIndex(temp_dir, dimensions=8)
+        assert len(reopened) == 1
+        reopened.add_vectors(["b"], [np.arange(8)])
+        assert os.path.getsize(reopened.vectors_file) == 2 * 8 * 4
+        assert reopened.ids() == ["a", "b"]
+
+def test_rebuild_replaces_contents():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        index = EmbeddingIndex(temp_dir, dimensions=32)
+        index.add("old", "stale story")
+        index.rebuild([("new", "fresh story")])
+        assert index.ids() == ["new"]
+
+def test_bench_small():
+    result = bench(300, dimensions=16, queries=3, batch=128)
+    assert result["size"] == 300 and result["query_p50_ms"] >= 0
@@ -0,0 +1,28 @@
+import os
+import json
+import tempfile
+from unittest.mock import MagicMock
+from utils.health_check import cached_health_check
+
+def test_successful_check_is_cached():
+    cache_file = os.path.join(tempfile.mkdtemp(), "health.json")
+    check = MagicMock(return_value=True)
+    assert cached_health_check(check, "key", 60, cache_file) == (True, False)
+    assert cached_health_check(check, "key", 60, cache_file) == (True, True)
+    check.assert_called_once()
+    with open(cache_file) as f:
+        assert "key" not in json.load(f).values()
+
+def test_cache_expires_and_is_per_key():
+    cache_file = os.path.join(tempfile.mkdtemp(), "health.json")
+    check = MagicMock(return_value=True)
+    cached_health_check(check, "key", 60, cache_file)
+    assert cached_health_check(check, "other-key", 60, cache_file) == (True, False)
+    assert cached_health_check(check, "other-key", 0, cache_file) == (True, False)
+    assert check.call_count == 3
+
+def test_failures_are_not_cached():
+    cache_file = os.path.join(tempfile.mkdtemp(), "health.json")
+    check = MagicMock(return_value=False)
+    assert cached_health_check(check, "key", 60, cache_file) == (False, False)
+    assert not os.path.exists(cache_file)
@@ -0,0 +1,152 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+import pytest
+from utils import hedging
+from utils.hedging import TTFTTracker, HedgeBudget, hedged_call, hedged_invoke
+from utils.metrics import registry
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    registry.clear()
+    yield
+    registry.clear()
+
+def primed_tracker(seconds=0.01):
+    tracker = TTFTTracker(min_samples=3)
+    for _ in range(3):
+        tracker.observe("job_fit", seconds)
+    return tracker
+
+def answer(attempt, text, tokens=100):
+    attempt.first_token()
+    attempt.tokens = tokens
+    return text
+
+def stall(attempt, tokens=40):
+    """Never streams a token; stops once cancelled"""
+    attempt.cancel_event.wait(5)
+    attempt.tokens = tokens
+    return "stalled"
+
+def test_threshold_is_the_percentile_of_recent_samples():
+    tracker = TTFTTracker(percentile=0.9, min_samples=5)
+    for seconds in (0.1, 0.2, 0.3, 0.4):
+        tracker.observe("intent", seconds)
+    assert tracker.threshold("intent") is None
+    for seconds in range(5, 11):
+        tracker.observe("intent", seconds / 10)
+    assert tracker.threshold("intent") == 0.9
+    assert tracker.threshold("job_fit") is None
+
+def test_no_hedge_without_enough_samples():
+    calls = []
+    result = hedged_call("job_fit", lambda attempt: calls.append(attempt) or answer(attempt, "ok"),
+                         tracker=TTFTTracker(), budget=HedgeBudget(1000))
+    assert result == "ok"
+    assert len(calls) == 1
+    assert hedging.hedges.value(chain="job_fit", winner="hedge") == 0
+
+def test_slow_first_token_fires_a_hedge_that_wins():
+    budget = HedgeBudget(1000)
+    primary_done = threading.Event()
+
+    def fn(attempt):
+        if attempt.index == 0:
+            try:
+                return stall(attempt)
+            finally:
+                primary_done.set()
+        return answer(attempt, "fast")
+
+    assert hedged_call("job_fit", fn, estimated_tokens=50, tracker=primed_tracker(), budget=budget) == "fast"
+    assert primary_done.wait(2)
+    assert hedging.hedges.value(chain="job_fit", winner="hedge") == 1
+    # The 50 reserved for the hedge are settled to the cancelled primary's actual 40 tokens
+    deadline = time.time() + 2
+    while budget.spent != 40 and time.time() < deadline:
+        time.sleep(0.005)
+    assert budget.spent == 40
+    assert hedging.hedge_extra_tokens.value(chain="job_fit") == 40
+
+def test_exhausted_budget_waits_for_the_primary():
+    def fn(attempt):
+        attempt.cancel_event.wait(0.05)
+        return answer(attempt, f"attempt {attempt.index}")
+
+    result = hedged_call("job_fit", fn, estimated_tokens=50, tracker=primed_tracker(), budget=HedgeBudget(10))
+    assert result == "attempt 0"
+    assert hedging.hedges_skipped.value(chain="job_fit") == 1
+    assert hedging.hedges.value(chain="job_fit", winner="primary") == 0
+
+def test_failed_primary_falls_through_to_the_hedge():
+    hedge_started = threading.Event()
+
+    def fn(attempt):
+        if attempt.index == 0:
+            hedge_started.wait(2)
+            raise TimeoutError("upstream timed out")
+        hedge_started.set()
+        attempt.cancel_event.wait(0.05)
+        return answer(attempt, "hedge")
+
+    assert hedged_call("job_fit", fn, tracker=primed_tracker(), budget=HedgeBudget(1000)) == "hedge"
+
+def test_hedged_invoke_disabled_uses_invoke():
+    chain = MagicMock()
+    chain.invoke.return_value = "result"
+    assert hedged_invoke(chain, {"job_description": "JD"}, "job_fit", enabled=False) == "result"
+    chain.stream.assert_not_called()
+
+class Chunk:
+    def __init__(self, content, usage_metadata=None):
+        self.content = content
+        self.usage_metadata = usage_metadata
+
+    def __add__(self, other):
+        return Chunk(self.content + other.content, other.usage_metadata or self.usage_metadata)
+
+def test_hedged_invoke_streams_and_merges_chunks():
+    chain = MagicMock()
+    chain.stream.return_value = iter([Chunk(""), Chunk("ALIGNMENT:"), Chunk(" Python"),
+                                      Chunk("", {"input_tokens": 30, "output_tokens": 5})])
+    result = hedged_invoke(chain, {"job_description": "JD"}, "job_fit", enabled=True)
+    assert result.content == "ALIGNMENT: Python"
+    assert result.usage_metadata == {"input_tokens": 30, "output_tokens": 5}
+    chain.invoke.assert_not_called()
+
+def test_budget_reserves_before_hedging():
+    budget = HedgeBudget(100)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(budget.allows(30))) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count(True) == 3 and budget.spent == 90
+    budget.charge(30, 12)
+    assert budget.spent == 72
+
+def test_time_queued_for_a_worker_is_not_time_to_first_token():
+    tracker = TTFTTracker(min_samples=1)
+    busy = ThreadPoolExecutor(max_workers=1)
+    release = threading.Event()
+    busy.submit(release.wait, 2)
+    threading.Timer(0.2, release.set).start()
+    result = hedged_call("intent", lambda attempt: answer(attempt, "ok"), tracker=tracker, budget=HedgeBudget(0),
+                         executor=busy)
+    busy.shutdown()
+    assert result == "ok"
+    assert tracker.threshold("intent") < 0.1
+
+def test_each_call_gets_its_own_threads():
+    names = []
+
+    def fn(attempt):
+        names.append(threading.current_thread().name)
+        return answer(attempt, "ok")
+
+    for _ in range(2):
+        hedged_call("intent", fn, tracker=TTFTTracker(), budget=HedgeBudget(0))
+    assert all(name.startswith("hedge-intent") for name in names)
@@ -0,0 +1,107 @@
+import os
+import json
+import pytest
+from utils.history_index import HistoryIndex, parse_session_log, company_hint, similarity
+from utils.session_logger import SessionLogger
+
+RESUME = "Jane Doe\nSenior data engineer. Python, Spark, Airflow."
+JOB = ("Senior Data Engineer\nCompany: Acme Analytics\nWe are hiring a data engineer to build streaming pipelines "
+       "with Kafka and Spark, own our feature store, and mentor two junior engineers. Remote in the US.")
+ANALYSIS = ('Alignment:\n- Python and Spark pipelines\n\nGaps:\n'
+            '```json\n[{"skill": "Kafka", "question": "Tell me about Kafka"}]\n```')
+
+def write_session(directory, name, resume=RESUME, job=JOB, analysis=ANALYSIS, mode=None, stories=True):
+    logger = SessionLogger(session_file=os.path.join(directory, name))
+    logger.log_session_header("resume.txt", "job.txt", resume, job)
+    if mode:
+        logger.log(f"Analysis mode: {mode}")
+    logger.log_output(analysis)
+    if stories:
+        logger.log_story_already_answered("Spark", "Built Spark jobs")
+        logger.log_story_response("Kafka", "Tell me about Kafka", "Ran a Kafka cluster")
+    logger.log("Gap check cascade: 1 gaps checked")
+    logger.save()
+    return logger.session_file
+
+@pytest.fixture
+def history(tmp_path):
+    sessions = tmp_path / "sessions"
+    resumes = tmp_path / "resumes"
+    resumes.mkdir()
+    stories = tmp_path / "stories.json"
+    stories.write_text(json.dumps({"stories": [
+        {"skill": "Terraform", "story": "Moved our AWS accounts to Terraform modules", "has_experience": True},
+        {"skill": "Rust", "story": "No relevant experience", "has_experience": False}]}))
+    (resumes / "customized_resume_1.txt").write_text("Jane Doe\nBuilt a feature store on Snowflake")
+    (resumes / "original_resume_1.txt").write_text("Jane Doe\nSnowflake original")
+    index = HistoryIndex(str(tmp_path / "history.db"), sessions_dir=str(sessions), resumes_dir=str(resumes),
+                         stories_file=str(stories))
+    yield index, sessions
+    index.close()
+
+def test_parse_session_log_reads_a_saved_session(tmp_path):
+    path = write_session(str(tmp_path), "session_1.txt", mode="cached")
+    with open(path) as f:
+        session = parse_session_log(f.read())
+    assert session["resume"] == RESUME
+    assert session["job_description"] == JOB
+    assert session["analysis"] == ANALYSIS
+    assert session["skills"] == ["Spark", "Kafka"]
+    assert parse_session_log("=== Applygorithminator Session Log ===\nTimestamp: None\n") is None
+
+def test_company_hint_and_similarity():
+    assert company_hint(JOB) == "Acme Analytics"
+    assert company_hint("Data engineer\nAbout Initech\nWe make TPS reports") == "Initech"
+    assert company_hint("About the role\nBuild things") == ""
+    assert similarity(JOB, JOB) == 1.0
+    assert similarity(JOB, "Barista, weekend shifts") == 0.0
+
+def test_refresh_is_incremental(history):
+    index, sessions = history
+    first = write_session(str(sessions), "session_1.txt")
+    assert index.refresh() == 3  # session, customized resume, story bank
+    assert index.refresh() == 0
+    write_session(str(sessions), "session_2.txt", job="Backend engineer at Initech, Go and Postgres",
+                  analysis="Alignment:\n- Go", stories=False)
+    assert index.refresh() == 1
+    os.remove(first)
+    assert index.refresh() == 0
+    assert [r["path"] for r in index.search("Kafka", kind="session")] == []
+    assert index.find_reusable_analysis(RESUME, JOB) is None
+
+def test_search_by_phrase_skill_company_and_kind(history):
+    index, sessions = history
+    write_session(str(sessions), "session_1.txt")
+    write_session(os.path.join(str(sessions), "service", "abc"), "session.txt",
+                  job="Backend engineer at Initech, Go and Postgres", analysis="Alignment:\n- Go", stories=False)
+    index.refresh()
+    phrase = index.search('"feature store"')
+    assert {r["kind"] for r in phrase} == {"session", "resume"}
+    assert all("original_resume" not in r["path"] for r in phrase)
+    assert [r["path"] for r in index.search(skill="Kafka")] == [os.path.join(str(sessions), "session_1.txt")]
+    assert [r["company"] for r in index.search(company="acme")] == ["Acme Analytics"]
+    assert [r["path"] for r in index.search("Postgres")] == [os.path.join(str(sessions), "service", "abc", "session.txt")]
+    stories = index.search("Terraform", kind="story")
+    assert len(stories) == 1 and "stories.json#" in stories[0]["path"]
+    assert stories[0]["title"] == "Terraform" and "[Terraform]" in stories[0]["snippet"]
+    assert index.search("Rust", kind="story") == []
+    assert index.search("") == []
+    assert index.search('"') == []
+    assert index.search(skill="++") == [] and index.search(company="&") == []
+    assert [r["company"] for r in index.search(company="&", skill="Kafka")] == ["Acme Analytics"]
+    assert [r["company"] for r in index.search(company="Acme Analytics")] == ["Acme Analytics"]
+
+def test_find_reusable_analysis(history):
+    index, sessions = history
+    write_session(str(sessions), "session_1.txt")
+    index.refresh()
+    exact = index.find_reusable_analysis(RESUME, "  " + JOB.replace(" ", "  "))
+    assert exact["similarity"] == 1.0
+    assert exact["alignment"] == ["Python and Spark pipelines"]
+    assert exact["gaps"] == [{"skill": "Kafka", "question": "Tell me about Kafka"}]
+    assert index.find_reusable_analysis(RESUME, JOB + " Apply by Friday.") is None
+    reposted = index.find_reusable_analysis(RESUME, JOB + " Apply by Friday.", min_similarity=0.9)
+    assert reposted is not None and 0.9 <= reposted["similarity"] < 1.0
+    assert index.find_reusable_analysis(RESUME + "\nAlso Go.", JOB) is None
+    assert index.find_reusable_analysis(RESUME, "Backend engineer at Initech, Go and Postgres") is None
+    assert index.find_reusable_analysis(RESUME, JOB, min_similarity=0) is None
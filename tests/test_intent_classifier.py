@@ -0,0 +1,54 @@
+from utils.intent_classifier import (
+    classify_intent, evaluate, KeywordIntentModel, EVALUATION_SAMPLES, TRAINING_SAMPLES,
+)
+
+def test_classify_intent_move_on():
+    for message in ["next", "Looks good, let's move on.", "That's great!", "ok continue", "LGTM"]:
+        assert classify_intent(message) == {"action": "move_on", "refinement": None}, message
+
+def test_classify_intent_refine():
+    result = classify_intent("Can you add that I led a team of 8?")
+    assert result == {"action": "refine", "refinement": "Can you add that I led a team of 8?"}
+    assert classify_intent("make it punchier")["action"] == "refine"
+
+def test_classify_intent_contrast_extracts_refinement():
+    result = classify_intent("Looks good but add Terraform to the skills.")
+    assert result == {"action": "refine", "refinement": "add Terraform to the skills"}
+
+def test_classify_intent_defers_ambiguous_messages():
+    assert classify_intent("") is None
+    assert classify_intent("hmm not sure") is None
+    assert classify_intent("what do you mean?") is None
+
+def test_classify_intent_polite_move_on_is_not_a_refinement():
+    for message in ["move to the next one", "use it as is", "Could you move on?", "can we keep going"]:
+        assert classify_intent(message) == {"action": "move_on", "refinement": None}, message
+    assert classify_intent("could you highlight the migration project")["action"] == "refine"
+
+def test_classify_intent_negated_acceptance_goes_to_llm():
+    for message in ["this is not good", "not happy with this", "I don't like it", "that isn't great",
+                    "Not great but add Terraform"]:
+        assert classify_intent(message) is None, message
+
+def test_classify_intent_weak_opener_without_a_change_goes_to_llm():
+    for message in ["change nothing", "too good, next", "Change nothing, next section"]:
+        assert classify_intent(message) is None, message
+    assert classify_intent("change the title to staff engineer")["action"] == "refine"
+    assert classify_intent("too long, shorten it")["action"] == "refine"
+
+def test_keyword_model_predicts_trained_labels():
+    model = KeywordIntentModel()
+    for message, action in TRAINING_SAMPLES:
+        assert model.predict(message)[0] == action
+
+def test_evaluate_reports_accuracy_and_coverage():
+    stats = evaluate([("next", "move_on"), ("add python", "refine"), ("hmm", "clarify")], classify_intent)
+    assert stats["samples"] == 3
+    assert stats["coverage"] == 2 / 3
+    assert stats["accuracy"] == 1.0
+    assert stats["mean_latency_ms"] >= 0
+
+def test_evaluation_samples_never_misclassified():
+    stats = evaluate(EVALUATION_SAMPLES, classify_intent)
+    assert stats["accuracy"] == 1.0
+    assert stats["coverage"] >= 0.7
@@ -0,0 +1,124 @@
+import csv
+import gzip
+import json
+import time
+import threading
+import pytest
+from unittest.mock import patch, MagicMock
+from utils.jd_feed import (
+    FeedError,
+    clean_description,
+    iter_postings,
+    normalize_posting,
+    process_postings,
+)
+from utils.requirements_cache import jd_key
+from tools.analyze_feed import analyze_posting, result_record
+
+def write_jsonl(path, records, compress=False):
+    lines = "".join((r if isinstance(r, str) else json.dumps(r)) + "\n" for r in records)
+    if compress:
+        with gzip.open(path, "wt") as f:
+            f.write(lines)
+    else:
+        path.write_text(lines)
+
+def test_clean_description_strips_html_and_whitespace():
+    text = "<p>Build   <b>data</b> pipelines</p><ul><li>Python &amp; Go</li></ul>\r\n\r\n\r\n\r\nRemote"
+    assert clean_description(text) == "Build data pipelines\nPython & Go\n\nRemote"
+
+def test_normalize_posting_maps_common_field_names():
+    posting = normalize_posting({"Job_Title": " Staff  Engineer ", "Company_Name": "Acme", "job_id": "42",
+                                 "Description": "Python required"}, "feed.jsonl:1")
+    assert posting == {"id": "42", "title": "Staff Engineer", "company": "Acme", "description": "Python required",
+                       "source": "feed.jsonl:1", "key": jd_key("Python required")}
+    assert normalize_posting({"title": "No body"}) is None
+    assert normalize_posting(["not", "a", "record"]) is None
+
+def test_jsonl_and_gzip_feeds_are_deduplicated(tmp_path):
+    write_jsonl(tmp_path / "a.jsonl", [{"id": 1, "description": "Python role"}, "{broken",
+                                       {"id": 2, "description": "Go role"}])
+    write_jsonl(tmp_path / "b.jsonl.gz", [{"id": 3, "description": "Python   role"}, {"id": 4, "description": "Rust role"}],
+                compress=True)
+    postings = list(iter_postings([str(tmp_path / "a.jsonl"), str(tmp_path / "b.jsonl.gz")]))
+    assert [p["id"] for p in postings] == ["1", "2", "4"]
+    assert postings[2]["source"].endswith("b.jsonl.gz:2")
+
+def test_csv_feed_with_large_fields(tmp_path):
+    path = tmp_path / "jobs.csv"
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, ["title", "company", "description"])
+        writer.writeheader()
+        writer.writerow({"title": "SRE", "company": "Initech", "description": "Kubernetes\n" + "x" * 200000})
+        writer.writerow({"title": "Empty", "company": "Initech", "description": ""})
+    postings = list(iter_postings(str(path)))
+    assert len(postings) == 1
+    assert postings[0]["title"] == "SRE"
+    assert postings[0]["description"].startswith("Kubernetes\n")
+
+def test_directory_of_mixed_sources(tmp_path):
+    (tmp_path / "nested").mkdir()
+    (tmp_path / "nested" / "posting.txt").write_text("Data engineer")
+    write_jsonl(tmp_path / "feed.ndjson", [{"description": "Data engineer"}, {"description": "ML engineer"}])
+    (tmp_path / "notes.pdf").write_text("ignored")
+    postings = list(iter_postings(str(tmp_path)))
+    assert [p["description"] for p in postings] == ["Data engineer", "ML engineer"]
+    assert postings[0]["source"].endswith("feed.ndjson:1")
+
+def test_missing_source_raises(tmp_path):
+    with pytest.raises(FeedError):
+        list(iter_postings(str(tmp_path / "missing.jsonl")))
+
+def test_postings_are_read_lazily(tmp_path):
+    write_jsonl(tmp_path / "feed.jsonl", [{"description": f"Role {i}"} for i in range(1000)])
+    postings = iter_postings(str(tmp_path / "feed.jsonl"))
+    assert next(postings)["description"] == "Role 0"
+
+def test_process_postings_bounds_work_in_flight():
+    read = []
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def feed():
+        for i in range(20):
+            read.append(i)
+            yield {"id": i}
+
+    def handle(posting):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.005)
+        with lock:
+            running[0] -= 1
+        if posting["id"] == 7:
+            raise ValueError("bad posting")
+        return posting["id"] * 2
+
+    results = []
+    for posting, result, error in process_postings(feed(), handle, workers=2, max_pending=3):
+        # The feed never runs more than max_pending postings ahead of what has been yielded
+        assert len(read) - len(results) <= 3
+        results.append((posting["id"], result, error))
+    assert peak[0] <= 2
+    assert sorted(r[0] for r in results) == list(range(20))
+    failed = [r for r in results if r[2] is not None]
+    assert [(r[0], str(r[2])) for r in failed] == [(7, "bad posting")]
+    assert all(result == i * 2 for i, result, error in results if error is None)
+
+def test_analyze_posting_records_alignment_gaps_and_verdicts():
+    posting = normalize_posting({"id": "7", "title": "SRE", "company": "Acme", "description": "Kubernetes"}, "f.jsonl:1")
+    gaps = [{"skill": "Kubernetes", "question": "Q1"}, {"skill": "Go", "question": "Q2"}]
+    story_manager = MagicMock()
+    with patch("main.run_job_fit_analysis", return_value="output") as run, \
+         patch("main.parse_job_fit_output", return_value=(["Python"], gaps)), \
+         patch("main.analyze_gaps_with_llm", return_value=([{"gap": gaps[0], "summary": "s", "confidence": 0.9}],
+                                                           [gaps[1]])):
+        result = analyze_posting(posting, "resume", "key", story_manager)
+    run.assert_called_once_with("resume", "Kubernetes", "key")
+    assert result == {"alignment": ["Python"], "gaps": gaps,
+                      "answered": [{"skill": "Kubernetes", "summary": "s", "confidence": 0.9}], "unanswered": ["Go"],
+                      "verdicts": [{"skill": "Kubernetes", "answered": True, "summary": "s", "confidence": 0.9},
+                                   {"skill": "Go", "answered": False, "summary": None, "confidence": None}],
+                      "calls": []}
+    record = result_record(posting, None, ValueError("boom"))
+    assert record["error"] == "ValueError: boom" and record["company"] == "Acme" and "gaps" not in record
@@ -10,7 +10,7 @@ def test_run_job_fit_chain_basic(mock_chat_openai):
     mock_chain.invoke.return_value = {'content': 'Test output'}
     with patch.object(job_fit_chain, 'job_fit_prompt', create=True) as mock_prompt:
         mock_prompt.__or__.return_value = mock_chain
-        result = job_fit_chain.run_job_fit_chain('resume text', 'job description', 'fake-key')
+        result = job_fit_chain.run_job_fit_chain('resume text', 'job description', 'fake-key', two_stage=False)
         assert result == {'content': 'Test output'}
         mock_chain.invoke.assert_called_once()
         args, kwargs = mock_chain.invoke.call_args
@@ -25,9 +25,113 @@ def test_run_job_fit_chain_empty_inputs(mock_chat_openai):
     mock_chain.invoke.return_value = {'content': ''}
     with patch.object(job_fit_chain, 'job_fit_prompt', create=True) as mock_prompt:
         mock_prompt.__or__.return_value = mock_chain
-        result = job_fit_chain.run_job_fit_chain('', '', 'fake-key')
+        result = job_fit_chain.run_job_fit_chain('', '', 'fake-key', two_stage=False)
         assert result == {'content': ''}
         mock_chain.invoke.assert_called_once()
         args, kwargs = mock_chain.invoke.call_args
         assert args[0]['combined_experience'] == ''
-        assert args[0]['job_description'] == '' 
\ No newline at end of file
+        assert args[0]['job_description'] == '' 
+@patch('chains.job_fit_chain.ChatOpenAI')
+def test_run_job_fit_delta_chain(mock_chat_openai):
+    mock_chain = MagicMock()
+    mock_chain.invoke.return_value = {'content': 'ALIGNMENT:\nNone'}
+    with patch.object(job_fit_chain, 'job_fit_delta_prompt') as mock_prompt:
+        mock_prompt.__or__.return_value = mock_chain
+        result = job_fit_chain.run_job_fit_delta_chain('+- new bullet', 'ALIGNMENT:\n- Python', 'jd', 'fake-key')
+    assert result == {'content': 'ALIGNMENT:\nNone'}
+    mock_chain.invoke.assert_called_once_with({
+        'resume_diff': '+- new bullet', 'previous_analysis': 'ALIGNMENT:\n- Python', 'job_description': 'jd'})
+
+def test_job_fit_delta_template_variables():
+    assert set(job_fit_chain.job_fit_delta_prompt.input_variables) == {'resume_diff', 'previous_analysis', 'job_description'}
+    job_fit_chain.job_fit_delta_prompt.format(resume_diff='d', previous_analysis='p', job_description='j')
+
+def test_job_fit_two_stage_templates():
+    assert set(job_fit_chain.jd_requirements_prompt.input_variables) == {'job_description'}
+    assert set(job_fit_chain.job_fit_match_prompt.input_variables) == {'requirements', 'combined_experience'}
+    job_fit_chain.job_fit_match_prompt.format(requirements='- [required] Python', combined_experience='c')
+
+@patch('chains.job_fit_chain.ChatOpenAI')
+def test_two_stage_extracts_requirements_once_per_jd(mock_chat_openai, tmp_path):
+    from utils.requirements_cache import RequirementsCache
+    cache = RequirementsCache(str(tmp_path))
+    extract_chain, match_chain = MagicMock(), MagicMock()
+    extract_chain.invoke.return_value = {'content': '[{"requirement": "Python", "priority": "required"}, '
+                                                    '{"requirement": "Go", "priority": "nice to have"}]'}
+    match_chain.invoke.return_value = {'content': 'ALIGNMENT:\n- Python\nGAPS: []'}
+    with patch.object(job_fit_chain, 'jd_requirements_prompt') as extract_prompt, \
+         patch.object(job_fit_chain, 'job_fit_match_prompt') as match_prompt:
+        extract_prompt.__or__.return_value = extract_chain
+        match_prompt.__or__.return_value = match_chain
+        for resume in ('resume one', 'resume two'):
+            result = job_fit_chain.run_job_fit_chain(resume, 'The  JD', 'fake-key', two_stage=True,
+                                                     requirements_cache=cache, compact=False)
+            assert result == {'content': 'ALIGNMENT:\n- Python\nGAPS: []'}
+        # Same posting re-pasted with different whitespace, in a fresh process
+        job_fit_chain.run_job_fit_chain('resume three', 'The JD\n', 'fake-key', two_stage=True,
+                                        requirements_cache=RequirementsCache(str(tmp_path)), compact=False)
+    extract_chain.invoke.assert_called_once_with({'job_description': 'The  JD'})
+    assert match_chain.invoke.call_count == 3
+    assert match_chain.invoke.call_args[0][0] == {'requirements': '- [required] Python\n- [preferred] Go',
+                                                  'combined_experience': 'resume three'}
+
+@patch('chains.job_fit_chain.ChatOpenAI')
+def test_truncated_requirements_are_not_cached(mock_chat_openai, tmp_path):
+    from utils.requirements_cache import RequirementsCache
+    cache = RequirementsCache(str(tmp_path))
+    extract_chain = MagicMock()
+    replies = [
+        {'content': '[{"requirement": "Python", "priority": "required"}, {"requirement": "Go", "prio'},
+        {'content': '[{"requirement": "Python", "priority": "required"}]', 'response_metadata': {'finish_reason': 'length'}},
+        {'content': '[{"requirement": "Python", "priority": "required"}]', 'response_metadata': {'finish_reason': 'stop'}},
+    ]
+    extract_chain.invoke.side_effect = replies
+    with patch.object(job_fit_chain, 'jd_requirements_prompt') as extract_prompt:
+        extract_prompt.__or__.return_value = extract_chain
+        for _ in replies:
+            assert job_fit_chain.extract_job_requirements('The JD', 'fake-key', cache) == [
+                {'requirement': 'Python', 'priority': 'required'}]
+        assert job_fit_chain.extract_job_requirements('The JD', 'fake-key', cache)
+    assert extract_chain.invoke.call_count == 3
+
+@patch('chains.job_fit_chain.ChatOpenAI')
+def test_two_stage_falls_back_to_one_shot_when_extraction_fails(mock_chat_openai, tmp_path):
+    from utils.requirements_cache import RequirementsCache
+    extract_chain, one_shot_chain = MagicMock(), MagicMock()
+    extract_chain.invoke.return_value = {'content': 'I could not find any requirements.'}
+    one_shot_chain.invoke.return_value = {'content': 'one shot'}
+    with patch.object(job_fit_chain, 'jd_requirements_prompt') as extract_prompt, \
+         patch.object(job_fit_chain, 'job_fit_prompt') as one_shot_prompt:
+        extract_prompt.__or__.return_value = extract_chain
+        one_shot_prompt.__or__.return_value = one_shot_chain
+        result = job_fit_chain.run_job_fit_chain('resume', 'jd', 'fake-key', two_stage=True,
+                                                 requirements_cache=RequirementsCache(str(tmp_path)))
+    assert result == {'content': 'one shot'}
+    assert list(tmp_path.iterdir()) == []
+
+@patch('chains.job_fit_chain.ChatOpenAI')
+def test_compact_match_cites_requirement_ids_and_sizes_max_tokens(mock_chat_openai):
+    requirements = [{'requirement': 'Python', 'priority': 'required'},
+                    {'requirement': 'Kubernetes', 'priority': 'preferred'},
+                    {'requirement': 'Mentoring', 'priority': 'required'}]
+    mock_chain = MagicMock()
+    mock_chain.invoke.return_value = {'content': 'ALIGNED: R1, R9\nGAPS: [{"id": "R3", "q": "Tell me about a time when you mentored someone"}]'}
+    with patch.object(job_fit_chain, 'job_fit_compact_prompt') as mock_prompt:
+        mock_prompt.__or__.return_value = mock_chain
+        result = job_fit_chain.run_job_fit_match_chain('resume', requirements, 'fake-key', compact=True)
+    assert mock_chain.invoke.call_args[0][0]['requirements'] == (
+        'R1 [required] Python\nR2 [preferred] Kubernetes\nR3 [required] Mentoring')
+    assert mock_chat_openai.call_args.kwargs['max_tokens'] == (
+        job_fit_chain.JOB_FIT_COMPACT_BASE_TOKENS + 3 * job_fit_chain.JOB_FIT_COMPACT_ITEM_TOKENS)
+    from main import parse_job_fit_output
+    alignment, gaps = parse_job_fit_output(result)
+    assert alignment == ['Python']
+    assert gaps == [{'skill': 'Mentoring', 'question': 'Tell me about a time when you mentored someone'}]
+
+@patch('chains.job_fit_chain.ChatOpenAI')
+def test_delta_max_tokens_scale_with_changed_lines(mock_chat_openai):
+    mock_chain = MagicMock()
+    with patch.object(job_fit_chain, 'job_fit_delta_prompt') as mock_prompt:
+        mock_prompt.__or__.return_value = mock_chain
+        job_fit_chain.run_job_fit_delta_chain('--- previous\n+++ current\n-old\n+new\n context', 'p', 'jd', 'fake-key')
+    assert mock_chat_openai.call_args.kwargs['max_tokens'] == job_fit_chain.JOB_FIT_BASE_TOKENS + 2 * job_fit_chain.JOB_FIT_ITEM_TOKENS
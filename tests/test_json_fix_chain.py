@@ -0,0 +1,14 @@
+from unittest.mock import patch, MagicMock
+from chains import json_fix_chain
+
+@patch('chains.json_fix_chain.ChatOpenAI')
+def test_fix_json_llm(mock_chat_openai):
+    mock_chain = MagicMock()
+    mock_chain.invoke.return_value = {'content': '[{"skill": "Go"}]'}
+    with patch.object(json_fix_chain, 'json_fix_prompt') as mock_prompt:
+        mock_prompt.__or__.return_value = mock_chain
+        result = json_fix_chain.fix_json_llm('[{"skill": Go}', 'fake-key')
+        assert result == '[{"skill": "Go"}]'
+        args, kwargs = mock_chain.invoke.call_args
+        assert args[0]['broken_json'] == '[{"skill": Go}'
+        assert mock_chat_openai.call_args.kwargs['model'] == 'gpt-3.5-turbo'
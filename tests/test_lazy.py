@@ -0,0 +1,28 @@
+import sys
+from unittest.mock import patch
+from utils.lazy import lazy_function
+from chains import llm_pool
+
+def test_lazy_function_imports_on_first_call():
+    sys.modules.pop('json.tool', None)
+    proxy = lazy_function('json.tool', 'main')
+    assert 'json.tool' not in sys.modules
+    assert proxy.__name__ == 'main'
+    with patch('json.tool.main', return_value='called', create=True):
+        assert proxy() == 'called'
+    assert 'json.tool' in sys.modules
+
+def test_main_does_not_import_langchain():
+    import subprocess
+    code = "import main, sys; print(any(m.startswith('langchain') for m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
+
+def test_chat_model_pool():
+    factory = lambda **kwargs: object()
+    with patch.object(llm_pool, '_pool', None):
+        assert llm_pool.chat_model(factory, model='a') is not llm_pool.chat_model(factory, model='a')
+        llm_pool.enable_client_pool()
+        first = llm_pool.chat_model(factory, model='a')
+        assert llm_pool.chat_model(factory, model='a') is first
+        assert llm_pool.chat_model(factory, model='b') is not first
@@ -1,6 +1,6 @@
 import pytest
 from unittest.mock import MagicMock, patch
-from main import run_workflow, analyze_gaps_with_llm, process_unanswered_gaps, FileReadError, LLMJsonParseError, read_inputs, run_job_fit_analysis, parse_job_fit_output, finalize_session
+from main import run_workflow, analyze_gaps_with_llm, process_unanswered_gaps, FileReadError, LLMJsonParseError, read_inputs, run_job_fit_analysis, parse_job_fit_output, finalize_session, make_json_fixer
 
 # Helper: create a fake gap
 def make_gap(skill, question):
@@ -112,10 +112,23 @@ def test_parse_job_fit_output():
         mock_gaps.return_value = [{'skill': 'Python'}]
         alignment, gaps = parse_job_fit_output('llm output')
         mock_align.assert_called_once_with('llm output')
-        mock_gaps.assert_called_once_with('llm output')
+        mock_gaps.assert_called_once_with('llm output', reask=None)
         assert alignment == 'alignment section'
         assert gaps == [{'skill': 'Python'}]
 
+def test_parse_job_fit_output_reasks_when_repair_fails():
+    output = "ALIGNMENT:\n- Python\nGAPS: [not valid json]"
+    fixer = MagicMock(return_value='[{"skill": "Go", "question": "Tell me about Go"}]')
+    alignment, gaps = parse_job_fit_output(output, fixer)
+    fixer.assert_called_once_with('[not valid json]')
+    assert gaps == [{'skill': 'Go', 'question': 'Tell me about Go'}]
+
+def test_make_json_fixer():
+    with patch('main.fix_json_llm', return_value='[]') as mock_fix:
+        fixer = make_json_fixer('api-key')
+        assert fixer('[1,') == '[]'
+        mock_fix.assert_called_once_with('[1,', 'api-key')
+
 # --- Test for finalize_session ---
 def test_finalize_session():
     logger = MagicMock()
@@ -125,6 +138,17 @@ def test_finalize_session():
     logger.save.assert_called_once()
     cli.display_session_log_path.assert_called_once_with('session.log')
 
+def test_finalize_session_reports_only_this_sessions_parsing():
+    from utils.metrics import start_session_stats
+    from utils.text_parsing import loads_with_repair
+    logger = MagicMock()
+    start_session_stats()
+    loads_with_repair('[1,]')
+    start_session_stats()
+    loads_with_repair('[1]')
+    finalize_session(logger, MagicMock())
+    logger.log.assert_any_call("JSON parsing: clean=1")
+
 def test_run_workflow_with_answered_and_unanswered(monkeypatch):
     cli = MagicMock()
     story_manager = MagicMock()
@@ -164,4 +188,219 @@ def test_run_workflow_gaps_json_parse_error(monkeypatch):
     from main import run_workflow
     with pytest.raises(SystemExit):
         run_workflow('fake-key', cli, story_manager, logger)
-    cli.display_error.assert_called_once() 
\ No newline at end of file
+    cli.display_error.assert_called_once() 
+def test_process_unanswered_gaps_defers_missing_answers():
+    cli = MagicMock()
+    logger = MagicMock()
+    story_manager = MagicMock()
+    cli.prompt_for_story.return_value = None
+    process_unanswered_gaps([make_gap('Rust', 'Tell me about Rust')], story_manager, logger, cli)
+    story_manager.save_story.assert_not_called()
+    cli.display_story_deferred.assert_called_once_with('Rust')
+
+def test_build_io():
+    from main import parse_args, build_io
+    from utils.answers_file import AnswersFileIO
+    cli = MagicMock()
+    assert build_io(parse_args([]), cli) is cli
+    io = build_io(parse_args(['--resume', 'r.txt', '--job-description', 'jd.txt']), cli)
+    assert isinstance(io, AnswersFileIO) and io.interactive and io.unmatched_file is None
+    assert io.prompt_for_resume_path('default') == 'r.txt'
+    with patch('main.load_answers', return_value={'go': 'story'}) as mock_load:
+        io = build_io(parse_args(['--answers', 'a.yaml', '--unmatched-out', 'u.json']), cli)
+    mock_load.assert_called_once_with('a.yaml')
+    assert not io.interactive and io.unmatched_file == 'u.json' and io.answers == {'go': 'story'}
+
+# --- Tests for incremental re-analysis ---
+PREVIOUS = {
+    'resume': 'EXPERIENCE\n- Built Python services\n- Led a team\n- Ran on-call\n- Wrote docs\n',
+    'alignment': ['Python', 'Leadership'],
+    'gaps': [{'skill': 'Go', 'question': 'q1'}, {'skill': 'Kubernetes', 'question': 'q2'}],
+    'verdicts': {}, 'stories_key': None,
+}
+
+def test_analyze_job_fit_reuses_unchanged_resume():
+    from main import analyze_job_fit
+    with patch('main.run_job_fit_analysis') as full, patch('main.run_job_fit_delta_chain') as delta:
+        output, alignment, gaps, mode = analyze_job_fit(PREVIOUS['resume'], 'jd', 'key', PREVIOUS)
+    assert mode == 'cached' and alignment == PREVIOUS['alignment'] and gaps == PREVIOUS['gaps']
+    full.assert_not_called(); delta.assert_not_called()
+
+def test_analyze_job_fit_sends_only_the_diff():
+    from main import analyze_job_fit
+    edited = PREVIOUS['resume'].replace('- Ran on-call', '- Ran Kubernetes clusters')
+    delta_output = 'ALIGNMENT:\n- Kubernetes\nREMOVED:\nNone\nRESOLVED:\n- Kubernetes\nGAPS:\n[]'
+    with patch('main.run_job_fit_analysis') as full, \
+         patch('main.run_job_fit_delta_chain', return_value=delta_output) as delta:
+        output, alignment, gaps, mode = analyze_job_fit(edited, 'jd', 'key', PREVIOUS)
+    full.assert_not_called()
+    resume_diff = delta.call_args[0][0]
+    assert '+- Ran Kubernetes clusters' in resume_diff and 'Wrote docs' in resume_diff and 'Built Python' not in resume_diff
+    assert mode == 'incremental'
+    assert alignment == ['Python', 'Leadership', 'Kubernetes']
+    assert gaps == [{'skill': 'Go', 'question': 'q1'}]
+
+def test_analyze_job_fit_falls_back_to_full_for_large_edits():
+    from main import analyze_job_fit
+    with patch('main.run_job_fit_analysis', return_value='ALIGNMENT:\n- Rust\nGAPS: []') as full, \
+         patch('main.run_job_fit_delta_chain') as delta:
+        output, alignment, gaps, mode = analyze_job_fit('A completely different resume', 'jd', 'key', PREVIOUS)
+    delta.assert_not_called()
+    full.assert_called_once()
+    assert mode == 'full' and alignment == ['Rust'] and gaps == []
+
+def test_analyze_gaps_with_llm_reuses_verdicts():
+    gaps = [make_gap('Go', 'q1'), make_gap('Rust', 'q2')]
+    verdicts = {'go': [True, 'Go story', 0.9]}
+    with patch('main.story_answers_gap_llm', return_value=(False, '', 0.1)) as mock_llm:
+        answered, unanswered = analyze_gaps_with_llm(gaps, [], 'key', verdicts=verdicts)
+    mock_llm.assert_called_once()
+    assert mock_llm.call_args[0][0] == 'Rust'
+    assert answered[0]['summary'] == 'Go story' and unanswered == [make_gap('Rust', 'q2')]
+    assert verdicts['rust'] == [False, '', 0.1]
+
+def test_run_workflow_incremental_skips_gap_checks_on_rerun(tmp_path):
+    from utils.analysis_cache import AnalysisCache
+    cache = AnalysisCache(str(tmp_path))
+    cli = MagicMock()
+    cli.prompt_for_story.return_value = 'skip'
+    story_manager = MagicMock()
+    story_manager.get_relevant_stories.return_value = [{'skill': 'Python', 'story': 's'}]
+    story_manager.has_no_experience.return_value = False
+    story_manager.find_story.return_value = None
+    with patch('main.read_inputs', return_value=('resume', 'jd')), \
+         patch('main.run_job_fit_analysis', return_value='ALIGNMENT:\n- Python\nGAPS: [{"skill": "Go", "question": "q"}]') as full, \
+         patch('main.story_answers_gap_llm', return_value=(False, '', 0.1)) as gap_check:
+        run_workflow('key', cli, story_manager, MagicMock(), cache)
+        run_workflow('key', cli, story_manager, MagicMock(), cache)
+    full.assert_called_once()
+    gap_check.assert_called_once()
+    assert [c.args[0] for c in cli.display_analysis_mode.call_args_list] == ['full', 'cached']
+
+def test_analyze_gaps_with_llm_uses_the_story_bank(tmp_path):
+    from utils.story_manager import StoryManager
+    from utils.skill_index import SkillIndex
+    story_manager = StoryManager(str(tmp_path / 'stories.json'), SkillIndex(str(tmp_path / 'skills.json')))
+    story_manager.save_story('COBOL', 'No relevant experience', has_experience=False)
+    story_manager.save_story('Kubernetes', 'Ran three production clusters.', has_experience=True)
+    story_manager.save_story('Python', 'Wrote a script.', has_experience=True)
+    gaps = [make_gap('cobol', 'q1'), make_gap('K8s', 'q2'), make_gap('Container orchestration', 'q3')]
+    relevant = story_manager.get_relevant_stories()
+    with patch('main.story_answers_gap_llm', return_value=(True, 'The Kubernetes story shows this', 0.9)) as mock_llm:
+        answered, unanswered = analyze_gaps_with_llm(gaps, relevant, 'key', story_manager=story_manager)
+    # Only the gap with no known skill needed a call; the verdict linked it to the Kubernetes story
+    assert [c.args[0] for c in mock_llm.call_args_list] == ['Container orchestration']
+    assert unanswered == [make_gap('cobol', 'q1')]
+    assert answered[0]['summary'] == '[Kubernetes] Ran three production clusters.'
+    assert answered[0]['confidence'] == 1.0
+    # A link is not an alias: the next check still asks the LLM, with the linked story first
+    with patch('main.story_answers_gap_llm', return_value=(False, '', 0.2)) as mock_llm:
+        answered, _ = analyze_gaps_with_llm([make_gap('container orchestration', 'q3')], relevant[::-1], 'key',
+                                            story_manager=story_manager)
+    assert answered == []
+    assert [s['skill'] for s in mock_llm.call_args.args[2]] == ['Kubernetes', 'Python']
+    assert [s['skill'] for s in mock_llm.call_args.kwargs['pinned']] == ['Kubernetes']
+    assert story_manager.find_story('container orchestration') is None
+
+def test_analyze_gaps_with_llm_sends_similar_stories_only():
+    story_manager = MagicMock()
+    story_manager.find_story.return_value = None
+    story_manager.has_no_experience.return_value = False
+    story_manager.similar_stories.return_value = [{'skill': 'Kubernetes', 'story': 's'}]
+    relevant = [{'skill': 'Kubernetes', 'story': 's'}, {'skill': 'Python', 'story': 't'}]
+    with patch('main.STORY_EMBEDDING_TOP_K', 1), \
+         patch('main.story_answers_gap_llm', return_value=(False, '', 0.1)) as mock_llm:
+        analyze_gaps_with_llm([make_gap('Container orchestration', 'q')], relevant, 'key', story_manager=story_manager)
+    story_manager.similar_stories.assert_called_once_with('Container orchestration\nq', 1)
+    assert mock_llm.call_args[0][2] == [{'skill': 'Kubernetes', 'story': 's'}]
+
+def test_run_workflow_stores_results(monkeypatch, tmp_path):
+    from utils.results_store import ResultsStore
+    cli = MagicMock()
+    cli.prompt_for_resume_path.return_value = 'resume.txt'
+    cli.prompt_for_job_description_path.return_value = 'job.txt'
+    logger = MagicMock()
+    logger.session_file = 'sessions/session_1.txt'
+    story_manager = MagicMock()
+    story_manager.get_relevant_stories.return_value = []
+    gaps = [make_gap('Kubernetes', 'Q1'), make_gap('Go', 'Q2')]
+    monkeypatch.setattr('main.read_inputs', lambda *a, **kw: ('resume', 'Senior SRE, Kubernetes'))
+    monkeypatch.setattr('main.run_job_fit_analysis', lambda *a, **kw: 'output')
+    monkeypatch.setattr('main.parse_job_fit_output', lambda *a, **kw: (['Python'], gaps))
+    monkeypatch.setattr('main.analyze_gaps_with_llm', lambda *a, **kw: (
+        [{'gap': gaps[0], 'summary': 'summary', 'confidence': 0.9}], [gaps[1]]))
+    monkeypatch.setattr('main.process_unanswered_gaps', MagicMock())
+    monkeypatch.setattr('main.finalize_session', MagicMock())
+    store = ResultsStore(str(tmp_path / 'results.db'))
+    run_workflow('fake-key', cli, story_manager, logger, results_store=store)
+    assert store.query("SELECT external_id, description FROM postings") == [
+        {'external_id': 'job.txt', 'description': 'Senior SRE, Kubernetes'}]
+    assert store.query("SELECT mode, session_file FROM analyses") == [
+        {'mode': 'full', 'session_file': 'sessions/session_1.txt'}]
+    assert [(r['skill'], r['answered'], r['avg_confidence']) for r in store.top_gaps()] == [
+        ('Go', 0, None), ('Kubernetes', 1, 0.9)]
+    store.close()
+
+def test_run_workflow_reuses_history_analysis(monkeypatch):
+    cli = MagicMock()
+    cli.prompt_for_resume_path.return_value = 'resume.txt'
+    cli.prompt_for_job_description_path.return_value = 'job.txt'
+    logger = MagicMock()
+    logger.session_file = 'sessions/session_2.txt'
+    story_manager = MagicMock()
+    story_manager.get_relevant_stories.return_value = []
+    gaps = [make_gap('Kafka', 'Q1')]
+    history_index = MagicMock()
+    history_index.find_reusable_analysis.return_value = {
+        'path': 'sessions/session_1.txt', 'analysis': 'output', 'alignment': ['Python'], 'gaps': gaps,
+        'similarity': 0.95}
+    monkeypatch.setattr('main.read_inputs', lambda *a, **kw: ('resume', 'Senior SRE, Kafka'))
+    run = MagicMock(return_value='ALIGNMENT:\n- Python\nGAPS: []')
+    monkeypatch.setattr('main.run_job_fit_analysis', run)
+    analyze = MagicMock(return_value=([], gaps))
+    monkeypatch.setattr('main.analyze_gaps_with_llm', analyze)
+    monkeypatch.setattr('main.process_unanswered_gaps', MagicMock())
+    monkeypatch.setattr('main.finalize_session', MagicMock())
+    run_workflow('fake-key', cli, story_manager, logger, history_index=history_index)
+    run.assert_not_called()
+    history_index.find_reusable_analysis.assert_called_once_with('resume', 'Senior SRE, Kafka')
+    assert analyze.call_args[0][0] == gaps
+    cli.display_analysis_mode.assert_called_once_with('reused', similarity=0.95)
+    logger.log.assert_any_call('Analysis mode: reused from sessions/session_1.txt (95% similar posting)')
+    history_index.index_file.assert_called_once_with('sessions/session_2.txt', 'session')
+    history_index.reset_mock()
+    run_workflow('fake-key', cli, story_manager, logger, history_index=history_index, reuse_history=False)
+    history_index.find_reusable_analysis.assert_not_called()
+    run.assert_called_once()
+    history_index.index_file.assert_called_once_with('sessions/session_2.txt', 'session')
+
+def test_explain_answered_replaces_local_summaries():
+    stories = [{'skill': 'Go', 'story': 'Built a CLI.'}, {'skill': 'Python', 'story': 'Wrote a script.'}]
+    answered = [{'gap': make_gap('Golang', 'q1'), 'summary': '[Go] Built a CLI.', 'confidence': 0.9},
+                {'gap': make_gap('Scripting', 'q2'), 'summary': 'uncited', 'confidence': 0.8},
+                {'gap': make_gap('Rust', 'q3'), 'summary': '[Python] Wrote a script.', 'confidence': 0.8}]
+    with patch('main.explain_gap_verdict', side_effect=['The Go CLI story shows it', '', LLMJsonParseError('bad')]) as explain:
+        from main import explain_answered
+        explain_answered(answered, stories, 'key')
+    assert explain.call_args_list[0].args == ('Golang', 'q1', stories[:1], 'key')
+    assert explain.call_args_list[1].args[2] == stories
+    assert [item['summary'] for item in answered] == ['The Go CLI story shows it', 'uncited', '[Python] Wrote a script.']
+
+def test_run_workflow_explains_answered_gaps_only_when_asked(monkeypatch):
+    cli = MagicMock()
+    story_manager = MagicMock()
+    story_manager.get_relevant_stories.return_value = []
+    gap = make_gap('Go', 'q')
+    monkeypatch.setattr('main.read_inputs', lambda *a, **kw: ('resume', 'job'))
+    monkeypatch.setattr('main.run_job_fit_analysis', lambda *a, **kw: 'output')
+    monkeypatch.setattr('main.parse_job_fit_output', lambda *a, **kw: ([], [gap]))
+    monkeypatch.setattr('main.analyze_gaps_with_llm', lambda *a, **kw: (
+        [{'gap': gap, 'summary': '[Go] Built a CLI.', 'confidence': 0.9}], []))
+    monkeypatch.setattr('main.finalize_session', MagicMock())
+    explain = MagicMock(return_value='The Go CLI story shows it')
+    monkeypatch.setattr('main.explain_gap_verdict', explain)
+    run_workflow('key', cli, story_manager, MagicMock())
+    explain.assert_not_called()
+    cli.display_story_already_answered.assert_called_with('Go', '[Go] Built a CLI.')
+    run_workflow('key', cli, story_manager, MagicMock(), explain=True)
+    cli.display_story_already_answered.assert_called_with('Go', 'The Go CLI story shows it')
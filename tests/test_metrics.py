@@ -0,0 +1,94 @@
+import urllib.request
+from types import SimpleNamespace
+import pytest
+from utils.metrics import Registry, llm_call, llm_calls, llm_latency, llm_tokens, write_textfile, serve_metrics
+
+def test_counter_and_histogram_render_in_text_format():
+    registry = Registry()
+    calls = registry.counter("calls_total", "Calls", ("chain",))
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1))
+    calls.inc(chain="job_fit")
+    calls.inc(2, chain='gap "check"')
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+    text = registry.render()
+    assert '# TYPE calls_total counter' in text
+    assert 'calls_total{chain="job_fit"} 1' in text
+    assert 'calls_total{chain="gap \\"check\\""} 2' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert 'latency_seconds_sum 5.55' in text
+    assert 'latency_seconds_count 3' in text
+
+def test_registry_rejects_conflicting_metrics_and_labels():
+    registry = Registry()
+    calls = registry.counter("calls_total", "Calls", ("chain",))
+    assert registry.counter("calls_total", "Calls", ("chain",)) is calls
+    with pytest.raises(ValueError):
+        registry.histogram("calls_total", "Calls", ("chain",))
+    with pytest.raises(ValueError):
+        calls.inc(model="x")
+    with pytest.raises(ValueError):
+        calls.inc(-1, chain="x")
+
+def test_llm_call_counts_latency_tokens_and_errors():
+    before = llm_calls.value(chain="test", model="m", status="ok")
+    with llm_call("test", "m") as call:
+        call.usage(SimpleNamespace(usage_metadata={"input_tokens": 120, "output_tokens": 30}))
+    with pytest.raises(RuntimeError):
+        with llm_call("test", "m"):
+            raise RuntimeError("timeout")
+    assert llm_calls.value(chain="test", model="m", status="ok") == before + 1
+    assert llm_calls.value(chain="test", model="m", status="error") >= 1
+    assert llm_latency.count(chain="test", model="m") >= 2
+    assert llm_tokens.value(chain="test", model="m", kind="prompt") >= 120
+
+def test_textfile_and_http_exposition(tmp_path):
+    registry = Registry()
+    registry.counter("sessions_total", "Sessions").inc()
+    path = tmp_path / "metrics" / "app.prom"
+    write_textfile(str(path), registry)
+    assert "sessions_total 1" in path.read_text()
+    server = serve_metrics(0, reg=registry)
+    try:
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            assert "sessions_total 1" in response.read().decode()
+            assert response.headers["Content-Type"].startswith("text/plain")
+    finally:
+        server.shutdown()
+
+def test_story_store_and_json_failures_report_into_the_registry(tmp_path):
+    from utils.metrics import story_store_latency, json_parse_failures, cache_lookups
+    from utils.story_manager import StoryManager
+    from utils.text_parsing import loads_with_repair, GapsJsonParseError
+    writes = story_store_latency.count(operation="write")
+    hits = cache_lookups.value(cache="story_file", result="hit")
+    manager = StoryManager(str(tmp_path / "stories.json"))
+    manager.save_story("Go", "Wrote a service")
+    manager.load_stories()
+    assert story_store_latency.count(operation="write") == writes + 1
+    assert cache_lookups.value(cache="story_file", result="hit") > hits
+    failures = json_parse_failures.value(error="GapsJsonParseError")
+    with pytest.raises(GapsJsonParseError):
+        loads_with_repair("not json at all", GapsJsonParseError)
+    assert json_parse_failures.value(error="GapsJsonParseError") == failures + 1
+
+def test_call_log_collects_this_threads_calls():
+    from utils.metrics import start_call_log, stop_call_log
+    with llm_call("before", "m"):
+        pass
+    calls = start_call_log()
+    with llm_call("job_fit", "m") as call:
+        call.usage(SimpleNamespace(usage_metadata={"input_tokens": 10, "output_tokens": 4}))
+    with pytest.raises(RuntimeError):
+        with llm_call("gap_check", "m"):
+            raise RuntimeError("boom")
+    stop_call_log()
+    with llm_call("after", "m"):
+        pass
+    assert [(c["chain"], c["status"], c["prompt_tokens"], c["completion_tokens"]) for c in calls] == [
+        ("job_fit", "ok", 10, 4), ("gap_check", "error", None, None)]
+    assert all(c["seconds"] >= 0 for c in calls)
@@ -0,0 +1,89 @@
+import json
+import threading
+import pytest
+from utils import profiling
+from utils.profiling import span, traced, enable_profiling, finish_profiling
+
+@pytest.fixture(autouse=True)
+def profiling_off():
+    yield
+    profiling._tracer = None
+
+def test_spans_are_noops_when_disabled():
+    assert span("read_file") is span("llm:job_fit", "llm", model="x")
+
+    @traced("work")
+    def work(x):
+        return x * 2
+
+    assert work(3) == 6
+    assert finish_profiling("unused.json") == ""
+
+def test_trace_has_nested_complete_events(tmp_path):
+    enable_profiling()
+
+    @traced("outer")
+    def outer():
+        with span("inner", "llm", model="gpt-4o"):
+            pass
+
+    outer()
+    trace_file = tmp_path / "out" / "trace.json"
+    report = finish_profiling(str(trace_file))
+    events = json.loads(trace_file.read_text())["traceEvents"]
+    spans = {e["name"]: e for e in events if e["ph"] == "X"}
+    assert set(spans) == {"outer", "inner"}
+    assert spans["inner"]["cat"] == "llm" and spans["inner"]["args"] == {"model": "gpt-4o"}
+    inner, outer_event = spans["inner"], spans["outer"]
+    assert outer_event["ts"] <= inner["ts"]
+    assert inner["ts"] + inner["dur"] <= outer_event["ts"] + outer_event["dur"]
+    assert any(e["ph"] == "M" and e["name"] == "thread_name" for e in events)
+    assert "outer" in report and str(trace_file) in report
+    assert not profiling.profiling_enabled()
+
+def test_failed_span_is_recorded_with_error(tmp_path):
+    tracer = enable_profiling()
+    with pytest.raises(ValueError):
+        with span("json_extract"):
+            raise ValueError("bad json")
+    assert tracer.events[0]["args"] == {"error": "ValueError"}
+
+def test_spans_from_worker_threads_keep_their_thread(tmp_path):
+    tracer = enable_profiling()
+
+    def check_gap():
+        with span("llm:gap_check"):
+            pass
+
+    worker = threading.Thread(target=check_gap, name="worker")
+    worker.start()
+    worker.join()
+    assert tracer.thread_names[tracer.events[0]["tid"]] == "worker"
+
+def test_cprofile_stats_are_written(tmp_path):
+    enable_profiling(cprofile=True)
+    with span("work"):
+        sum(range(1000))
+    trace_file = tmp_path / "trace.json"
+    report = finish_profiling(str(trace_file))
+    assert (tmp_path / "trace.json.prof").exists()
+    assert "function calls" in report
+
+def test_workflow_stages_show_up_in_the_trace(tmp_path):
+    from utils.story_manager import StoryManager
+    from utils.session_logger import SessionLogger
+    tracer = enable_profiling()
+    stories_file = tmp_path / "stories.json"
+    manager = StoryManager(str(stories_file))
+    manager.save_story("Python", "Built a service", has_experience=True)
+    manager.load_stories()
+    SessionLogger(session_file=str(tmp_path / "session.txt")).save()
+    names = {e["name"] for e in tracer.events}
+    assert {"stories:write", "session:save"} <= names
+
+def test_profile_flag_defaults_to_a_timestamped_trace():
+    from main import parse_args
+    assert parse_args([]).profile is None
+    assert parse_args(['--profile']).profile.startswith('sessions/trace_')
+    assert parse_args(['--profile', 'run.json']).profile == 'run.json'
+    assert parse_args(['--cprofile']).profile.startswith('sessions/trace_')
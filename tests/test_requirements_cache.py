@@ -0,0 +1,33 @@
+import json
+from utils.requirements_cache import RequirementsCache, jd_key, normalize_requirements, format_requirements
+
+def test_normalize_requirements_cleans_stage_one_output():
+    raw = [{"requirement": "  Python   APIs ", "priority": "Required"},
+           {"requirement": "python apis", "priority": "preferred"},
+           "Kubernetes",
+           {"requirement": "Go", "priority": "Nice to have"},
+           {"requirement": ""},
+           42]
+    assert normalize_requirements(raw) == [
+        {"requirement": "Python APIs", "priority": "required"},
+        {"requirement": "Kubernetes", "priority": "required"},
+        {"requirement": "Go", "priority": "preferred"},
+    ]
+    assert normalize_requirements({"requirements": []}) == []
+    assert format_requirements(normalize_requirements(raw)[:1]) == "- [required] Python APIs"
+
+def test_cache_is_keyed_by_whitespace_insensitive_jd_hash(tmp_path):
+    assert jd_key("Senior  engineer\nPython") == jd_key(" Senior engineer Python ")
+    cache = RequirementsCache(str(tmp_path))
+    assert cache.load("Senior engineer") is None
+    requirements = [{"requirement": "Python", "priority": "required"}]
+    cache.save("Senior engineer", requirements)
+    assert cache.load("Senior  engineer") == requirements
+    assert RequirementsCache(str(tmp_path)).load("Senior engineer") == requirements
+    assert RequirementsCache(str(tmp_path)).load("Staff engineer") is None
+
+def test_corrupt_cache_entry_is_a_miss(tmp_path):
+    (tmp_path / f"{jd_key('jd')}.json").write_text("{not json")
+    assert RequirementsCache(str(tmp_path)).load("jd") is None
+    (tmp_path / f"{jd_key('jd')}.json").write_text(json.dumps({"requirements": []}))
+    assert RequirementsCache(str(tmp_path)).load("jd") is None
@@ -0,0 +1,110 @@
+import sqlite3
+import argparse
+import pytest
+from utils.results_store import ResultsStore
+from tools.query_results import parse_since, format_table
+
+DAY = 86400
+NOW = 1_700_000_000
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.db"))
+    yield store
+    store.close()
+
+def posting(key, company="Acme", title="SRE"):
+    return {"key": key, "id": key, "title": title, "company": company, "source": "feed.jsonl", "description": f"JD {key}"}
+
+def add(store, key, gaps, days_ago=0, company="Acme", verdicts=(), calls=()):
+    return store.add_analysis(posting(key, company), "resume", ["Python"],
+                              [{"skill": skill, "question": f"Tell me about {skill}"} for skill in gaps],
+                              verdicts, calls, created_at=NOW - days_ago * DAY)
+
+def test_add_analysis_writes_every_table(store):
+    analysis_id = add(store, "p1", ["Kubernetes", "Go"],
+                      verdicts=[{"skill": "kubernetes", "answered": True, "confidence": 0.8, "summary": "cluster story"}],
+                      calls=[{"chain": "job_fit", "model": "m", "status": "ok", "seconds": 1.5,
+                              "prompt_tokens": 100, "completion_tokens": 20}])
+    add(store, "p1", ["Go"])
+    assert store.query("SELECT COUNT(*) AS n FROM postings") == [{"n": 1}]
+    assert store.query("SELECT COUNT(*) AS n FROM resumes") == [{"n": 1}]
+    assert store.query("SELECT item FROM alignment_items WHERE analysis_id = ?", (analysis_id,)) == [{"item": "Python"}]
+    assert store.query("""SELECT g.skill, v.answered, v.confidence FROM gaps g LEFT JOIN verdicts v ON v.gap_id = g.id
+                          WHERE g.analysis_id = ? ORDER BY g.id""", (analysis_id,)) == [
+        {"skill": "Kubernetes", "answered": 1, "confidence": 0.8},
+        {"skill": "Go", "answered": None, "confidence": None},
+    ]
+    assert store.call_summary()[0]["prompt_tokens"] == 100
+
+def test_gap_postings_filters_by_skill_time_and_company(store):
+    add(store, "recent", ["Kubernetes"], days_ago=3)
+    add(store, "old", ["kubernetes"], days_ago=60)
+    add(store, "other", ["Kubernetes"], days_ago=1, company="Initech")
+    add(store, "unrelated", ["Go"], days_ago=1)
+    since = NOW - 30 * DAY
+    assert [r["external_id"] for r in store.gap_postings("Kubernetes", since)] == ["other", "recent"]
+    assert [r["external_id"] for r in store.gap_postings("kubernetes", since, company="acme")] == ["recent"]
+    assert len(store.gap_postings("Kubernetes")) == 3
+
+def test_top_gaps_counts_postings_once(store):
+    add(store, "p1", ["Kubernetes", "Go"])
+    add(store, "p1", ["Kubernetes"])
+    add(store, "p2", ["Kubernetes"], verdicts=[{"skill": "Kubernetes", "answered": True, "confidence": 0.9}])
+    top = store.top_gaps()
+    assert [(r["skill"], r["postings"], r["answered"]) for r in top] == [("Kubernetes", 2, 1), ("Go", 1, 0)]
+
+def test_gap_skills_match_by_term(store):
+    add(store, "p1", ["Kubernetes experience"], days_ago=2)
+    add(store, "p2", ["Experience with Kubernetes in production"], days_ago=1)
+    add(store, "p3", ["K8s"])
+    add(store, "p4", ["5+ years of Python", "Go"])
+    assert [r["external_id"] for r in store.gap_postings("Kubernetes")] == ["p3", "p2", "p1"]
+    assert [r["external_id"] for r in store.gap_postings("kubernetes experience")] == ["p3", "p2", "p1"]
+    assert [r["external_id"] for r in store.gap_postings("Python")] == ["p4"]
+    assert store.gap_postings("Rust") == []
+    top = store.top_gaps()
+    assert [(r["skill"], r["postings"]) for r in top] == [("K8s", 3), ("5+ years of Python", 1), ("Go", 1)]
+
+def test_skill_keys_are_added_to_older_databases(tmp_path):
+    path = str(tmp_path / "old.db")
+    store = ResultsStore(path)
+    add(store, "p1", ["Kubernetes experience"])
+    store.query("DROP INDEX gaps_skill_key")
+    store._conn.execute("ALTER TABLE gaps DROP COLUMN skill_key")
+    store.close()
+    store = ResultsStore(path)
+    assert [r["external_id"] for r in store.gap_postings("Kubernetes")] == ["p1"]
+    store.close()
+
+def test_batch_is_one_transaction(store):
+    with pytest.raises(RuntimeError):
+        with store.batch():
+            add(store, "p1", ["Go"])
+            raise RuntimeError("worker crashed")
+    assert store.query("SELECT COUNT(*) AS n FROM analyses") == [{"n": 0}]
+    with store.batch():
+        for i in range(50):
+            add(store, f"p{i}", ["Go"])
+    assert store.query("SELECT COUNT(*) AS n FROM analyses") == [{"n": 50}]
+
+def test_read_only_store(tmp_path, store):
+    add(store, "p1", ["Go"])
+    reader = ResultsStore(store.path, read_only=True)
+    assert reader.top_gaps()[0]["skill"] == "Go"
+    with pytest.raises(sqlite3.OperationalError):
+        reader.query("DELETE FROM gaps")
+    reader.close()
+    with pytest.raises(sqlite3.OperationalError):
+        ResultsStore(str(tmp_path / "missing.db"), read_only=True).query("SELECT 1")
+
+def test_parse_since_and_format_table():
+    assert parse_since("30d", now=NOW) == NOW - 30 * DAY
+    assert parse_since("12h", now=NOW) == NOW - 12 * 3600
+    assert parse_since(None) is None
+    assert parse_since("2024-05-01") > 0
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_since("last month")
+    assert format_table([]) == "(no results)"
+    assert format_table([{"skill": "Go", "avg_confidence": 0.8333}]).splitlines() == [
+        "skill  avg_confidence", "Go     0.83"]
@@ -0,0 +1,77 @@
+import pytest
+from utils.resume_edits import EditError, apply_edits, validate_edits, parse_edit_response
+from tools.bench_edit_ops import SAMPLE_RESUME, SAMPLE_EDITS, bench
+
+RESUME = """Jane Doe
+
+EXPERIENCE
+Senior Engineer, Acme (2019-2024)
+- Built things
+- Led people
+
+SKILLS
+- Python, Go
+"""
+
+def test_replace_keeps_bullet_prefix():
+    text, notes = apply_edits(RESUME, [{"op": "replace", "old": "- Built things", "new": "Built a data platform"}])
+    assert "- Built a data platform\n- Led people" in text
+    assert notes == ["Replaced: - Built things -> Built a data platform"]
+
+def test_replace_matches_ignoring_bullets_and_spacing():
+    text, _ = apply_edits(RESUME, [{"op": "replace", "old": "led  people", "new": "- Led a team of six"}])
+    assert "- Led a team of six\n" in text
+    assert "Led people" not in text
+
+def test_insert_after_and_delete():
+    text, _ = apply_edits(RESUME, [
+        {"op": "insert_after", "after": "- Built things", "text": "Shipped a billing rewrite"},
+        {"op": "delete", "old": "- Led people"},
+    ])
+    assert "- Built things\n- Shipped a billing rewrite\n\nSKILLS" in text
+
+def test_delete_without_bullet_marker_drops_the_line():
+    text, _ = apply_edits(RESUME, [{"op": "delete", "old": "Built things"}])
+    assert "(2019-2024)\n- Led people\n" in text
+    text, _ = apply_edits(RESUME, [{"op": "delete", "old": "Built"}])
+    assert "-  things\n" in text
+
+def test_append_to_section():
+    text, notes = apply_edits(RESUME, [{"op": "append", "section": "Skills", "text": "Kubernetes"}])
+    assert text.endswith("SKILLS\n- Python, Go\n- Kubernetes\n")
+    assert notes == ["Added to Skills: Kubernetes"]
+
+def test_empty_edit_list_is_a_no_op():
+    assert apply_edits(RESUME, []) == (RESUME, [])
+
+@pytest.mark.parametrize("edit, message", [
+    ({"op": "replace", "old": "- Wrote COBOL", "new": "x"}, "not found"),
+    ({"op": "delete", "old": "e"}, "occurs"),
+    ({"op": "append", "section": "Publications", "text": "x"}, "No 'Publications' section"),
+])
+def test_edits_that_do_not_apply(edit, message):
+    with pytest.raises(EditError, match=message):
+        apply_edits(RESUME, [edit])
+
+@pytest.mark.parametrize("edits", [
+    {"op": "replace"},
+    [{"op": "rewrite", "text": "x"}],
+    [{"op": "insert_after", "after": "- Built things", "text": " "}],
+    [{"op": "replace", "old": "x", "new": None}],
+])
+def test_validate_rejects_malformed_edits(edits):
+    with pytest.raises(EditError):
+        validate_edits(edits)
+
+def test_parse_edit_response_ignores_fences_and_chatter():
+    response = 'Here are the edits:\n```json\n[{"op": "delete", "old": "- Led people"}]\n```'
+    assert parse_edit_response(response) == [{"op": "delete", "old": "- Led people"}]
+
+def test_parse_edit_response_without_a_list():
+    with pytest.raises(EditError):
+        parse_edit_response("Here is your updated resume:\nJane Doe")
+
+def test_bench_edit_replies_are_smaller():
+    result = bench(SAMPLE_RESUME, SAMPLE_EDITS, repeats=3)
+    assert result["edit_tokens"] < result["full_tokens"]
+    assert result["edit_s"] < result["full_s"]
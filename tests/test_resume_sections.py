@@ -0,0 +1,72 @@
+from utils.resume_sections import parse_resume_sections, find_section, splice_section, section_key_for_heading
+
+RESUME = """Jane Doe
+jane@example.com
+
+PROFESSIONAL SUMMARY
+Engineering leader with 10 years of experience.
+
+Experience:
+Senior Engineer, Acme (2019-2024)
+- Built things
+- Led people
+
+## Skills
+Python, Kubernetes
+
+VOLUNTEER WORK
+- Food bank
+"""
+
+def test_section_key_for_heading():
+    assert section_key_for_heading("PROFESSIONAL SUMMARY") == "summary"
+    assert section_key_for_heading("Work History:") == "experience"
+    assert section_key_for_heading("## Skills & Tools") == "skills"
+    assert section_key_for_heading("VOLUNTEER WORK") == "volunteer_work"
+    assert section_key_for_heading("- Built things") is None
+    assert section_key_for_heading("* Projects") is None
+    assert section_key_for_heading("Engineering leader with 10 years of experience.") is None
+    assert section_key_for_heading("AWARDS & HONORS") == "awards_and_honors"
+    for line in ("JANE DOE", "GOOGLE", "AMAZON WEB SERVICES", "ACME CORP, NEW YORK"):
+        assert section_key_for_heading(line) is None
+
+def test_parse_resume_sections_with_all_caps_name_and_employer():
+    text = "JANE DOE\njane@example.com\n\nEXPERIENCE\nAMAZON WEB SERVICES\n- Ran EKS\nGOOGLE\n- Ran GKE\n\nSKILLS\nGo\n"
+    sections = parse_resume_sections(text)
+    assert [s["key"] for s in sections] == ["header", "experience", "skills"]
+    assert find_section(sections, "header")["body"].startswith("JANE DOE\n")
+    experience = find_section(sections, "experience")
+    assert experience["body"] == "AMAZON WEB SERVICES\n- Ran EKS\nGOOGLE\n- Ran GKE\n\n"
+    spliced = splice_section(text, experience, "AWS\n- Ran EKS")
+    assert spliced == "JANE DOE\njane@example.com\n\nEXPERIENCE\nAWS\n- Ran EKS\n\nSKILLS\nGo\n"
+
+def test_parse_resume_sections_keeps_all_caps_job_titles_in_experience():
+    text = ("EXPERIENCE\nSENIOR RESEARCH ENGINEER\nAcme (2020-2024)\n- Trained models\n\n"
+            "RESEARCH ENGINEER\nInitech\n- Ran evals\n\nVOLUNTEER WORK\n- Food bank\n")
+    sections = parse_resume_sections(text)
+    assert [s["key"] for s in sections] == ["experience", "volunteer_work"]
+    assert find_section(sections, "experience")["body"].startswith("SENIOR RESEARCH ENGINEER\n")
+    assert "- Ran evals" in find_section(sections, "experience")["body"]
+    assert section_key_for_heading("SENIOR RESEARCH ENGINEER") is None
+    assert section_key_for_heading("RESEARCH EXPERIENCE") == "research_experience"
+
+def test_parse_resume_sections():
+    sections = parse_resume_sections(RESUME)
+    assert [s["key"] for s in sections] == ["header", "summary", "experience", "skills", "volunteer_work"]
+    assert find_section(sections, "summary")["body"].strip() == "Engineering leader with 10 years of experience."
+    assert "- Led people" in find_section(sections, "experience")["body"]
+    assert find_section(sections, "education") is None
+
+def test_parse_resume_sections_without_headings():
+    sections = parse_resume_sections("Just a paragraph of text.\n")
+    assert [s["key"] for s in sections] == ["header"]
+
+def test_splice_section_keeps_layout():
+    sections = parse_resume_sections(RESUME)
+    updated = splice_section(RESUME, find_section(sections, "skills"), "Python, Kubernetes, Terraform\n")
+    assert "## Skills\nPython, Kubernetes, Terraform\n\nVOLUNTEER WORK" in updated
+    assert updated.replace("Python, Kubernetes, Terraform", "Python, Kubernetes") == RESUME
+
+def test_splice_section_round_trip_every_section():
+    for section in parse_resume_sections(RESUME):
+        assert splice_section(RESUME, section, section["body"]) == RESUME
@@ -0,0 +1,154 @@
+import json
+import asyncio
+import threading
+import pytest
+from unittest.mock import MagicMock, patch
+import service
+from service import ServiceIO, WorkflowService, SessionClosed, HttpFrontend
+
+GAPS_OUTPUT = 'ALIGNMENT:\n- Python\nGAPS: [{"skill": "Go", "question": "Tell me about Go"}, {"skill": "Rust", "question": "Tell me about Rust"}]'
+
+def test_service_io_story_posted_before_prompt():
+    io = ServiceIO('r.txt', 'j.txt')
+    io.add_stories({'  go ': 'Built a Go service '})
+    assert io.prompt_for_resume_path('default') == 'r.txt'
+    assert io.prompt_for_story('Go', 'Tell me about Go') == 'Built a Go service'
+    assert io.pending is None
+    assert io.events == [{'event': 'story_prompt', 'skill': 'Go', 'question': 'Tell me about Go'}]
+
+def test_service_io_waits_for_story_from_another_thread():
+    io = ServiceIO('r.txt', 'j.txt')
+    answer = []
+    worker = threading.Thread(target=lambda: answer.append(io.prompt_for_story('Go', 'q')))
+    worker.start()
+    io.add_stories({'Go': 'skip'})
+    worker.join(5)
+    assert answer == ['skip']
+
+def test_service_io_close_and_timeout():
+    io = ServiceIO('r.txt', 'j.txt', story_timeout=0.01)
+    with pytest.raises(SessionClosed, match='Timed out'):
+        io.prompt_for_story('Go', 'q')
+    io.close()
+    with pytest.raises(SessionClosed, match='closed'):
+        io.prompt_for_story('Go', 'q')
+
+async def http(port, method, path, body=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    data = json.dumps(body).encode() if body is not None else b''
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: x\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, payload = raw.partition(b"\r\n\r\n")
+    status = int(head.split()[1])
+    if b"chunked" in head:
+        chunks = []
+        while payload:
+            size, _, rest = payload.partition(b"\r\n")
+            size = int(size, 16)
+            chunks.append(rest[:size])
+            payload = rest[size + 2:]
+        payload = b"".join(chunks)
+    return status, payload.decode()
+
+def test_http_session_round_trip(tmp_path):
+    story_manager = MagicMock()
+    story_manager.get_relevant_stories.return_value = []
+    story_manager.has_no_experience.return_value = False
+    story_manager.find_story.return_value = None
+    analysis = MagicMock(return_value=GAPS_OUTPUT)
+    verdicts = {'Go': (False, '', 0.1), 'Rust': (True, 'Rust story covers it', 0.9)}
+    gap_check = lambda skill, *a, **kw: verdicts[skill]
+
+    async def scenario():
+        workflow_service = WorkflowService('key', story_manager, str(tmp_path), max_workers=2, story_timeout=5)
+        server, _ = await service.serve('127.0.0.1', 0, workflow_service)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            status, body = await http(port, 'POST', '/sessions', {'resume': 'My resume', 'job_description': 'The JD'})
+            assert status == 201
+            session_id = json.loads(body)['session_id']
+            events_task = asyncio.create_task(http(port, 'GET', f'/sessions/{session_id}/events'))
+            session = workflow_service.sessions[session_id]
+            while session.io.pending is None:
+                await asyncio.sleep(0.01)
+            status, body = await http(port, 'GET', f'/sessions/{session_id}/gaps')
+            gaps = json.loads(body)
+            assert [g['skill'] for g in gaps['gaps']] == ['Go', 'Rust']
+            assert gaps['answered'] == [{'skill': 'Rust', 'summary': 'Rust story covers it'}]
+            assert gaps['pending']['skill'] == 'Go'
+            status, _ = await http(port, 'POST', f'/sessions/{session_id}/stories', {'stories': {'Go': 'Wrote Go'}})
+            assert status == 200
+            status, body = await events_task
+            events = [json.loads(line) for line in body.splitlines()]
+            assert events[0] == {'event': 'analyzing'}
+            assert events[-1] == {'event': 'end', 'status': 'done'}
+            assert 'story_saved' in [e['event'] for e in events]
+            status, log = await http(port, 'GET', f'/sessions/{session_id}/log')
+            assert status == 200 and 'My resume' in log and 'Story: Wrote Go' in log
+            assert (await http(port, 'POST', f'/sessions/{session_id}/stories', {'skill': 'Go', 'story': 'x'}))[0] == 409
+            status, metrics = await http(port, 'GET', '/metrics')
+            assert status == 200 and 'applygorithminator_sessions_completed_total ' in metrics
+        finally:
+            server.close()
+            await server.wait_closed()
+            workflow_service.close()
+
+    with patch('main.run_job_fit_analysis', analysis), patch('main.story_answers_gap_llm', side_effect=gap_check), \
+         patch('service.enable_client_pool'):
+        asyncio.run(scenario())
+    analysis.assert_called_once_with('My resume', 'The JD', 'key')
+    story_manager.save_story.assert_called_once_with('Go', 'Wrote Go', has_experience=True)
+
+def test_http_errors(tmp_path):
+    async def scenario():
+        workflow_service = WorkflowService('key', MagicMock(), str(tmp_path))
+        server, _ = await service.serve('127.0.0.1', 0, workflow_service)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            assert (await http(port, 'POST', '/sessions', {'resume': 'only resume'}))[0] == 400
+            assert (await http(port, 'GET', '/sessions'))[0] == 405
+            assert (await http(port, 'GET', '/sessions/nope/gaps'))[0] == 404
+        finally:
+            server.close()
+            await server.wait_closed()
+            workflow_service.close()
+
+    with patch('service.enable_client_pool'):
+        asyncio.run(scenario())
+
+def test_finished_sessions_are_evicted_after_ttl(tmp_path):
+    release = threading.Event()
+    workflow = lambda api_key, io, *a, **kw: release.wait(5) and io.display_gaps([])
+
+    async def scenario():
+        workflow_service = WorkflowService('key', MagicMock(), str(tmp_path), finished_ttl=60)
+        finished = workflow_service.start_session('resume', 'jd')
+        running = workflow_service.start_session('resume', 'jd')
+        release.set()
+        while finished.ended_at is None or running.ended_at is None:
+            await asyncio.sleep(0.01)
+        running.ended_at = None  # still going as far as eviction is concerned
+        assert workflow_service.evict_finished(finished.ended_at + 59) == 0
+        assert workflow_service.evict_finished(finished.ended_at + 60) == 1
+        assert list(workflow_service.sessions) == [running.id]
+        assert (tmp_path / "service" / finished.id / "resume.txt").exists()
+        workflow_service.close()
+
+    with patch('service.main.run_workflow', side_effect=workflow):
+        asyncio.run(asyncio.wait_for(scenario(), 5))
+
+def test_background_compaction(tmp_path):
+    story_manager = MagicMock()
+    story_manager.compact.return_value = {'stories_before': 3, 'stories_after': 2,
+                                          'prompt_tokens_before': 30, 'prompt_tokens_after': 20}
+
+    async def scenario():
+        workflow_service = WorkflowService('key', story_manager, str(tmp_path))
+        workflow_service.start_background_compaction(0.01)
+        while not story_manager.compact.called:
+            await asyncio.sleep(0.01)
+        workflow_service.close()
+
+    asyncio.run(asyncio.wait_for(scenario(), 5))
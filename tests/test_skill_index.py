@@ -0,0 +1,66 @@
+import os
+import json
+import tempfile
+from utils.skill_index import SkillIndex, normalize_skill
+
+def make_index(temp_dir):
+    return SkillIndex(os.path.join(temp_dir, "skill_index.json"))
+
+def test_canonical_handles_case_punctuation_and_abbreviations():
+    index = SkillIndex(index_file=None)
+    assert index.canonical("K8s") == index.canonical("kubernetes.") == "kubernetes"
+    assert index.canonical("CI/CD") == index.canonical("Continuous Integration") == "cicd"
+    assert index.canonical("Machine Learning (ML)") == index.canonical("ML") == "machine learning"
+    assert index.canonical("k8s operations") == "kubernetes operations"
+    assert index.canonical("C++") != index.canonical("C#")
+    assert index.same("Golang", "go")
+    assert normalize_skill("  Project   Management ") == "project management"
+
+def test_add_alias_persists_and_chains():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        index = make_index(temp_dir)
+        assert index.canonical("Container orchestration") == "container orchestration"
+        assert index.add_alias("Container Orchestration", "K8s")
+        assert not index.add_alias("container orchestration", "Kubernetes")
+        assert index.canonical("container orchestration") == "kubernetes"
+        with open(os.path.join(temp_dir, "skill_index.json")) as f:
+            assert json.load(f) == {"version": 2, "aliases": {"container orchestration": "kubernetes"}, "links": {}}
+        reloaded = make_index(temp_dir)
+        reloaded.add_alias("Cluster scheduling", "container orchestration", save=False)
+        assert reloaded.canonical("cluster scheduling") == "kubernetes"
+
+def test_learn_from_verdict_needs_a_confident_named_story():
+    index = SkillIndex(index_file=None)
+    stories = [{"skill": "Kubernetes", "story": "s"}, {"skill": "Python", "story": "t"}]
+    assert not index.learn_from_verdict("Container orchestration", stories, True, 0.5, "Kubernetes story")
+    assert not index.learn_from_verdict("Container orchestration", stories, False, 0.9, "Kubernetes story")
+    assert not index.learn_from_verdict("Container orchestration", stories, True, 0.9, "A story about clusters")
+    assert not index.learn_from_verdict("Scripting", stories, True, 0.9, "Both the Python and K8s stories")
+    assert index.learn_from_verdict("Container orchestration", stories, True, 0.9, "The K8s story covers it")
+    assert not index.learn_from_verdict("Container orchestration", stories, True, 0.9, "The K8s story covers it")
+    assert index.linked_skill("Container Orchestration") == "kubernetes"
+    assert index.canonical("Container Orchestration") == "container orchestration"
+    assert index.linked_skill("Python") is None
+
+def test_learned_link_does_not_merge_or_rename_stories(tmp_path):
+    from utils.story_manager import StoryManager
+    index = SkillIndex(str(tmp_path / "skill_index.json"))
+    manager = StoryManager(str(tmp_path / "stories.json"), index)
+    manager.save_story("Docker", "Containerized our build and deploy pipeline.", has_experience=True)
+    manager.save_story("Kubernetes", "Containerized our build and deploy pipeline on EKS.", has_experience=True)
+    assert index.learn_from_verdict("Kubernetes", manager.get_relevant_stories()[:1], True, 0.95,
+                                    "The Docker story shows container work")
+    assert index.canonical("Kubernetes") == "kubernetes" and index.canonical("k8s") == "kubernetes"
+    assert index.canonical("Docker") == "docker"
+    manager.compact()
+    assert [s["skill"] for s in manager.get_relevant_stories()] == ["Docker", "Kubernetes"]
+    assert manager.find_story("k8s")["skill"] == "Kubernetes"
+    reloaded = SkillIndex(str(tmp_path / "skill_index.json"))
+    assert reloaded.linked_skill("k8s") == "docker" and reloaded.canonical("k8s") == "kubernetes"
+
+def test_unversioned_index_file_aliases_load_as_links(tmp_path):
+    path = tmp_path / "skill_index.json"
+    path.write_text(json.dumps({"aliases": {"kubernetes": "docker"}}))
+    index = SkillIndex(str(path))
+    assert index.canonical("k8s") == "kubernetes"
+    assert index.linked_skill("Kubernetes") == "docker"
@@ -0,0 +1,36 @@
+import threading
+from utils.speculation import SpeculativeTask, SpeculationStats
+
+def test_take_returns_result_and_head_start():
+    task = SpeculativeTask(lambda cancel: "next result")
+    result, saved = task.take()
+    assert result == "next result"
+    assert saved >= 0.0
+
+def test_discard_sets_cancel_event_and_reports_when_done():
+    started = threading.Event()
+    done = threading.Event()
+    seen = []
+
+    def work(cancel):
+        started.set()
+        cancel.wait(5)
+        return "cancelled" if cancel.is_set() else "finished"
+
+    task = SpeculativeTask(work)
+    started.wait(5)
+    task.discard(on_done=lambda t: (seen.append(t.future.result()), done.set()))
+    assert done.wait(5)
+    assert seen == ["cancelled"]
+
+def test_speculation_stats():
+    stats = SpeculationStats()
+    assert stats.hit_rate == 0.0
+    stats.record_hit(2.5)
+    stats.record_hit(1.5)
+    stats.record_miss(300)
+    assert stats.hits == 2 and stats.misses == 1
+    assert stats.hit_rate == 2 / 3
+    assert stats.saved_seconds == 4.0
+    assert stats.wasted_tokens == 300
+    assert "2/3 prefetches used" in stats.summary()
@@ -0,0 +1,49 @@
+from unittest.mock import patch
+from utils.story_compaction import compact_stories, compaction_report, group_by_skill, skill_key
+
+def story(skill, text, has_experience=True, timestamp=""):
+    return {"skill": skill, "story": text, "has_experience": has_experience, "timestamp": timestamp}
+
+def test_skill_key_and_grouping():
+    assert skill_key("CI/CD ") == skill_key("ci cd")
+    stories = [story("Project Management", "a"), story("project managment", "b"), story("Python", "c")]
+    assert sorted(group_by_skill(stories).values()) == [[0, 1], [2]]
+
+def test_repeated_negatives_collapse_to_latest():
+    stories = [story("COBOL", "No relevant experience", False, "1"),
+               story("Cobol", "No relevant experience", False, "2"),
+               story("Python", "Wrote a script.")]
+    kept, removed = compact_stories(stories)
+    assert kept == [story("Cobol", "No relevant experience", False, "2"), stories[2]]
+    assert removed == {0: "repeated negative"}
+
+def test_negative_dropped_once_a_story_exists():
+    stories = [story("Go", "No relevant experience", False), story("Go", "Built a Go service.")]
+    kept, removed = compact_stories(stories)
+    assert kept == [stories[1]]
+    assert removed == {0: "negative superseded by a story"}
+
+def test_edited_story_keeps_latest_and_distinct_stories_survive():
+    stories = [story("Leadership", "Led a team of 4 through a migration.", timestamp="1"),
+               story("Leadership", "Mentored two interns over a summer.", timestamp="2"),
+               story("leadership", "Led a team of 6 through a migration.", timestamp="3")]
+    kept, removed = compact_stories(stories)
+    assert [s["story"] for s in kept] == ["Mentored two interns over a summer.", "Led a team of 6 through a migration."]
+    assert all(s["skill"] == "leadership" for s in kept)
+    assert removed == {0: "older version of an edited story"}
+
+def test_compaction_report_counts_prompt_tokens():
+    before = [story("Go", "x" * 400, timestamp="1"), story("Go", "x" * 400 + " more", timestamp="2"),
+              story("COBOL", "No relevant experience", False)]
+    after, removed = compact_stories(before)
+    with patch("utils.token_budget._encoder", return_value=None):
+        report = compaction_report(before, after, removed)
+    assert report["stories_before"] == 3 and report["stories_after"] == 2
+    assert report["removed"] == {"older version of an edited story": 1}
+    assert report["prompt_tokens_after"] < report["prompt_tokens_before"]
+    assert 0.4 < report["prompt_token_reduction"] < 0.6
+
+def test_compaction_merges_synonym_skills():
+    stories = [story("K8s", "No relevant experience", False), story("Kubernetes", "Ran clusters.")]
+    kept, removed = compact_stories(stories)
+    assert kept == [stories[1]]
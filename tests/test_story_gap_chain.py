@@ -90,4 +90,86 @@ def test_story_answers_gap_llm_summary_indicates_no_match():
                     'Python', 'Tell me about Python', [{'skill': 'Python', 'story': 'Did Python stuff.'}], 'fake-key')
                 assert answered is False
                 assert summary == 'Not directly addressed'
-                assert confidence == 0.5 
\ No newline at end of file
+                assert confidence == 0.5 
+
+def run_cascade(responses, models=('cheap-model', 'strong-model')):
+    with patch('chains.story_gap_chain.ChatOpenAI') as mock_chat_openai, \
+         patch('chains.story_gap_chain.PromptTemplate', create=True) as mock_prompt, \
+         patch.object(story_gap_chain, 'GAP_CHECK_MODELS', list(models)), \
+         patch.object(story_gap_chain, 'cascade_stats', story_gap_chain.CascadeStats()) as stats:
+        mock_chain = MagicMock()
+        mock_chain.invoke.side_effect = [{'content': r} for r in responses]
+        mock_prompt.return_value.__or__.return_value = mock_chain
+        verdict = story_answers_gap_llm('Python', 'Tell me about Python', [{'skill': 'Python', 'story': 'Did Python stuff.'}], 'fake-key')
+        used_models = [c.kwargs['model'] for c in mock_chat_openai.call_args_list]
+        return verdict, used_models, stats
+
+def test_cascade_stops_at_confident_cheap_tier():
+    verdict, models, stats = run_cascade(['{"answered": true, "summary": "Match", "confidence": 0.9}'])
+    assert verdict == (True, 'Match', 0.9)
+    assert models == ['cheap-model']
+    assert stats.escalations == 0
+
+def test_cascade_escalates_uncertain_verdict():
+    verdict, models, stats = run_cascade([
+        '{"answered": true, "summary": "Maybe", "confidence": 0.5}',
+        '{"answered": false, "summary": "", "confidence": 0.2}',
+    ])
+    assert verdict == (False, '', 0.2)
+    assert models == ['cheap-model', 'strong-model']
+    assert stats.escalations == 1
+    assert stats.disagreement_rate == 1.0
+    assert stats.tiers['cheap-model']['calls'] == 1
+
+def test_cascade_escalates_on_unparseable_json():
+    verdict, models, stats = run_cascade([
+        'no json at all',
+        '{"answered": true, "summary": "Match", "confidence": 0.8}',
+    ])
+    assert verdict == (True, 'Match', 0.8)
+    assert models == ['cheap-model', 'strong-model']
+    assert stats.tiers['cheap-model']['parse_failures'] == 1
+    assert stats.comparisons == 0
+
+def test_compact_verdict_cites_story_ids():
+    stories = [{'skill': 'Java', 'story': 'Ported a service. It was big.'},
+               {'skill': 'Python', 'story': 'Wrote a Python ETL job. Saved hours.'}]
+    with patch('chains.story_gap_chain.ChatOpenAI') as mock_chat_openai:
+        mock_chain = MagicMock()
+        mock_chain.invoke.return_value = {'content': '{"a": true, "ids": ["S2"], "c": 0.9}'}
+        with patch('chains.story_gap_chain.PromptTemplate', create=True) as mock_prompt:
+            mock_prompt.return_value.__or__.return_value = mock_chain
+            verdict = story_answers_gap_llm('Python', 'Tell me about Python', stories, 'fake-key', compact=True)
+    assert verdict == (True, '[Python] Wrote a Python ETL job. Saved hours.', 0.9)
+    assert mock_prompt.call_args.kwargs['template'] == story_gap_chain.COMPACT_GAP_TEMPLATE
+    assert 'S2 [Python] Wrote a Python ETL job.' in mock_chain.invoke.call_args[0][0]['stories_context']
+    assert mock_chat_openai.call_args.kwargs['max_tokens'] == (
+        story_gap_chain.COMPACT_VERDICT_BASE_TOKENS + 2 * story_gap_chain.COMPACT_VERDICT_ID_TOKENS)
+
+def test_cited_summary_ignores_unknown_ids():
+    stories = [{'skill': 'Go', 'story': 'Built a CLI.'}]
+    assert story_gap_chain.cited_summary(['S1', 's1', 'S7', 'x'], stories) == '[Go] Built a CLI.'
+    assert story_gap_chain.cited_summary(None, stories) == ''
+
+def test_explain_gap_verdict_fetches_prose_summary():
+    with patch('chains.story_gap_chain.ChatOpenAI'), \
+         patch('chains.story_gap_chain.PromptTemplate', create=True) as mock_prompt:
+        mock_chain = MagicMock()
+        mock_chain.invoke.return_value = {'content': '{"answered": true, "summary": "The Go CLI story shows it", "confidence": 0.9}'}
+        mock_prompt.return_value.__or__.return_value = mock_chain
+        assert story_gap_chain.explain_gap_verdict('Go', 'q', [{'skill': 'Go', 'story': 'Built a CLI.'}], 'k') == 'The Go CLI story shows it'
+    assert story_gap_chain.explain_gap_verdict('Go', 'q', [], 'k') == ''
+
+def test_cascade_stats_are_kept_per_session():
+    from utils.metrics import start_session_stats
+    start_session_stats()
+    run_cascade(['{"answered": true, "summary": "Match", "confidence": 0.9}'])
+    assert story_gap_chain.session_cascade_stats().tiers['cheap-model']['calls'] == 1
+    start_session_stats()
+    verdict, _, process_stats = run_cascade([
+        '{"answered": true, "summary": "Maybe", "confidence": 0.5}',
+        '{"answered": false, "summary": "", "confidence": 0.2}',
+    ])
+    session = story_gap_chain.session_cascade_stats()
+    assert session.tiers['cheap-model']['calls'] == 1 and session.escalations == 1
+    assert process_stats.escalations == 1
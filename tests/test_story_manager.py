@@ -55,4 +55,83 @@ def test_save_story_appends():
             data = json.load(f)
         assert len(data["stories"]) == 2
         assert data["stories"][0]["skill"] == "Skill1"
-        assert data["stories"][1]["skill"] == "Skill2" 
\ No newline at end of file
+        assert data["stories"][1]["skill"] == "Skill2" 
+def test_load_stories_is_cached_until_file_changes():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        stories_file = os.path.join(temp_dir, "stories.json")
+        manager = StoryManager(stories_file=stories_file)
+        manager.save_story("Python", "Wrote a script.", True)
+        from unittest.mock import patch
+        with patch.object(manager, "_read_stories") as mock_read:
+            assert manager.get_all_stories()[0]["skill"] == "Python"
+            mock_read.assert_not_called()
+        # Another process (or manager) writing the file invalidates the cache
+        other = StoryManager(stories_file=stories_file)
+        other.save_story("Go", "Built a service with a much longer story.", True)
+        assert [s["skill"] for s in manager.get_all_stories()] == ["Python", "Go"]
+        # Mutating a returned list must not leak into the cache
+        manager.load_stories()["stories"].append({"skill": "Leak"})
+        assert len(manager.get_all_stories()) == 2
+
+def test_repeated_negatives_are_not_stored_and_are_indexed():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        manager = StoryManager(stories_file=os.path.join(temp_dir, "stories.json"))
+        manager.save_story("COBOL", "No relevant experience", False)
+        manager.save_story("cobol ", "No relevant experience", False)
+        assert len(manager.get_all_stories()) == 1
+        assert manager.has_no_experience("Cobol")
+        assert not manager.has_no_experience("Python")
+        manager.save_story("COBOL", "Maintained a payroll system.", True)
+        assert not manager.has_no_experience("COBOL")
+
+def test_compact_rewrites_file():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        stories_file = os.path.join(temp_dir, "stories.json")
+        with open(stories_file, "w") as f:
+            json.dump({"stories": [
+                {"skill": "Go", "story": "No relevant experience", "has_experience": False},
+                {"skill": "Go", "story": "No relevant experience", "has_experience": False},
+                {"skill": "Python", "story": "Wrote a script.", "has_experience": True},
+            ]}, f)
+        manager = StoryManager(stories_file=stories_file)
+        report = manager.compact(dry_run=True)
+        assert report["stories_after"] == 2 and len(manager.get_all_stories()) == 3
+        manager.compact()
+        with open(stories_file) as f:
+            assert [s["skill"] for s in json.load(f)["stories"]] == ["Go", "Python"]
+
+def test_find_story_uses_the_skill_index():
+    from utils.skill_index import SkillIndex
+    with tempfile.TemporaryDirectory() as temp_dir:
+        manager = StoryManager(os.path.join(temp_dir, "stories.json"), SkillIndex(index_file=None))
+        manager.save_story("Kubernetes", "First cluster.", True)
+        manager.save_story("k8s", "Second cluster.", True)
+        assert manager.find_story("K8S")["story"] == "Second cluster."
+        assert manager.find_story("Python") is None
+        manager.save_story("Golang", "No relevant experience", False)
+        assert manager.has_no_experience("go")
+
+def test_embedding_index_tracks_saved_stories():
+    from utils.embedding_index import EmbeddingIndex
+    with tempfile.TemporaryDirectory() as temp_dir:
+        index = EmbeddingIndex(os.path.join(temp_dir, "index"), dimensions=128)
+        manager = StoryManager(os.path.join(temp_dir, "stories.json"), embedding_index=index)
+        manager.save_story("Kubernetes", "Migrated services onto Kubernetes clusters.", True)
+        manager.save_story("Python", "Built Python data pipelines.", True)
+        manager.save_story("COBOL", "No relevant experience", False)
+        assert len(index) == 2
+        assert manager.similar_stories("python pipelines", 1)[0]["skill"] == "Python"
+        manager.save_story("Python", "Built Python data pipelines at scale.", True)
+        manager.compact()
+        assert len(index) == 2
+        assert [s["story"] for s in manager.similar_stories("python pipelines", 1)] == ["Built Python data pipelines at scale."]
+
+def test_sync_embedding_index_backfills():
+    from utils.embedding_index import EmbeddingIndex
+    with tempfile.TemporaryDirectory() as temp_dir:
+        stories_file = os.path.join(temp_dir, "stories.json")
+        StoryManager(stories_file).save_story("Go", "Wrote a Go service.", True)
+        index = EmbeddingIndex(os.path.join(temp_dir, "index"), dimensions=64)
+        manager = StoryManager(stories_file, embedding_index=index)
+        manager.sync_embedding_index()
+        assert len(index) == 1
@@ -5,12 +5,16 @@ from utils.text_parsing import (
     extract_gaps_json,
     cleanse_llm_response,
     extract_llm_content,
+    extract_compact_job_fit,
     read_file_or_exit,
     FileReadError,
     extract_json_from_llm_result,
     LLMJsonParseError,
     extract_json_from_string,
     GapsJsonParseError,
+    repair_json,
+    loads_with_repair,
+    json_parse_stats,
 )
 import tempfile
 import os
@@ -145,3 +149,86 @@ def test_extract_gaps_json_raises_custom_exception():
         assert "[not valid json]" in str(e)
     else:
         assert False, "GapsJsonParseError not raised"
+
+def test_repair_json_trailing_commas_and_single_quotes():
+    repaired = repair_json("{'answered': True, 'summary': 'team's work', 'confidence': 0.8,}")
+    assert json.loads(repaired) == {"answered": True, "summary": "team's work", "confidence": 0.8}
+
+def test_repair_json_smart_quotes_and_newlines():
+    repaired = repair_json('{“summary”: “line one\nline two”}')
+    assert json.loads(repaired) == {"summary": "line one\nline two"}
+
+def test_repair_json_truncated_final_element():
+    text = '[{"skill": "A", "question": "Q1"}, {"skill": "B", "quest'
+    assert json.loads(repair_json(text)) == [{"skill": "A", "question": "Q1"}]
+
+def test_repair_json_code_fence_and_prose():
+    assert json.loads(repair_json('Here you go:\n```json\n[1, 2,]\n```')) == [1, 2]
+
+def test_repair_json_drops_trailing_prose():
+    text = '{"answered": true, "summary": "ok"} Hope this helps!'
+    assert loads_with_repair(text) == {"answered": True, "summary": "ok"}
+    assert json.loads(repair_json('```json\n[1, 2]\n```\nLet me know [if] you need more.')) == [1, 2]
+    assert json.loads(repair_json("{'summary': 'uses } inside'} thanks")) == {"summary": "uses } inside"}
+
+def test_repair_json_closes_truncated_object_before_cutting_back():
+    text = '{"answered": true, "summary": "x", "confidence": 0.9'
+    assert json.loads(repair_json(text)) == {"answered": True, "summary": "x", "confidence": 0.9}
+    # A dangling key can't be closed, so the object is cut back to its last complete member
+    assert json.loads(repair_json('{"answered": true, "summary": "x", "confid')) == {"answered": True, "summary": "x"}
+
+def test_extract_gaps_json_repairs_truncated_array():
+    text = 'GAPS:\n[{"skill": "A", "question": "Q1"},\n{"skill": "B", "question": "Tell me'
+    assert extract_gaps_json(text) == [{"skill": "A", "question": "Q1"}, {"skill": "B", "question": "Tell me"}]
+    text = 'GAPS:\n[{"skill": "A", "question": "Q1"},\n{"skill": "B", "quest'
+    assert extract_gaps_json(text) == [{"skill": "A", "question": "Q1"}]
+
+def test_extract_gaps_json_nested_brackets():
+    text = 'GAPS: [{"skill": "C++ [STL]", "question": "Q"}]'
+    assert extract_gaps_json(text) == [{"skill": "C++ [STL]", "question": "Q"}]
+
+def test_loads_with_repair_counts_paths():
+    json_parse_stats.clear()
+    loads_with_repair('[1]')
+    loads_with_repair('[1,]')
+    loads_with_repair('nope', reask=lambda raw: '[2]')
+    with pytest.raises(LLMJsonParseError):
+        loads_with_repair('nope', reask=lambda raw: 'still nope')
+    assert json_parse_stats == {"clean": 1, "repaired": 1, "reask": 1, "failed": 1}
+
+def test_session_parse_stats_are_per_session_and_thread():
+    import threading
+    from utils.metrics import start_session_stats
+    from utils.text_parsing import session_parse_stats
+    start_session_stats()
+    loads_with_repair('[1,]')
+    assert session_parse_stats() == {"repaired": 1}
+    start_session_stats()
+    assert session_parse_stats() == {}
+    other = []
+    thread = threading.Thread(target=lambda: (start_session_stats(), loads_with_repair('[1]'),
+                                              other.append(dict(session_parse_stats()))))
+    thread.start()
+    thread.join()
+    assert other == [{"clean": 1}]
+    assert session_parse_stats() == {}
+
+def test_extract_list_section():
+    from utils.text_parsing import extract_list_section
+    output = "ALIGNMENT:\n- Kubernetes\nREMOVED:\nNone\nRESOLVED:\n- Go\n- Rust\nGAPS:\n[]"
+    assert extract_list_section(output, "ALIGNMENT") == ["Kubernetes"]
+    assert extract_list_section(output, "REMOVED") == []
+    assert extract_list_section(output, "RESOLVED") == ["Go", "Rust"]
+    assert extract_list_section(output, "MISSING") == []
+
+def test_extract_compact_job_fit_uses_short_gap_skills():
+    requirements = [{"requirement": "5+ years of Python", "priority": "required"},
+                    {"requirement": "Experience with Kubernetes in production", "priority": "required"},
+                    {"requirement": "Mentoring junior engineers", "priority": "preferred"},
+                    {"requirement": "Go or Rust", "priority": "preferred"}]
+    output = ('ALIGNED:\n- R1\n- R4\nGAPS: [{"id": "R2", "skill": "Kubernetes", "q": "Tell me about Kubernetes"}, '
+              '{"id": "R3", "q": "Tell me about mentoring"}]')
+    alignment, gaps = extract_compact_job_fit(output, requirements)
+    assert alignment == ["5+ years of Python", "Go or Rust"]
+    assert gaps == [{"skill": "Kubernetes", "question": "Tell me about Kubernetes"},
+                    {"skill": "Mentoring junior engineers", "question": "Tell me about mentoring"}]
@@ -0,0 +1,71 @@
+import pytest
+from unittest.mock import patch
+from utils import token_budget
+from utils.token_budget import context_limit, count_tokens, pack_stories, prompt_budget, summarize_story
+
+def make_story(skill, story, timestamp="2024-01-01T00:00:00"):
+    return {"skill": skill, "story": story, "has_experience": True, "timestamp": timestamp}
+
+def test_context_limit_known_and_unknown_models():
+    assert context_limit("gpt-3.5-turbo") == 16385
+    assert context_limit("gpt-4-turbo-preview") == 128000
+    assert context_limit("some-other-model") == token_budget.DEFAULT_CONTEXT_LIMIT
+
+def test_context_limit_override():
+    with patch.object(token_budget, 'OPENAI_CONTEXT_LIMIT', 4000):
+        assert context_limit("gpt-4-turbo-preview") == 4000
+
+def test_count_tokens_estimate_without_encoder():
+    with patch.object(token_budget, '_encoder', return_value=None):
+        assert count_tokens("") == 0
+        assert count_tokens("a" * 40) == 11
+
+def test_prompt_budget_measures_parts():
+    with patch.object(token_budget, 'count_tokens', side_effect=lambda text, model: len(text)):
+        remaining, parts = prompt_budget("gpt-4", {"resume": "x" * 100, "job_description": "y" * 50}, 1000)
+        assert parts == {"resume": 100, "job_description": 50}
+        assert remaining == 8192 - 1000 - token_budget.MESSAGE_OVERHEAD_TOKENS - 150
+
+def test_pack_stories_keeps_everything_when_it_fits():
+    stories = [make_story("Python", "Wrote a script."), make_story("Leadership", "Led a team.")]
+    packed, report = pack_stories(stories, "gpt-4-turbo-preview", {"resume": "resume"}, 100)
+    assert packed == stories
+    assert report["dropped"] == [] and report["summarized"] == []
+
+def test_pack_stories_drops_lowest_priority_first():
+    long_text = "Did things. " * 400
+    stories = [make_story("Cooking", long_text), make_story("Kubernetes", long_text)]
+    with patch.object(token_budget, '_encoder', return_value=None), \
+         patch.object(token_budget, 'OPENAI_CONTEXT_LIMIT', 1600):
+        packed, report = pack_stories(stories, "gpt-4", {"resume": "r"}, 200, relevance_text="Kubernetes clusters")
+    # Original order is preserved; only the less relevant story is cut down
+    assert [s["skill"] for s in packed] == ["Cooking", "Kubernetes"]
+    assert packed[1]["story"] == long_text
+    assert len(packed[0]["story"]) < len(long_text)
+    assert report["summarized"] == ["Cooking"]
+
+def test_pack_stories_keeps_pinned_story_on_a_tight_budget():
+    long_text = "Did things. " * 400
+    stories = [make_story("Kubernetes", long_text), make_story("Container orchestration", long_text)]
+    with patch.object(token_budget, '_encoder', return_value=None), \
+         patch.object(token_budget, 'OPENAI_CONTEXT_LIMIT', 1600):
+        unpinned, _ = pack_stories(stories, "gpt-4", {"resume": "r"}, 200, relevance_text="Container orchestration")
+        packed, report = pack_stories(stories, "gpt-4", {"resume": "r"}, 200, relevance_text="Container orchestration",
+                                      pinned=[stories[0]])
+    assert unpinned[1]["story"] == long_text
+    assert packed[0]["story"] == long_text
+    assert report["summarized"] == ["Container orchestration"]
+
+def test_pack_stories_drops_when_summary_does_not_fit():
+    stories = [make_story("Cooking", "Made soup. " * 50)]
+    with patch.object(token_budget, 'OPENAI_CONTEXT_LIMIT', 300):
+        packed, report = pack_stories(stories, "gpt-4", {"resume": "r"}, 240)
+    assert packed == []
+    assert report["dropped"] == ["Cooking"]
+
+def test_summarize_story_keeps_leading_sentences():
+    story = make_story("Go", "First sentence. Second sentence. " + "More words here. " * 100)
+    summary = summarize_story(story, max_tokens=10)
+    assert summary["story"].startswith("First sentence.")
+    assert count_tokens(summary["story"]) <= 12
+    assert summary["skill"] == "Go"
@@ -0,0 +1,96 @@
+import sys
+import json
+import argparse
+from utils.config import OPENAI_API_KEY, RESULTS_DB
+from utils.jd_feed import iter_postings, process_postings, FeedError
+from utils.metrics import start_call_log, stop_call_log
+from utils.results_store import ResultsStore
+from utils.text_parsing import read_file_or_exit, FileReadError
+from utils.story_manager import StoryManager
+import main
+
+def analyze_posting(posting, resume_text, api_key, story_manager=None, json_fixer=None):
+    """Job fit of the resume against one posting, which gaps the story bank already answers, and the LLM calls made"""
+    calls = start_call_log()
+    try:
+        output = main.run_job_fit_analysis(resume_text, posting["description"], api_key)
+        alignment, gaps = main.parse_job_fit_output(output, json_fixer)
+        answered, unanswered = [], gaps
+        if gaps and story_manager is not None:
+            answered, unanswered = main.analyze_gaps_with_llm(gaps, story_manager.get_relevant_stories(), api_key,
+                                                              json_fixer, story_manager=story_manager)
+    finally:
+        stop_call_log()
+    return {
+        "alignment": alignment,
+        "gaps": gaps,
+        "answered": [{"skill": item["gap"].get("skill"), "summary": item["summary"], "confidence": item["confidence"]}
+                     for item in answered],
+        "unanswered": [gap.get("skill") for gap in unanswered],
+        "verdicts": main.gap_verdicts(answered, unanswered if story_manager is not None else []),
+        "calls": calls,
+    }
+
+def store_batch(store, rows, resume_text, resume_path):
+    """Writes finished (posting, result) pairs to the results store in one transaction"""
+    with store.batch():
+        for posting, result in rows:
+            store.add_analysis(posting, resume_text, result["alignment"], result["gaps"], result["verdicts"],
+                               result["calls"], resume_path=resume_path)
+
+def result_record(posting, result, error):
+    record = {key: posting[key] for key in ("id", "title", "company", "source", "key")}
+    if error is not None:
+        record["error"] = f"{type(error).__name__}: {error}"
+    else:
+        record.update(result)
+    return record
+
+def main_cli():  # pragma: no cover
+    parser = argparse.ArgumentParser(description='Analyze a resume against every posting in JSONL/CSV feeds or directories')
+    parser.add_argument('feeds', nargs='+', help='JSONL, CSV or text files (optionally .gz) or directories of them')
+    parser.add_argument('--resume', required=True, help='Resume file')
+    parser.add_argument('--out', help='JSONL file for the results (default: stdout)')
+    parser.add_argument('--workers', type=int, default=4, help='Postings analyzed concurrently')
+    parser.add_argument('--max-pending', type=int, help='Postings read ahead of the workers (default: 2 x workers)')
+    parser.add_argument('--no-stories', action='store_true', help="Don't check gaps against the story bank")
+    parser.add_argument('--db', default=RESULTS_DB, help="SQLite results store to add the analyses to ('' to skip)")
+    parser.add_argument('--batch-size', type=int, default=100, help='Analyses written to the results store per transaction')
+    args = parser.parse_args()
+    try:
+        resume_text = read_file_or_exit(args.resume, "resume")
+    except FileReadError as e:
+        sys.exit(str(e))
+    story_manager = None if args.no_stories else StoryManager()
+    json_fixer = main.make_json_fixer(OPENAI_API_KEY)
+    handle = lambda posting: analyze_posting(posting, resume_text, OPENAI_API_KEY, story_manager, json_fixer)
+    out = open(args.out, "w") if args.out else sys.stdout
+    store = ResultsStore(args.db) if args.db else None
+    rows = []
+    done = failed = 0
+    try:
+        for posting, result, error in process_postings(iter_postings(args.feeds), handle, args.workers, args.max_pending):
+            out.write(json.dumps(result_record(posting, result, error)) + "\n")
+            out.flush()
+            if store is not None and error is None:
+                rows.append((posting, result))
+                if len(rows) >= args.batch_size:
+                    store_batch(store, rows, resume_text, args.resume)
+                    rows = []
+            done += 1
+            failed += error is not None
+            if args.out:
+                print(f"\r{done} postings analyzed, {failed} failed", end="", file=sys.stderr, flush=True)
+    except FeedError as e:
+        sys.exit(str(e))
+    finally:
+        if store is not None:
+            if rows:
+                store_batch(store, rows, resume_text, args.resume)
+            store.close()
+        if args.out:
+            out.close()
+            print(file=sys.stderr)
+
+if __name__ == '__main__':  # pragma: no cover
+    main_cli()
@@ -0,0 +1,110 @@
+import json
+import time
+import argparse
+import statistics
+from utils.resume_edits import apply_edits
+from utils.token_budget import count_tokens
+
+SAMPLE_RESUME = """Jane Doe
+jane@example.com
+
+PROFESSIONAL SUMMARY
+Engineering leader with 10 years of experience building data platforms.
+
+EXPERIENCE
+Senior Engineer, Acme (2019-2024)
+- Built a streaming ingestion pipeline handling 2B events a day
+- Led a team of six engineers across two time zones
+- Cut cloud spend by 30% by moving batch jobs to spot instances
+Engineer, Initech (2014-2019)
+- Maintained the billing service
+- Wrote internal tooling in Python
+
+SKILLS
+- Python, Go, SQL
+- Kafka, Spark, Airflow
+"""
+
+# What a typical tailoring step changes: a reworded bullet, a new skill, a dropped bullet
+SAMPLE_EDITS = [
+    {"op": "replace", "old": "- Maintained the billing service",
+     "new": "- Owned the billing service, reducing invoice errors by 40%"},
+    {"op": "append", "section": "Skills", "text": "Kubernetes, Terraform"},
+    {"op": "delete", "old": "- Wrote internal tooling in Python"},
+]
+
+def bench(resume_text, edits, ttft=0.5, tokens_per_second=50.0, repeats=200, model=None):
+    """
+    Completion tokens and estimated step latency of a full rewrite versus an edit list for the same
+    change. Latency is modelled as time-to-first-token plus completion tokens at the given throughput;
+    the edit path adds the measured time to apply the edits locally.
+    """
+    rewritten, _ = apply_edits(resume_text, edits)
+    edits_json = json.dumps(edits)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        apply_edits(resume_text, edits)
+        timings.append(time.perf_counter() - start)
+    apply_seconds = statistics.median(timings)
+    options = {"model": model} if model else {}
+    full_tokens = count_tokens(rewritten, **options)
+    edit_tokens = count_tokens(edits_json, **options)
+    return {
+        "full_tokens": full_tokens,
+        "edit_tokens": edit_tokens,
+        "full_s": ttft + full_tokens / tokens_per_second,
+        "edit_s": ttft + edit_tokens / tokens_per_second + apply_seconds,
+        "apply_ms": apply_seconds * 1000,
+    }
+
+def bench_live(resume_text, job_description, prompt_numbers):  # pragma: no cover
+    """Runs each prompt both ways against the API and reports measured completion tokens and wall time"""
+    from applygorithminator import Applygorithminator
+    customizer = Applygorithminator()
+    rows = []
+    for prompt_number in prompt_numbers:
+        row = {"prompt": prompt_number}
+        for mode, edit_ops in (("full", False), ("edit", True)):
+            logged = len(customizer.usage_log)
+            start = time.perf_counter()
+            _, error = customizer.apply_prompt(resume_text, job_description, prompt_number, echo=False,
+                                               edit_ops=edit_ops)
+            row[f"{mode}_s"] = time.perf_counter() - start
+            row[f"{mode}_tokens"] = sum(e["completion_tokens"] for e in customizer.usage_log[logged:])
+            row[f"{mode}_error"] = error
+        rows.append(row)
+    return rows
+
+def main():  # pragma: no cover
+    parser = argparse.ArgumentParser(description='Compare full-resume rewrites with edit-operation replies')
+    parser.add_argument('--resume', help='Resume file (default: a built-in sample)')
+    parser.add_argument('--edits', help='JSON file with an edit list for the resume (default: built-in sample edits)')
+    parser.add_argument('--ttft', type=float, default=0.5, help='Time to first token, seconds')
+    parser.add_argument('--tokens-per-second', type=float, default=50.0, help='Completion throughput')
+    parser.add_argument('--live', metavar='JOB_DESCRIPTION',
+                        help='Also run the customization prompts against the API with this job description')
+    parser.add_argument('--prompts', type=int, nargs='*', default=[2, 5, 8])
+    args = parser.parse_args()
+    resume_text = SAMPLE_RESUME
+    if args.resume:
+        with open(args.resume) as f:
+            resume_text = f.read()
+    edits = SAMPLE_EDITS
+    if args.edits:
+        with open(args.edits) as f:
+            edits = json.load(f)
+    r = bench(resume_text, edits, args.ttft, args.tokens_per_second)
+    print(f"{'mode':>6} {'completion':>11} {'step s':>8}")
+    print(f"{'full':>6} {r['full_tokens']:>11} {r['full_s']:>8.2f}")
+    print(f"{'edits':>6} {r['edit_tokens']:>11} {r['edit_s']:>8.2f}   (apply {r['apply_ms']:.3f} ms)")
+    if args.live:
+        with open(args.live) as f:
+            job_description = f.read()
+        print(f"\n{'prompt':>6} {'full tok':>9} {'full s':>7} {'edit tok':>9} {'edit s':>7}")
+        for row in bench_live(resume_text, job_description, args.prompts):
+            print(f"{row['prompt']:>6} {row['full_tokens']:>9} {row['full_s']:>7.2f} "
+                  f"{row['edit_tokens']:>9} {row['edit_s']:>7.2f}")
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
@@ -0,0 +1,65 @@
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+from utils.embedding_index import EmbeddingIndex, DEFAULT_DIMENSIONS, _numpy
+
+def _rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:  # pragma: no cover
+        return float("nan")
+
+def bench(size, dimensions=DEFAULT_DIMENSIONS, queries=20, k=5, directory=None, batch=100000, seed=0):
+    """Builds an index of `size` random vectors; returns build, open and query timings plus memory use"""
+    np = _numpy()
+    rng = np.random.default_rng(seed)
+    directory = directory or tempfile.mkdtemp(prefix="story_index_bench_")
+    try:
+        index = EmbeddingIndex(directory, dimensions=dimensions)
+        start = time.perf_counter()
+        for offset in range(0, size, batch):
+            rows = min(batch, size - offset)
+            index.add_vectors([f"s{offset + i}" for i in range(rows)],
+                              rng.standard_normal((rows, dimensions), dtype=np.float32))
+        build = time.perf_counter() - start
+        rss_before = _rss_mb()
+        start = time.perf_counter()
+        reopened = EmbeddingIndex(directory, dimensions=dimensions)
+        open_seconds = time.perf_counter() - start
+        rss_open = _rss_mb() - rss_before
+        latencies = []
+        for _ in range(queries):
+            query = rng.standard_normal(dimensions, dtype=np.float32)
+            start = time.perf_counter()
+            reopened.search("", k, vector=query)
+            latencies.append(time.perf_counter() - start)
+        return {
+            "size": size,
+            "build_s": build,
+            "open_ms": open_seconds * 1000,
+            "open_rss_mb": rss_open,
+            "query_p50_ms": statistics.median(latencies) * 1000,
+            "query_max_ms": max(latencies) * 1000,
+            "disk_mb": (os.path.getsize(reopened.vectors_file) + os.path.getsize(reopened.manifest_file)) / 2**20,
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+def main():  # pragma: no cover
+    parser = argparse.ArgumentParser(description='Benchmark the memory-mapped story embedding index')
+    parser.add_argument('--sizes', type=int, nargs='*', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--dimensions', type=int, default=DEFAULT_DIMENSIONS)
+    parser.add_argument('--queries', type=int, default=20)
+    args = parser.parse_args()
+    print(f"{'stories':>9} {'build s':>8} {'open ms':>8} {'open MB':>8} {'p50 ms':>8} {'max ms':>8} {'disk MB':>8}")
+    for size in args.sizes:
+        r = bench(size, args.dimensions, args.queries)
+        print(f"{r['size']:>9} {r['build_s']:>8.2f} {r['open_ms']:>8.2f} {r['open_rss_mb']:>8.1f} "
+              f"{r['query_p50_ms']:>8.2f} {r['query_max_ms']:>8.2f} {r['disk_mb']:>8.1f}")
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
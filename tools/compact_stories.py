@@ -0,0 +1,23 @@
+import json
+import argparse
+from utils.story_manager import StoryManager
+
+def format_report(report):
+    lines = [f"Stories: {report['stories_before']} -> {report['stories_after']}"]
+    for reason, count in sorted(report["removed"].items()):
+        lines.append(f"    removed {count} {reason}")
+    lines.append(f"Gap-check prompt tokens: {report['prompt_tokens_before']} -> {report['prompt_tokens_after']} "
+                 f"({report['prompt_token_reduction']:.0%} smaller)")
+    return "\n".join(lines)
+
+def main():  # pragma: no cover
+    parser = argparse.ArgumentParser(description='Deduplicate and compact the story bank')
+    parser.add_argument('--stories-file', default='resources/stories/stories.json', help='Story bank to compact')
+    parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args()
+    report = StoryManager(args.stories_file).compact(dry_run=args.dry_run)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
@@ -0,0 +1,43 @@
+import re
+import sys
+import argparse
+import subprocess
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+def profile_import(module, python=sys.executable):
+    """
+    Imports `module` in a fresh interpreter with -X importtime. Returns (total seconds,
+    [(cumulative seconds, module name)] for the modules it imported directly).
+    """
+    completed = subprocess.run([python, "-X", "importtime", "-c", f"import {module}"],
+                               capture_output=True, text=True, check=True)
+    entries = []
+    for line in completed.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            entries.append((int(match.group(2)) / 1e6, len(match.group(3)), match.group(4)))
+    # Children are listed before their parent and indented one level (two spaces) deeper
+    end = max(i for i, (_, depth, name) in enumerate(entries) if name == module)
+    total, module_depth = entries[end][0], entries[end][1]
+    direct = []
+    for seconds, depth, name in reversed(entries[:end]):
+        if depth <= module_depth:
+            break
+        if depth == module_depth + 2:
+            direct.append((seconds, name))
+    return total, sorted(direct, reverse=True)
+
+def main():  # pragma: no cover
+    parser = argparse.ArgumentParser(description='Show how long the CLI entry points take to import')
+    parser.add_argument('modules', nargs='*', default=['main', 'applygorithminator', 'daemon'])
+    parser.add_argument('--top', type=int, default=5, help='Slowest direct imports to list per module')
+    args = parser.parse_args()
+    for module in args.modules:
+        total, imports = profile_import(module)
+        print(f"{module}: {total * 1000:.0f} ms")
+        for seconds, name in imports[:args.top]:
+            print(f"    {seconds * 1000:8.1f} ms  {name}")
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
@@ -0,0 +1,85 @@
+import re
+import sys
+import time
+import json
+import sqlite3
+import argparse
+from datetime import datetime
+from utils.config import RESULTS_DB
+from utils.results_store import ResultsStore
+
+_UNITS = {"h": 3600, "d": 86400, "w": 7 * 86400, "m": 30 * 86400}
+
+def parse_since(value, now=None):
+    """Epoch seconds from "30d", "12h", "2w", "1m" (30 days) or an ISO date; None for no bound"""
+    if not value:
+        return None
+    match = re.fullmatch(r"(\d+)\s*([hdwm])", value.strip().lower())
+    if match:
+        return (time.time() if now is None else now) - int(match.group(1)) * _UNITS[match.group(2)]
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected an age like 30d or an ISO date, got {value!r}")
+
+def format_table(rows):
+    if not rows:
+        return "(no results)"
+    columns = list(rows[0])
+    cells = [[_format_cell(column, row[column]) for column in columns] for row in rows]
+    widths = [max(len(column), *(len(row[i]) for row in cells)) for i, column in enumerate(columns)]
+    lines = [columns] + cells
+    return "\n".join("  ".join(cell.ljust(width) for cell, width in zip(line, widths)).rstrip() for line in lines)
+
+def _format_cell(column, value):
+    if value is None:
+        return ""
+    if column.endswith("_at"):
+        return datetime.fromtimestamp(value).strftime("%Y-%m-%d %H:%M")
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
+
+def run_query(store, args):
+    if args.command == "gaps":
+        return store.gap_postings(args.skill, args.since, args.company, args.limit)
+    if args.command == "top-gaps":
+        return store.top_gaps(args.since, args.limit)
+    if args.command == "calls":
+        return store.call_summary(args.since)
+    return store.query(args.sql)
+
+def main(argv=None):  # pragma: no cover
+    parser = argparse.ArgumentParser(description='Query the analysis results store')
+    parser.add_argument('--db', default=RESULTS_DB, help='Results database (default: %(default)s)')
+    parser.add_argument('--json', action='store_true', help='Print rows as JSON')
+    commands = parser.add_subparsers(dest='command', required=True)
+    gaps = commands.add_parser('gaps', help='Postings that had a gap for a skill')
+    gaps.add_argument('skill')
+    gaps.add_argument('--company')
+    top = commands.add_parser('top-gaps', help='The most common gaps')
+    calls = commands.add_parser('calls', help='LLM calls, latency and tokens by chain and model')
+    for command in (gaps, top, calls):
+        command.add_argument('--since', type=parse_since, help='Only analyses newer than this (30d, 12h, 2024-05-01)')
+    for command in (gaps, top):
+        command.add_argument('--limit', type=int, default=20)
+    sql = commands.add_parser('sql', help='Run a SQL query (the database is opened read-only)')
+    sql.add_argument('sql')
+    args = parser.parse_args(argv)
+    try:
+        store = ResultsStore(args.db, read_only=True)
+    except sqlite3.Error as e:
+        sys.exit(f"Could not open the results store at {args.db}: {e}")
+    try:
+        started = time.perf_counter()
+        rows = run_query(store, args)
+        elapsed = time.perf_counter() - started
+    except sqlite3.Error as e:
+        sys.exit(f"Query failed: {e}")
+    finally:
+        store.close()
+    print(json.dumps(rows, indent=2) if args.json else format_table(rows))
+    print(f"({len(rows)} rows, {elapsed * 1000:.1f} ms)", file=sys.stderr)
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
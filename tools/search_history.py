@@ -0,0 +1,37 @@
+import sys
+import time
+import json
+import sqlite3
+import argparse
+from utils.config import HISTORY_INDEX_DB
+from utils.history_index import HistoryIndex
+from tools.query_results import format_table
+
+def main(argv=None):  # pragma: no cover
+    parser = argparse.ArgumentParser(description='Search past sessions, stories and customized resumes')
+    parser.add_argument('text', nargs='?', default='', help='Words to match; quote phrases, e.g. \'"feature store"\'')
+    parser.add_argument('--skill', help='Only documents about this skill')
+    parser.add_argument('--company', help='Only documents mentioning this company')
+    parser.add_argument('--kind', choices=('session', 'story', 'resume'), help='Only this kind of document')
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--db', default=HISTORY_INDEX_DB, help='History index database (default: %(default)s)')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args(argv)
+    if not (args.text or args.skill or args.company):
+        parser.error('Give search text, --skill or --company')
+    try:
+        index = HistoryIndex(args.db)
+        started = time.perf_counter()
+        indexed = index.refresh()
+        refreshed = time.perf_counter()
+        rows = index.search(args.text, args.skill, args.company, args.kind, args.limit)
+        elapsed = time.perf_counter() - refreshed
+    except sqlite3.Error as e:
+        sys.exit(f"Search failed: {e}")
+    index.close()
+    print(json.dumps(rows, indent=2) if args.json else format_table(rows))
+    print(f"({len(rows)} results, {elapsed * 1000:.1f} ms; {indexed} files indexed in "
+          f"{(refreshed - started) * 1000:.1f} ms)", file=sys.stderr)
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
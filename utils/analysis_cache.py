@@ -0,0 +1,73 @@
+import os
+import json
+import difflib
+import hashlib
+from utils.skill_index import normalize_skill, canonical_skill
+
+# Above this share of changed resume lines a delta prompt saves little, so the full analysis reruns
+INCREMENTAL_MAX_CHANGE = 0.3
+
+def _digest(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def stories_fingerprint(stories):
+    """Changes whenever the stories a gap verdict was judged against change"""
+    return _digest(json.dumps([[s.get("skill"), s.get("story")] for s in stories]))
+
+def diff_resume(old_text, new_text, context=1):
+    """Returns (unified diff text, share of lines changed) between two resume versions"""
+    old_lines, new_lines = old_text.splitlines(), new_text.splitlines()
+    diff = list(difflib.unified_diff(old_lines, new_lines, "previous", "current", n=context, lineterm=""))
+    changed = sum(1 for line in diff if line[:1] in "+-" and not line.startswith(("+++", "---")))
+    return "\n".join(diff), changed / max(len(old_lines) + len(new_lines), 1)
+
+def format_analysis(alignment, gaps):
+    """Renders alignment and gaps in the job-fit output format, for delta prompts and session logs"""
+    lines = ["ALIGNMENT:"] + [f"- {item}" for item in alignment]
+    return "\n".join(lines) + "\n\nGAPS:\n" + json.dumps(gaps, indent=2)
+
+def merge_delta(alignment, gaps, added_alignment, removed_alignment, resolved, new_gaps):
+    """Applies a delta analysis to the previous alignment and gaps, keeping every unaffected item as-is"""
+    removed = {normalize_skill(item) for item in removed_alignment}
+    merged_alignment = [item for item in alignment if normalize_skill(item) not in removed]
+    seen = {normalize_skill(item) for item in merged_alignment}
+    for item in added_alignment:
+        if normalize_skill(item) not in seen:
+            merged_alignment.append(item)
+            seen.add(normalize_skill(item))
+    resolved = {canonical_skill(skill) for skill in resolved}
+    merged_gaps = [gap for gap in gaps if canonical_skill(gap.get("skill", "")) not in resolved]
+    known = {canonical_skill(gap.get("skill", "")) for gap in merged_gaps}
+    for gap in new_gaps:
+        if canonical_skill(gap.get("skill", "")) not in known:
+            merged_gaps.append(gap)
+            known.add(canonical_skill(gap.get("skill", "")))
+    return merged_alignment, merged_gaps
+
+class AnalysisCache:
+    """Remembers the last analysis per job description so small resume edits can be re-analyzed incrementally.
+
+    Each entry holds the resume that was analyzed, its alignment and gaps, and the gap verdicts
+    for the stories they were judged against.
+    """
+    def __init__(self, cache_dir="resources/cache/analysis"):
+        self.cache_dir = cache_dir
+
+    def _path(self, job_description):
+        return os.path.join(self.cache_dir, _digest(job_description.strip())[:32] + ".json")
+
+    def load(self, job_description):
+        try:
+            with open(self._path(job_description), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, job_description, resume_text, alignment, gaps, verdicts=None, stories_key=None):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = {"resume": resume_text, "alignment": alignment, "gaps": gaps,
+                 "verdicts": verdicts or {}, "stories_key": stories_key}
+        path = self._path(job_description)
+        with open(path + ".tmp", "w") as f:
+            json.dump(entry, f, indent=2)
+        os.replace(path + ".tmp", path)
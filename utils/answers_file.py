@@ -0,0 +1,94 @@
+import os
+import json
+from utils.skill_index import canonical_skill
+
+SKIP = "skip"
+
+class AnswersFileError(Exception):
+    pass
+
+def _parse(text, path):
+    if path.endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise AnswersFileError(f"{path} is YAML but PyYAML is not installed (pip install pyyaml), or use JSON")
+        try:
+            return yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise AnswersFileError(f"Could not parse {path}: {e}")
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        raise AnswersFileError(f"Could not parse {path}: {e}")
+
+def load_answers(path):
+    """Reads an answers file into {canonical skill: story or 'skip'}.
+
+    Accepts a mapping of skill to story, or a list of {"skill", "story"} entries such as
+    an unmatched-gaps file with its stories filled in. Entries without a story are ignored.
+    """
+    try:
+        with open(path, "r") as f:
+            data = _parse(f.read(), path)
+    except OSError as e:
+        raise AnswersFileError(f"Could not read answers file {path}: {e}")
+    if isinstance(data, dict) and "answers" in data:
+        data = data["answers"]
+    if isinstance(data, list):
+        if not all(isinstance(item, dict) and "skill" in item for item in data):
+            raise AnswersFileError(f"{path}: list entries need a 'skill' and a 'story'")
+        data = {item["skill"]: item.get("story") for item in data}
+    if not isinstance(data, dict):
+        raise AnswersFileError(f"{path}: expected a mapping of skill to story")
+    answers = {}
+    for skill, story in data.items():
+        if story is None or not str(story).strip():
+            continue
+        answers[canonical_skill(skill)] = str(story).strip()
+    return answers
+
+def write_unmatched_gaps(path, gaps):
+    """Writes gaps as a list of {"skill", "question", "story"} entries, ready to fill in and pass back as answers"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    entries = [{"skill": gap["skill"], "question": gap["question"], "story": ""} for gap in gaps]
+    with open(path, "w") as f:
+        json.dump(entries, f, indent=2)
+
+class AnswersFileIO:
+    """Wraps an I/O module (normally cli) and answers story prompts from an answers file.
+
+    Gaps with no answer are deferred instead of prompted: prompt_for_story returns None and
+    the gap is added to the unmatched file. With interactive=True they fall through to the
+    wrapped module instead. Everything else is delegated.
+    """
+    def __init__(self, io, answers, unmatched_file=None, interactive=False, resume_path=None, job_description_path=None):
+        self.io = io
+        self.answers = answers
+        self.unmatched_file = unmatched_file
+        self.interactive = interactive
+        self.resume_path = resume_path
+        self.job_description_path = job_description_path
+        self.unmatched = []
+
+    def __getattr__(self, name):
+        return getattr(self.io, name)
+
+    def prompt_for_resume_path(self, default_path):
+        return self.resume_path or self.io.prompt_for_resume_path(default_path)
+
+    def prompt_for_job_description_path(self, default_path):
+        return self.job_description_path or self.io.prompt_for_job_description_path(default_path)
+
+    def prompt_for_story(self, skill, question):
+        answer = self.answers.get(canonical_skill(skill))
+        if answer is not None:
+            return answer
+        if self.interactive:
+            return self.io.prompt_for_story(skill, question)
+        self.unmatched.append({"skill": skill, "question": question})
+        if self.unmatched_file:
+            write_unmatched_gaps(self.unmatched_file, self.unmatched)
+        return None
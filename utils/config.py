@@ -7,4 +7,52 @@ load_dotenv()
 # OpenAI API configuration
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
-OPENAI_MAX_TOKENS = int(os.getenv('OPENAI_MAX_TOKENS', '1500')) 
\ No newline at end of file
+OPENAI_MAX_TOKENS = int(os.getenv('OPENAI_MAX_TOKENS', '1500'))
+
+# Override the model's context window (0 = use the built-in table)
+OPENAI_CONTEXT_LIMIT = int(os.getenv('OPENAI_CONTEXT_LIMIT', '0'))
+
+# Gap verification cascade: models tried cheapest first, escalating while the
+# returned confidence falls inside the uncertain band (or the JSON won't parse)
+GAP_CHECK_MODELS = [m.strip() for m in os.getenv('GAP_CHECK_MODELS', 'gpt-3.5-turbo').split(',') if m.strip()]
+GAP_CHECK_UNCERTAIN_BAND = tuple(float(x) for x in os.getenv('GAP_CHECK_UNCERTAIN_BAND', '0.4,0.7').split(','))
+
+# Cache the legacy CLI's API health check for this many seconds (0 disables the cache)
+API_HEALTH_TTL_SECONDS = int(os.getenv('API_HEALTH_TTL_SECONDS', '3600'))
+
+# Unix socket of a running `python daemon.py`; when set and reachable, main.py uses it
+DAEMON_SOCKET = os.getenv('APPLYGORITHMINATOR_SOCKET')
+
+# How often the HTTP service compacts the story bank in the background (0 disables it)
+STORY_COMPACTION_INTERVAL_SECONDS = int(os.getenv('STORY_COMPACTION_INTERVAL_SECONDS', '3600'))
+
+# Gap checks send only this many most-similar stories, found with the local embedding index (0 sends all)
+STORY_EMBEDDING_TOP_K = int(os.getenv('STORY_EMBEDDING_TOP_K', '0'))
+
+# Split the job-fit analysis into a cached per-JD requirements extraction and a resume match (0 = one-shot prompt)
+JOB_FIT_TWO_STAGE = os.getenv('JOB_FIT_TWO_STAGE', '1') not in ('0', 'false', 'False', '')
+
+# Ask for compact, ID-based LLM output (gap verdicts cite story IDs, job fit cites requirement IDs)
+# with max_tokens sized from the expected number of items; 0 restores the free-text summaries
+COMPACT_LLM_OUTPUT = os.getenv('COMPACT_LLM_OUTPUT', '1') not in ('0', 'false', 'False', '')
+
+# Prometheus metrics: a textfile rewritten at the end of each CLI run (for node_exporter's
+# textfile collector) and/or a local /metrics endpoint (0 disables it). service.py always serves /metrics.
+METRICS_TEXTFILE = os.getenv('METRICS_TEXTFILE', '')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+
+# Hedged requests for the job-fit and intent calls (opt-in): if no token has streamed back within the
+# chain's observed HEDGE_PERCENTILE time-to-first-token, a duplicate request is sent and the slower
+# one cancelled. Duplicates stop once HEDGE_MAX_EXTRA_TOKENS have been spent on them in a process.
+HEDGE_REQUESTS = os.getenv('HEDGE_REQUESTS', '0') not in ('0', 'false', 'False', '')
+HEDGE_PERCENTILE = float(os.getenv('HEDGE_PERCENTILE', '0.9'))
+HEDGE_MAX_EXTRA_TOKENS = int(os.getenv('HEDGE_MAX_EXTRA_TOKENS', '20000'))
+
+# SQLite results store every analysis is written to (postings, gaps, verdicts, per-call metrics); '' disables it
+RESULTS_DB = os.getenv('RESULTS_DB', 'resources/results.db')
+
+# Full-text index over session logs, stories and customized resumes ('' disables it); a posting at least
+# HISTORY_REUSE_SIMILARITY similar to one already analyzed with the same resume reuses that analysis. The
+# default only reuses the exact same posting; e.g. 0.9 also reuses near-identical reposts (0 never reuses)
+HISTORY_INDEX_DB = os.getenv('HISTORY_INDEX_DB', 'resources/cache/history.db')
+HISTORY_REUSE_SIMILARITY = float(os.getenv('HISTORY_REUSE_SIMILARITY', '1.0'))
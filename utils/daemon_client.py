@@ -0,0 +1,56 @@
+import json
+import socket
+from utils import text_parsing
+
+class DaemonError(Exception):
+    pass
+
+class DaemonClient:
+    """Talks to a running `daemon.py` over its Unix socket, one JSON line per request"""
+    def __init__(self, socket_path, timeout=600):
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def call(self, op, **params):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            sock.sendall(json.dumps({"op": op, "params": params}).encode() + b"\n")
+            with sock.makefile("rb") as reader:
+                reply = reader.readline()
+        if not reply:
+            raise DaemonError("Daemon closed the connection without replying")
+        response = json.loads(reply)
+        if "error" in response:
+            # Parse errors keep their type so callers handle them exactly as in-process errors
+            error_cls = getattr(text_parsing, response.get("type", ""), DaemonError)
+            if not (isinstance(error_cls, type) and issubclass(error_cls, Exception)):
+                error_cls = DaemonError
+            raise error_cls(response["error"])
+        return response["result"]
+
+    def ping(self):
+        try:
+            return self.call("ping") == "pong"
+        except (OSError, ValueError, DaemonError):
+            return False
+
+    def run_job_fit_chain(self, combined_experience, job_description, openai_api_key=None):
+        return self.call("job_fit", combined_experience=combined_experience, job_description=job_description,
+                         api_key=openai_api_key)
+
+    def run_job_fit_delta_chain(self, resume_diff, previous_analysis, job_description, openai_api_key=None):
+        return self.call("job_fit_delta", resume_diff=resume_diff, previous_analysis=previous_analysis,
+                         job_description=job_description, api_key=openai_api_key)
+
+    def story_answers_gap_llm(self, gap_skill, question, relevant_stories, openai_api_key=None, json_fixer=None,
+                              pinned=()):
+        # The daemon does its own JSON re-ask, so json_fixer isn't sent over the socket
+        return tuple(self.call("gap_check", gap_skill=gap_skill, question=question,
+                               relevant_stories=relevant_stories, api_key=openai_api_key, pinned=list(pinned)))
+
+    def explain_gap_verdict(self, gap_skill, question, stories, openai_api_key=None):
+        return self.call("gap_explain", gap_skill=gap_skill, question=question, stories=stories, api_key=openai_api_key)
+
+    def fix_json_llm(self, broken_json, openai_api_key=None):
+        return self.call("fix_json", broken_json=broken_json, api_key=openai_api_key)
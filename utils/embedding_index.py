@@ -0,0 +1,147 @@
+import os
+import re
+import zlib
+import threading
+
+DEFAULT_INDEX_DIR = "resources/cache/story_index"
+DEFAULT_DIMENSIONS = 256
+ID_BYTES = 32
+# Rows scored per step, so searching a huge index never materializes more than this many scores at once
+SEARCH_CHUNK_ROWS = 65536
+
+def _numpy():
+    # numpy is only needed when an index is actually used
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("The embedding index needs numpy (pip install numpy)")
+    return numpy
+
+class HashingVectorizer:
+    """
+    Offline default embedding: words and word bigrams are hashed into a fixed number of
+    signed buckets and the vector is L2-normalized. No vocabulary, no model download.
+    """
+    def __init__(self, dimensions=DEFAULT_DIMENSIONS):
+        self.dimensions = dimensions
+
+    def _features(self, text):
+        words = re.findall(r"[a-z0-9+#]+", text.lower())
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def __call__(self, text):
+        np = _numpy()
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature in self._features(text):
+            h = zlib.crc32(feature.encode("utf-8"))
+            vector[h % self.dimensions] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+class EmbeddingIndex:
+    """
+    Float32 vectors in an append-only file plus a manifest of fixed-width IDs (up to 32 bytes),
+    both read through NumPy memmaps. Opening the index only checks file sizes and adds append
+    to both files, so neither scales with the index size.
+
+    `embed` is any callable from text to a 1-D vector of `dimensions` floats; vectors are
+    normalized on the way in, so search is a dot product (cosine similarity).
+    """
+    def __init__(self, directory=DEFAULT_INDEX_DIR, embed=None, dimensions=DEFAULT_DIMENSIONS):
+        self.directory = directory
+        self.embed = embed or HashingVectorizer(dimensions)
+        self.dimensions = getattr(self.embed, "dimensions", dimensions)
+        self.vectors_file = os.path.join(directory, "vectors.f32")
+        self.manifest_file = os.path.join(directory, "ids.bin")
+        self._lock = threading.Lock()
+        self._maps = None
+        os.makedirs(directory, exist_ok=True)
+        # A crash between the two appends can leave one file a row ahead; trust the shorter one
+        self.rows = min(self._file_rows(self.vectors_file, 4 * self.dimensions),
+                        self._file_rows(self.manifest_file, ID_BYTES))
+
+    @staticmethod
+    def _file_rows(path, row_bytes):
+        return os.path.getsize(path) // row_bytes if os.path.exists(path) else 0
+
+    def __len__(self):
+        return self.rows
+
+    def _normalized(self, vectors):
+        np = _numpy()
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimensions)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def add(self, item_id, text):
+        self.add_vectors([item_id], [self.embed(text)])
+
+    def add_vectors(self, item_ids, vectors):
+        """Appends already-embedded vectors; the bulk path used by rebuilds and benchmarks"""
+        np = _numpy()
+        vectors = self._normalized(vectors)
+        encoded = [str(item_id).encode("utf-8") for item_id in item_ids]
+        if len(vectors) != len(encoded):
+            raise ValueError("Need exactly one vector per id")
+        if any(len(item_id) > ID_BYTES for item_id in encoded):
+            raise ValueError(f"Index ids are limited to {ID_BYTES} bytes")
+        with self._lock:
+            # Trim a half-written row left by an earlier crash before appending
+            for path, row_bytes in ((self.vectors_file, 4 * self.dimensions), (self.manifest_file, ID_BYTES)):
+                with open(path, "ab") as f:
+                    f.truncate(self.rows * row_bytes)
+            with open(self.vectors_file, "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self.manifest_file, "ab") as f:
+                f.write(np.array(encoded, dtype=f"S{ID_BYTES}").tobytes())
+            self.rows += len(encoded)
+            self._maps = None
+
+    def _rows(self):
+        np = _numpy()
+        with self._lock:
+            if self._maps is None:
+                if self.rows:
+                    self._maps = (np.memmap(self.vectors_file, dtype=np.float32, mode="r", shape=(self.rows, self.dimensions)),
+                                  np.memmap(self.manifest_file, dtype=f"S{ID_BYTES}", mode="r", shape=(self.rows,)))
+                else:
+                    self._maps = (np.zeros((0, self.dimensions), dtype=np.float32), np.zeros(0, dtype=f"S{ID_BYTES}"))
+            return self._maps
+
+    def ids(self):
+        return [item_id.decode("utf-8") for item_id in self._rows()[1]]
+
+    def search(self, text, k=5, vector=None):
+        """Returns up to k (id, cosine similarity) pairs, most similar first"""
+        np = _numpy()
+        matrix, ids = self._rows()
+        if not len(ids) or k <= 0:
+            return []
+        query = self._normalized(self.embed(text) if vector is None else vector)[0]
+        best_scores = np.empty(0, dtype=np.float32)
+        best_rows = np.empty(0, dtype=np.int64)
+        for start in range(0, len(ids), SEARCH_CHUNK_ROWS):
+            scores = matrix[start:start + SEARCH_CHUNK_ROWS] @ query
+            if len(scores) > k:
+                top = np.argpartition(scores, -k)[-k:]
+            else:
+                top = np.arange(len(scores))
+            best_scores = np.concatenate([best_scores, scores[top]])
+            best_rows = np.concatenate([best_rows, top + start])
+            if len(best_scores) > k:
+                keep = np.argpartition(best_scores, -k)[-k:]
+                best_scores, best_rows = best_scores[keep], best_rows[keep]
+        order = np.argsort(-best_scores, kind="stable")
+        return [(ids[best_rows[i]].decode("utf-8"), float(best_scores[i])) for i in order]
+
+    def rebuild(self, items):
+        """Replaces the index with (id, text) pairs, e.g. after the story bank was compacted"""
+        items = list(items)
+        with self._lock:
+            self._maps = None
+            self.rows = 0
+            for path in (self.vectors_file, self.manifest_file):
+                if os.path.exists(path):
+                    os.remove(path)
+        if items:
+            self.add_vectors([item_id for item_id, _ in items], [self.embed(text) for _, text in items])
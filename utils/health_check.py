@@ -0,0 +1,32 @@
+import os
+import json
+import time
+import hashlib
+from utils.metrics import record_cache
+
+def _fingerprint(api_key):
+    # Never store the key itself, just enough to notice it changed
+    return hashlib.sha256((api_key or "").encode()).hexdigest()[:16]
+
+def cached_health_check(check, api_key, ttl_seconds, cache_file="resources/cache/api_health.json"):
+    """
+    Runs check() -> bool only if there is no successful result for this API key younger
+    than ttl_seconds. Returns (healthy, from_cache). Failures are never cached.
+    """
+    fingerprint = _fingerprint(api_key)
+    if ttl_seconds > 0 and os.path.exists(cache_file):
+        try:
+            with open(cache_file, "r") as f:
+                cached = json.load(f)
+            if cached.get("key") == fingerprint and time.time() - cached.get("checked_at", 0) < ttl_seconds:
+                record_cache("api_health", True)
+                return True, True
+        except (OSError, ValueError):
+            pass
+    record_cache("api_health", False)
+    healthy = check()
+    if healthy and ttl_seconds > 0:
+        os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+        with open(cache_file, "w") as f:
+            json.dump({"key": fingerprint, "checked_at": time.time()}, f)
+    return healthy, False
@@ -0,0 +1,215 @@
+import math
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from utils.config import HEDGE_REQUESTS, HEDGE_PERCENTILE, HEDGE_MAX_EXTRA_TOKENS
+from utils.metrics import registry
+from utils.token_budget import count_tokens
+
+# A chain isn't hedged until this many first tokens have been timed; the threshold uses the latest WINDOW
+MIN_SAMPLES = 5
+WINDOW = 200
+
+hedges = registry.counter("applygorithminator_hedged_requests_total",
+                          "Duplicate LLM requests sent after a slow first token, by which attempt answered first",
+                          ("chain", "winner"))
+hedges_skipped = registry.counter("applygorithminator_hedges_skipped_total",
+                                  "Slow LLM calls not hedged because the extra-token budget was spent", ("chain",))
+hedge_extra_tokens = registry.counter("applygorithminator_hedge_extra_tokens_total",
+                                      "Tokens spent by the cancelled attempt of hedged calls (estimated if cut off mid-stream)",
+                                      ("chain",))
+ttft = registry.histogram("applygorithminator_llm_ttft_seconds", "Time to the first streamed token of hedgeable LLM calls",
+                          ("chain",))
+
+class TTFTTracker:
+    """Recent time-to-first-token samples per chain; the hedging threshold is their percentile"""
+    def __init__(self, percentile=HEDGE_PERCENTILE, window=WINDOW, min_samples=MIN_SAMPLES):
+        self.percentile = percentile
+        self.window = window
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._samples = {}
+
+    def observe(self, chain, seconds):
+        with self._lock:
+            self._samples.setdefault(chain, deque(maxlen=self.window)).append(seconds)
+        ttft.observe(seconds, chain=chain)
+
+    def threshold(self, chain):
+        """Seconds to wait for a first token before hedging, or None while there are too few samples"""
+        with self._lock:
+            samples = sorted(self._samples.get(chain, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[max(0, math.ceil(self.percentile * len(samples)) - 1)]
+
+class HedgeBudget:
+    """
+    Caps the tokens spent on duplicate requests over the life of the process. A duplicate's
+    estimated cost is reserved before it starts, so concurrent calls can't all pass the check
+    and overshoot, and replaced by the actual cost once the losing attempt stops.
+    """
+    def __init__(self, max_extra_tokens=HEDGE_MAX_EXTRA_TOKENS):
+        self.max_extra_tokens = max_extra_tokens
+        self._lock = threading.Lock()
+        self.spent = 0
+
+    def allows(self, tokens):
+        """Reserves `tokens` if the budget has room for them; returns whether it did"""
+        with self._lock:
+            if self.spent + tokens > self.max_extra_tokens:
+                return False
+            self.spent += tokens
+            return True
+
+    def charge(self, reserved, tokens):
+        """Settles a reservation: the duplicate actually cost `tokens`"""
+        with self._lock:
+            self.spent += tokens - reserved
+
+class Attempt:
+    """One copy of a hedged call, passed to the call function"""
+    def __init__(self, index, signals):
+        self.index = index
+        self.cancel_event = threading.Event()
+        # Set when a worker picks the attempt up, so time queued for a thread isn't counted as TTFT
+        self.started = threading.Event()
+        self.started_at = None
+        self.first_token_at = None
+        self.tokens = 0
+        self._signals = signals
+
+    def first_token(self):
+        """Call when the first token arrives; the first attempt to do so wins"""
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+            self._signals.put(self.index)
+
+ttft_tracker = TTFTTracker()
+hedge_budget = HedgeBudget()
+
+def hedging_enabled():
+    return HEDGE_REQUESTS
+
+def hedge_llm_options():
+    """Extra ChatOpenAI options for hedged chains: streamed replies only report usage when asked to"""
+    return {"stream_usage": True} if hedging_enabled() else {}
+
+def _run(fn, attempt, signals):
+    attempt.started_at = time.perf_counter()
+    attempt.started.set()
+    try:
+        return fn(attempt)
+    finally:
+        # Finishing (or failing) without a first token still answers the waiting caller
+        signals.put(attempt.index)
+
+def _first_answer(signals, futures, timeout=None):
+    """Index of the first attempt to stream a token or finish, skipping failures while another is still running"""
+    while True:
+        try:
+            index = signals.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        future = futures[index]
+        failed = future.done() and future.exception() is not None
+        if not (failed and any(not f.done() for i, f in enumerate(futures) if i != index)):
+            return index
+
+def hedged_call(chain, fn, estimated_tokens=0, tracker=None, budget=None, executor=None):
+    """
+    Runs fn(attempt) and returns its result. fn must stream its reply, call attempt.first_token()
+    when the first token arrives, stop once attempt.cancel_event is set, and set attempt.tokens
+    to what it spent. If no token arrives within the chain's threshold (by default the p90 of its
+    recent time-to-first-token), a duplicate is started (while the extra-token budget allows); the first
+    to stream a token wins and the other is cancelled. Without an executor each call gets its own two
+    threads, so calls never queue behind each other and a cancelled loser only holds its own thread.
+    """
+    tracker = tracker or ttft_tracker
+    budget = budget or hedge_budget
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix=f"hedge-{chain}")
+    try:
+        return _hedged_call(chain, fn, estimated_tokens, tracker, budget, executor)
+    finally:
+        if own_executor:
+            # Don't wait for a cancelled loser; its thread exits once its stream notices the cancel
+            executor.shutdown(wait=False)
+
+def _hedged_call(chain, fn, estimated_tokens, tracker, budget, executor):
+    signals = queue.Queue()
+    attempts, futures = [], []
+
+    def start():
+        attempt = Attempt(len(attempts), signals)
+        attempts.append(attempt)
+        futures.append(executor.submit(_run, fn, attempt, signals))
+
+    def charge(attempt):
+        # The losing attempt's tokens are the extra cost of hedging
+        budget.charge(estimated_tokens, attempt.tokens)
+        hedge_extra_tokens.inc(attempt.tokens, chain=chain)
+
+    start()
+    threshold = tracker.threshold(chain)
+    if threshold is not None:
+        # The threshold counts from when the primary starts running, not from when it was queued
+        attempts[0].started.wait()
+    winner = _first_answer(signals, futures, threshold) if threshold is not None else None
+    if winner is None and threshold is not None:
+        if budget.allows(estimated_tokens):
+            start()
+        else:
+            hedges_skipped.inc(chain=chain)
+    if winner is None:
+        winner = _first_answer(signals, futures)
+    for attempt, future in zip(attempts, futures):
+        if attempt.index != winner:
+            attempt.cancel_event.set()
+            # A loser cancelled before it started never ran, so it costs nothing
+            if future.cancel():
+                budget.charge(estimated_tokens, 0)
+            else:
+                future.add_done_callback(lambda _, attempt=attempt: charge(attempt))
+    if len(attempts) > 1:
+        hedges.inc(chain=chain, winner="hedge" if winner else "primary")
+    result = futures[winner].result()
+    for attempt in attempts:
+        if attempt.first_token_at is not None and attempt.started_at is not None:
+            tracker.observe(chain, attempt.first_token_at - attempt.started_at)
+    return result
+
+def hedged_invoke(chain, inputs, name, enabled=None):
+    """
+    chain.invoke(inputs) for a LangChain runnable, or, with HEDGE_REQUESTS, the same call streamed
+    so its first token can be timed and hedged.
+    """
+    if not (hedging_enabled() if enabled is None else enabled):
+        return chain.invoke(inputs)
+    prompt_tokens = count_tokens(" ".join(str(value) for value in inputs.values()))
+
+    def stream(attempt):
+        result = None
+        chunks = chain.stream(inputs)
+        try:
+            for chunk in chunks:
+                if attempt.cancel_event.is_set():
+                    break
+                if chunk.content:
+                    attempt.first_token()
+                result = chunk if result is None else result + chunk
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+        usage = getattr(result, "usage_metadata", None)
+        if isinstance(usage, dict) and usage:
+            attempt.tokens = (usage.get("input_tokens") or 0) + (usage.get("output_tokens") or 0)
+        else:
+            attempt.tokens = prompt_tokens + count_tokens(getattr(result, "content", "") or "")
+        return result
+
+    return hedged_call(name, stream, prompt_tokens)
@@ -0,0 +1,251 @@
+import os
+import re
+import json
+import sqlite3
+import hashlib
+import threading
+from utils.config import HISTORY_INDEX_DB, HISTORY_REUSE_SIMILARITY
+from utils.story_manager import story_id
+from utils.text_parsing import extract_alignment_section, extract_gaps_json, GapsJsonParseError
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents USING fts5(
+    kind UNINDEXED, path UNINDEXED, title, company, skills, body, tokenize = 'porter unicode61'
+);
+CREATE TABLE IF NOT EXISTS analyses (
+    path TEXT PRIMARY KEY,
+    resume_key TEXT NOT NULL,
+    jd_key TEXT NOT NULL,
+    job_description TEXT NOT NULL,
+    analysis TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS analyses_resume ON analyses(resume_key, jd_key);
+"""
+
+# Lines in a session log after the analysis output; the analysis ends at the first of them
+_AFTER_ANALYSIS = re.compile(r"^(?:\nSkill/Experience:|\n\[Story already answers|Deferred:|JSON parsing:|Gap check cascade:)",
+                             re.MULTILINE)
+_SESSION_SKILL = re.compile(r"^Skill/Experience: (.+)$|^\[Story already answers: (.+)\]$", re.MULTILINE)
+_COMPANY_LABEL = re.compile(r"^\s*(?:company|employer|organi[sz]ation)\s*:\s*(.+?)\s*$", re.IGNORECASE | re.MULTILINE)
+_ABOUT_COMPANY = re.compile(r"\bAbout[ \t]+([A-Z][\w&.\-]*(?:[ \t]+[A-Z][\w&.\-]*){0,3})")
+_NOT_COMPANIES = {"the", "us", "you", "this", "our", "your", "role", "job", "position", "team"}
+_GAP_SKILL = re.compile(r'"skill"\s*:\s*"((?:[^"\\]|\\.)+)"')
+_WORD = re.compile(r"\w+")
+_QUERY_TERM = re.compile(r'"([^"]+)"|(\S+)')
+# Shingle size for near-duplicate detection: three-word runs survive reworded dates and locations
+SHINGLE_WORDS = 3
+
+def text_key(text):
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()[:32]
+
+def shingles(text, size=SHINGLE_WORDS):
+    words = _WORD.findall(text.lower())
+    return {" ".join(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))}
+
+def similarity(a, b):
+    """Jaccard similarity of two texts' word shingles"""
+    a, b = shingles(a), shingles(b)
+    return len(a & b) / len(a | b) if a | b else 0.0
+
+def company_hint(job_description):
+    """The company a posting names in a "Company:" line or an "About <Company>" heading, if any"""
+    match = _COMPANY_LABEL.search(job_description)
+    if match:
+        return match.group(1)
+    for match in _ABOUT_COMPANY.finditer(job_description):
+        if match.group(1).split()[0].lower() not in _NOT_COMPANIES:
+            return match.group(1)
+    return ""
+
+def parse_session_log(text):
+    """
+    The resume, job description and job-fit output of a session log written by SessionLogger, plus
+    the gap skills it mentions; None for logs without an analysis.
+    """
+    head, marker, rest = text.partition("--- Job Fit Analysis ---\n")
+    resume = re.search(r"--- Resume ---\nfile: [^\n]*\n(.*?)\n+--- Job Description ---", head, re.DOTALL)
+    job_description = re.search(r"--- Job Description ---\nfile: [^\n]*\n(.*)", head, re.DOTALL)
+    if not (marker and resume and job_description):
+        return None
+    rest = re.sub(r"\AAnalysis mode: [^\n]*\n", "", rest)
+    end = _AFTER_ANALYSIS.search(rest)
+    analysis = (rest[:end.start()] if end else rest).strip()
+    # Gap skills are picked out with a regex rather than parsed, so indexing never counts as a JSON failure
+    skills = [a or b for a, b in _SESSION_SKILL.findall(rest)] + _GAP_SKILL.findall(analysis)
+    return {
+        "resume": resume.group(1).strip(),
+        "job_description": job_description.group(1).strip(),
+        "analysis": analysis,
+        "skills": list(dict.fromkeys(skill for skill in skills if skill)),
+    }
+
+def _fts_terms(text):
+    """Free text as an FTS5 query: quoted phrases stay phrases, other words must all match"""
+    terms = []
+    for phrase, word in _QUERY_TERM.findall(text):
+        value = phrase or word
+        if _WORD.search(value):
+            terms.append('"' + value.replace('"', '""') + '"')
+    return " ".join(terms)
+
+class HistoryIndex:
+    """
+    Full-text index (SQLite FTS5) over session logs, stories and saved customized resumes.
+    refresh() re-reads only files whose size or mtime changed, so it stays cheap as sessions/
+    grows. Session logs also keep their job description and analysis, so a near-identical
+    posting checked against the same resume can reuse the earlier output.
+    """
+    def __init__(self, path=HISTORY_INDEX_DB, sessions_dir="sessions", resumes_dir="resources/resumes",
+                 stories_file="resources/stories/stories.json"):
+        self.path = path
+        self.sessions_dir = sessions_dir
+        self.resumes_dir = resumes_dir
+        self.stories_file = stories_file
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _sources(self):
+        """(path, kind) of every file the index covers"""
+        for directory, subdirectories, files in os.walk(self.sessions_dir):
+            subdirectories.sort()
+            for name in sorted(files):
+                if name.startswith("session") and name.endswith(".txt"):
+                    yield os.path.join(directory, name), "session"
+        if os.path.isdir(self.resumes_dir):
+            for name in sorted(os.listdir(self.resumes_dir)):
+                if name.startswith("customized_") and name.endswith(".txt"):
+                    yield os.path.join(self.resumes_dir, name), "resume"
+        if os.path.exists(self.stories_file):
+            yield self.stories_file, "stories"
+
+    def refresh(self):
+        """Indexes new and changed files and drops deleted ones; returns the number of files (re)indexed"""
+        with self._lock:
+            known = {row["path"]: (row["mtime_ns"], row["size"])
+                     for row in self._conn.execute("SELECT path, mtime_ns, size FROM files")}
+            changed = 0
+            for path, kind in self._sources():
+                stat = os.stat(path)
+                if known.pop(path, None) != (stat.st_mtime_ns, stat.st_size):
+                    self.index_file(path, kind, stat)
+                    changed += 1
+            with self._conn:
+                for path in known:
+                    self._remove(path)
+            return changed
+
+    def _remove(self, path):
+        self._conn.execute("DELETE FROM documents WHERE path = ? OR path LIKE ? ESCAPE '\\'",
+                           (path, path.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "#%"))
+        self._conn.execute("DELETE FROM analyses WHERE path = ?", (path,))
+        self._conn.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def _add(self, kind, path, body, title="", company="", skills=()):
+        self._conn.execute("INSERT INTO documents (kind, path, title, company, skills, body) VALUES (?, ?, ?, ?, ?, ?)",
+                           (kind, path, title, company, "\n".join(skills), body))
+
+    def index_file(self, path, kind, stat=None):
+        """(Re)indexes one session log ("session"), customized resume ("resume") or story bank ("stories")"""
+        stat = stat or os.stat(path)
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            text = f.read()
+        with self._lock, self._conn:
+            self._remove(path)
+            if kind == "stories":
+                try:
+                    stories = json.loads(text).get("stories", [])
+                except (ValueError, AttributeError):
+                    stories = []
+                for story in stories:
+                    if story.get("has_experience", True):
+                        self._add("story", f"{path}#{story_id(story)}", story.get("story", ""),
+                                  title=story.get("skill", ""), skills=[story.get("skill", "")])
+            elif kind == "session":
+                session = parse_session_log(text)
+                if session is None:
+                    self._add("session", path, text)
+                else:
+                    job_description = session["job_description"]
+                    title = next((line.strip() for line in job_description.splitlines() if line.strip()), "")
+                    self._add("session", path, text, title=title[:200], company=company_hint(job_description),
+                              skills=session["skills"])
+                    if session["analysis"]:
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO analyses (path, resume_key, jd_key, job_description, analysis) "
+                            "VALUES (?, ?, ?, ?, ?)",
+                            (path, text_key(session["resume"]), text_key(job_description), job_description,
+                             session["analysis"]))
+            else:
+                self._add(kind, path, text, title=os.path.basename(path))
+            self._conn.execute("INSERT OR REPLACE INTO files (path, kind, mtime_ns, size) VALUES (?, ?, ?, ?)",
+                               (path, kind, stat.st_mtime_ns, stat.st_size))
+
+    def search(self, text="", skill=None, company=None, kind=None, limit=20):
+        """
+        Best-matching documents for free text (quote phrases) narrowed by skill and company, as
+        {"kind", "path", "title", "company", "snippet", "score"} dicts, best first.
+        """
+        # A filter with no word characters ("++", "&") has no terms and is skipped
+        clauses = []
+        text_terms, skill_terms, company_terms = (_fts_terms(value or "") for value in (text, skill, company))
+        if text_terms:
+            clauses.append(f"({text_terms})")
+        if skill_terms:
+            clauses.append(f"{{title skills body}} : ({skill_terms})")
+        if company_terms:
+            clauses.append(f"{{company title body}} : ({company_terms})")
+        if not clauses:
+            return []
+        sql = ("SELECT kind, path, title, company, snippet(documents, 5, '[', ']', '...', 12) AS snippet, "
+               "bm25(documents, 0, 0, 4.0, 4.0, 2.0, 1.0) AS score FROM documents WHERE documents MATCH ?")
+        params = [" AND ".join(clauses)]
+        if kind:
+            sql += " AND kind = ?"
+            params.append(kind)
+        sql += " ORDER BY score LIMIT ?"
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params + [limit])]
+
+    def find_reusable_analysis(self, resume_text, job_description, min_similarity=HISTORY_REUSE_SIMILARITY):
+        """
+        The earlier job-fit output for this resume against the same or a near-identical posting
+        (shingle similarity >= min_similarity), as {"path", "analysis", "alignment", "gaps",
+        "similarity"}, or None. The analysis only depends on the resume and the posting, so
+        reusing it skips the job-fit call without changing the result.
+        """
+        if not min_similarity:
+            return None
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, jd_key, job_description, analysis FROM analyses WHERE resume_key = ?",
+                (text_key(resume_text),)).fetchall()
+        key = text_key(job_description)
+        scored = sorted(((1.0 if row["jd_key"] == key else similarity(job_description, row["job_description"]), row)
+                         for row in rows), key=lambda item: item[0], reverse=True)
+        for score, row in scored:
+            if score < min_similarity:
+                break
+            try:
+                gaps = extract_gaps_json(row["analysis"])
+            except GapsJsonParseError:
+                continue
+            alignment = extract_alignment_section(row["analysis"])
+            if alignment or gaps:
+                return {"path": row["path"], "analysis": row["analysis"], "alignment": alignment, "gaps": gaps,
+                        "similarity": score}
+        return None
@@ -0,0 +1,166 @@
+import re
+import math
+import time
+from collections import Counter
+
+# Replies that unambiguously accept the current result once filler words are stripped
+MOVE_ON_PHRASES = {
+    "next", "looks good", "look good", "good", "great", "perfect", "ok", "okay", "k", "yes", "y", "yep", "yeah",
+    "lgtm", "move on", "continue", "proceed", "go ahead", "go on", "done", "fine", "sounds good", "nice",
+    "love it", "approved", "accept", "keep it", "ship it", "all good", "works", "next section", "next one",
+    "good to go", "no changes", "no change", "nothing", "none", "like", "love", "happy", "fine by me",
+    "move to the next", "move to next", "go to the next", "on to the next", "as is", "use it as is", "use as is", "leave it", "keep going",
+}
+FILLER_WORDS = {"that", "this", "it", "thats", "its", "lets", "let", "us", "please", "thanks", "thank", "you",
+                "very", "really", "so", "all", "the", "to", "on", "now", "looks", "is", "and", "we", "can", "ok",
+                "i", "im", "me", "by", "for", "here", "with", "one"}
+# Imperative openers that almost always introduce a change request. Verbs that also accept the
+# result ("move on", "use it as is") are left to the model or the LLM.
+REFINE_OPENERS = (
+    "add", "remove", "delete", "drop", "change", "make", "rewrite", "reword", "rephrase", "shorten", "lengthen",
+    "include", "mention", "emphasize", "emphasise", "highlight", "replace", "swap", "update", "fix",
+    "tweak", "adjust", "expand", "cut", "trim", "put", "tailor", "focus", "too", "not enough", "i want", "id like",
+    "try",
+)
+# Polite wrappers stripped before matching, so "could you move on" and "could you add X" read as their verb
+POLITE_PREFIX = re.compile(r"^(?:please )?(?:(?:can|could|would) you (?:please )?|(?:i want|id like|i would like) to )?")
+# Words that flip an acceptance phrase ("not happy with this"); such replies go to the LLM
+NEGATIONS = {"not", "dont", "doesnt", "isnt", "arent", "wasnt", "never", "cant", "cannot", "wont", "nope", "nah",
+             "hate", "dislike"}
+# Openers that need a real modifier after them: "change nothing" and "too good, next" accept the result
+WEAK_OPENERS = {"change", "too"}
+CONTRAST_WORDS = r"\b(?:but|except|however|although|though|just)\b"
+
+# Small labeled set the keyword model is trained on
+TRAINING_SAMPLES = [
+    ("looks good", "move_on"), ("that looks great, let's move on", "move_on"), ("next please", "move_on"),
+    ("perfect, continue", "move_on"), ("yes that's fine", "move_on"), ("good, next section", "move_on"),
+    ("I'm happy with this", "move_on"), ("this is great", "move_on"), ("works for me", "move_on"),
+    ("let's keep going", "move_on"), ("approved, on to the next one", "move_on"), ("no changes needed", "move_on"),
+    ("that's exactly what I wanted", "move_on"), ("great job, proceed", "move_on"), ("sounds good to me", "move_on"),
+    ("add more about kubernetes", "refine"), ("can you make it shorter", "refine"),
+    ("please mention my AWS certification", "refine"), ("remove the second bullet", "refine"),
+    ("change the title to staff engineer", "refine"), ("make the summary more concise", "refine"),
+    ("emphasize leadership more", "refine"), ("it's too long, shorten it", "refine"),
+    ("include the metrics from my story", "refine"), ("use a more formal tone", "refine"),
+    ("the second bullet should mention python", "refine"), ("I'd like more focus on cloud", "refine"),
+    ("swap the order of the skills", "refine"), ("less jargon please", "refine"),
+    ("could you highlight the migration project", "refine"),
+]
+
+# Held-out phrasings for comparing the local classifier with the LLM
+EVALUATION_SAMPLES = [
+    ("Looks good, let's move on.", "move_on"), ("next", "move_on"), ("That's great!", "move_on"),
+    ("ok continue", "move_on"), ("yep, ship it", "move_on"), ("I like it, go ahead", "move_on"),
+    ("fine by me", "move_on"), ("all good here", "move_on"),
+    ("Can you add that I led a team of 8?", "refine"), ("make it punchier", "refine"),
+    ("Looks good but add Terraform to the skills", "refine"), ("drop the objective line", "refine"),
+    ("mention the 30% cost reduction", "refine"), ("please rewrite it in first person", "refine"),
+    ("too generic, tailor it to fintech", "refine"), ("hmm not sure", "clarify"), ("what do you mean?", "clarify"),
+    ("change nothing", "move_on"), ("too good, next", "move_on"),
+]
+
+def _tokens(text):
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+def _normalize(text):
+    return " ".join(t.replace("'", "") for t in _tokens(text))
+
+class KeywordIntentModel:
+    """Naive Bayes over word tokens, trained on a handful of labeled replies"""
+    def __init__(self, samples=TRAINING_SAMPLES):
+        self.word_counts = {}
+        self.class_counts = Counter()
+        self.vocabulary = set()
+        for message, action in samples:
+            counts = self.word_counts.setdefault(action, Counter())
+            tokens = _tokens(message)
+            counts.update(tokens)
+            self.vocabulary.update(tokens)
+            self.class_counts[action] += 1
+
+    def predict(self, message):
+        """Returns (action, probability); unknown words contribute nothing."""
+        tokens = [t for t in _tokens(message) if t in self.vocabulary]
+        total = sum(self.class_counts.values())
+        scores = {}
+        for action, counts in self.word_counts.items():
+            denominator = sum(counts.values()) + len(self.vocabulary)
+            score = math.log(self.class_counts[action] / total)
+            for token in tokens:
+                score += math.log((counts[token] + 1) / denominator)
+            scores[action] = score
+        best = max(scores, key=scores.get)
+        normalizer = sum(math.exp(v - scores[best]) for v in scores.values())
+        return best, 1.0 / normalizer
+
+_default_model = KeywordIntentModel()
+
+def classify_intent(message, model=_default_model, min_probability=0.9):
+    """
+    Classifies a customization-loop reply locally. Returns {"action", "refinement"} for
+    confident move_on/refine cases, or None when the message should go to the LLM.
+    """
+    text = message.strip()
+    normalized = _normalize(text)
+    if not normalized:
+        return None
+    # "Looks good, but add X": the part after the contrast is the refinement
+    parts = re.split(CONTRAST_WORDS, text, maxsplit=1, flags=re.IGNORECASE)
+    if len(parts) == 2 and _is_move_on(parts[0]) and _normalize(parts[1]):
+        return {"action": "refine", "refinement": parts[1].strip(" ,.;:-")}
+    if _is_move_on(text):
+        return {"action": "move_on", "refinement": None}
+    opener = POLITE_PREFIX.sub("", normalized)
+    if opener.startswith(REFINE_OPENERS) and len(opener.split()) >= 2:
+        if _undercuts_opener(opener):
+            return None
+        return {"action": "refine", "refinement": text}
+    if NEGATIONS.intersection(normalized.split()):
+        return None
+    if "?" in text and opener == normalized:
+        return None
+    action, probability = model.predict(text)
+    if probability >= min_probability and len(normalized.split()) >= 2:
+        return {"action": action, "refinement": text if action == "refine" else None}
+    return None
+
+_MOVE_ON_PATTERN = re.compile(r"\b(?:" + "|".join(
+    re.escape(p) for p in sorted(MOVE_ON_PHRASES, key=len, reverse=True)) + r")\b")
+
+def _is_move_on(text):
+    """True when the reply is made up only of acceptance phrases and filler, e.g. "great, next" """
+    normalized = POLITE_PREFIX.sub("", _normalize(text))
+    if NEGATIONS.intersection(normalized.split()) or not _MOVE_ON_PATTERN.search(normalized):
+        return False
+    rest = _MOVE_ON_PATTERN.sub(" ", normalized).split()
+    return all(w in FILLER_WORDS for w in rest)
+
+def _undercuts_opener(opener):
+    """True when the words after a change opener accept the result or move on ("change nothing")"""
+    words = opener.split()
+    if "next" in words or NEGATIONS.intersection(words):
+        return True
+    return words[0] in WEAK_OPENERS and _is_move_on(" ".join(words[1:]))
+
+def evaluate(samples, classify):
+    """
+    Runs classify(message) -> {"action": ...} or None over labeled samples. Returns accuracy
+    over the messages it answered, coverage (share answered) and mean latency in ms.
+    """
+    answered = correct = 0
+    elapsed = 0.0
+    for message, expected in samples:
+        started = time.perf_counter()
+        result = classify(message)
+        elapsed += time.perf_counter() - started
+        if result is None:
+            continue
+        answered += 1
+        correct += result["action"] == expected
+    return {
+        "samples": len(samples),
+        "coverage": answered / len(samples) if samples else 0.0,
+        "accuracy": correct / answered if answered else 0.0,
+        "mean_latency_ms": 1000 * elapsed / len(samples) if samples else 0.0,
+    }
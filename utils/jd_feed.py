@@ -0,0 +1,172 @@
+import io
+import os
+import re
+import csv
+import sys
+import gzip
+import json
+import html
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from utils.requirements_cache import jd_key
+from utils.metrics import registry
+
+# Feed files hold many postings, text files one; directories are searched for both (optionally .gz)
+FEED_SUFFIXES = (".jsonl", ".ndjson", ".csv")
+TEXT_SUFFIXES = (".txt", ".md")
+# Field names feeds use for each posting attribute, first match wins (compared case-insensitively)
+DESCRIPTION_FIELDS = ("description", "job_description", "jd", "body", "text", "content", "description_text")
+TITLE_FIELDS = ("title", "job_title", "position", "role")
+COMPANY_FIELDS = ("company", "company_name", "employer", "organization")
+ID_FIELDS = ("id", "job_id", "posting_id", "url", "link")
+
+_TAG = re.compile(r"<(?:br|/p|/li|/div|/h\d)\s*/?>", re.IGNORECASE)
+_ANY_TAG = re.compile(r"<[^>]+>")
+_BLANK_LINES = re.compile(r"\n{3,}")
+_END = object()
+
+feed_postings = registry.counter("applygorithminator_feed_postings_total",
+                                 "Job postings read from feeds, by whether they were kept", ("result",))
+
+class FeedError(Exception):
+    """A feed source that can't be read"""
+
+def _base_suffix(path):
+    name = path[:-3] if path.endswith(".gz") else path
+    return os.path.splitext(name)[1].lower()
+
+def open_text(path):
+    """Opens a feed file as text, transparently un-gzipping .gz files"""
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8", errors="replace", newline="")
+    return open(path, "r", encoding="utf-8", errors="replace", newline="")
+
+def iter_jsonl(path):
+    """Records from a JSON Lines file, one line at a time; malformed lines are logged and skipped"""
+    with open_text(path) as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logging.warning("Skipping malformed line %d of %s", number, path)
+                feed_postings.inc(result="invalid")
+                continue
+            yield record, f"{path}:{number}"
+
+def iter_csv(path):
+    """Records from a CSV file with a header row, one row at a time"""
+    # Descriptions easily exceed the csv module's default 128 KB field limit
+    csv.field_size_limit(min(sys.maxsize, 2**31 - 1))
+    with open_text(path) as f:
+        for number, row in enumerate(csv.DictReader(f), 2):
+            yield row, f"{path}:{number}"
+
+def iter_text(path):
+    with open_text(path) as f:
+        yield {"description": f.read(), "id": os.path.basename(path)}, path
+
+def iter_records(source):
+    """(record, origin) pairs from a feed file, a plain-text posting or a directory of either, read lazily"""
+    if os.path.isdir(source):
+        for directory, subdirectories, files in os.walk(source):
+            subdirectories.sort()
+            for name in sorted(files):
+                path = os.path.join(directory, name)
+                if _base_suffix(path) in FEED_SUFFIXES + TEXT_SUFFIXES:
+                    yield from iter_records(path)
+        return
+    if not os.path.exists(source):
+        raise FeedError(f"Could not find job description feed at {source}")
+    suffix = _base_suffix(source)
+    if suffix in (".jsonl", ".ndjson"):
+        yield from iter_jsonl(source)
+    elif suffix == ".csv":
+        yield from iter_csv(source)
+    else:
+        yield from iter_text(source)
+
+def _field(record, names):
+    lowered = {str(key).strip().lower(): value for key, value in record.items()}
+    for name in names:
+        value = lowered.get(name)
+        if value is not None and str(value).strip():
+            return str(value)
+    return ""
+
+def clean_description(text):
+    """Plain text from a posting body: HTML tags and entities removed, whitespace and blank lines collapsed"""
+    text = _ANY_TAG.sub(" ", _TAG.sub("\n", text))
+    text = html.unescape(text).replace("\r\n", "\n").replace("\r", "\n")
+    lines = [" ".join(line.split()) for line in text.split("\n")]
+    return _BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+
+def normalize_posting(record, origin=""):
+    """A feed record as {"id", "title", "company", "description", "source", "key"}, or None without a description"""
+    if isinstance(record, str):
+        record = {"description": record}
+    if not isinstance(record, dict):
+        return None
+    description = clean_description(_field(record, DESCRIPTION_FIELDS))
+    if not description:
+        return None
+    key = jd_key(description)
+    return {
+        "id": _field(record, ID_FIELDS).strip() or key,
+        "title": " ".join(_field(record, TITLE_FIELDS).split()),
+        "company": " ".join(_field(record, COMPANY_FIELDS).split()),
+        "description": description,
+        "source": origin,
+        # Same hash as the requirements cache, so a posting's extracted requirements are shared
+        "key": key,
+    }
+
+def iter_postings(sources, seen=None):
+    """
+    Normalized, deduplicated postings from any number of sources, yielded one at a time. Only the
+    hashes of postings already seen are kept (pass `seen` to share them across calls), so memory
+    doesn't grow with the size of the postings themselves.
+    """
+    seen = set() if seen is None else seen
+    for source in [sources] if isinstance(sources, str) else sources:
+        for record, origin in iter_records(source):
+            posting = normalize_posting(record, origin)
+            if posting is None:
+                feed_postings.inc(result="invalid")
+                continue
+            if posting["key"] in seen:
+                feed_postings.inc(result="duplicate")
+                continue
+            seen.add(posting["key"])
+            feed_postings.inc(result="ingested")
+            yield posting
+
+def process_postings(postings, handle, workers=4, max_pending=None):
+    """
+    Runs handle(posting) on a pool of workers and yields (posting, result, error) as each finishes.
+    At most max_pending postings (default twice the workers) are in flight; the feed isn't read
+    further until one completes, so a slow analysis holds back ingestion instead of buffering it.
+    """
+    max_pending = max_pending or workers * 2
+    pending = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="feed") as executor:
+        def finished(block):
+            done, _ = wait(pending, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+            for future in done:
+                posting = pending.pop(future)
+                error = future.exception()
+                yield posting, None if error else future.result(), error
+
+        postings = iter(postings)
+        while True:
+            # Wait for a free slot before reading the next posting, not after
+            while len(pending) >= max_pending:
+                yield from finished(block=True)
+            posting = next(postings, _END)
+            if posting is _END:
+                break
+            pending[executor.submit(handle, posting)] = posting
+            yield from finished(block=False)
+        while pending:
+            yield from finished(block=True)
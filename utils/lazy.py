@@ -0,0 +1,13 @@
+import importlib
+
+def lazy_function(module_name, attribute):
+    """
+    Returns a stand-in for module_name.attribute that imports the module on first call,
+    so heavy dependencies (langchain, openai) load only when an LLM call is actually made.
+    """
+    def proxy(*args, **kwargs):
+        return getattr(importlib.import_module(module_name), attribute)(*args, **kwargs)
+    proxy.__name__ = attribute
+    proxy.__qualname__ = attribute
+    proxy.__doc__ = f"Lazily imported {module_name}.{attribute}"
+    return proxy
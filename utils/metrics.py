@@ -0,0 +1,271 @@
+import os
+import math
+import time
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds; covers a local file read (~1 ms) through a slow completion (~1 min)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines += [line for key, value in items for line in self._samples(key, value)]
+        return lines
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only go up")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def time(self, **labels):
+        """Context manager observing the duration of its block"""
+        return _Timer(self, labels)
+
+    def count(self, **labels):
+        counts, _ = self._values.get(self._key(labels), ([], 0.0))
+        return sum(counts)
+
+    def _samples(self, key, value):
+        counts, total = value
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            le = (("le", _format_value(bound)),)
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        return lines + [f"{self.name}_sum{labels} {_format_value(total)}", f"{self.name}_count{labels} {cumulative}"]
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram, labels):
+        self.histogram, self.labels = histogram, labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+class Registry:
+    """Named counters and histograms, rendered in the Prometheus text exposition format"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _get(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered with a different type or labels")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get(Counter, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._get(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+    def clear(self):
+        """Resets every value but keeps the metrics registered (used by tests)"""
+        with self._lock:
+            for metric in self._metrics.values():
+                with metric._lock:
+                    metric._values.clear()
+
+registry = Registry()
+
+llm_calls = registry.counter("applygorithminator_llm_calls_total", "LLM calls by chain, model and outcome",
+                             ("chain", "model", "status"))
+llm_latency = registry.histogram("applygorithminator_llm_latency_seconds", "LLM call latency",
+                                 ("chain", "model"))
+llm_tokens = registry.counter("applygorithminator_llm_tokens_total", "Tokens reported by the provider (cached_prompt is a subset of prompt)",
+                              ("chain", "model", "kind"))
+cache_lookups = registry.counter("applygorithminator_cache_lookups_total", "Cache lookups by cache and result",
+                                 ("cache", "result"))
+json_parse_failures = registry.counter("applygorithminator_json_parse_failures_total",
+                                       "LLM output that could not be parsed as JSON, by error", ("error",))
+story_store_latency = registry.histogram("applygorithminator_story_store_seconds",
+                                         "Story file read/write latency", ("operation",))
+sessions_completed = registry.counter("applygorithminator_sessions_completed_total", "Sessions whose log was saved")
+
+# Per-thread list the current session's LLM calls are appended to, see start_call_log()
+_call_logs = threading.local()
+
+def start_call_log():
+    """
+    Starts collecting the LLM calls made on this thread (replacing any earlier log) and returns
+    the list they are appended to, as {"chain", "model", "status", "seconds", "prompt_tokens",
+    "completion_tokens"} dicts, so a session's calls can be stored with its results.
+    """
+    _call_logs.calls = []
+    return _call_logs.calls
+
+def stop_call_log():
+    _call_logs.calls = None
+
+# Per-thread dict of the current session's own figures, see start_session_stats()
+_session_stats = threading.local()
+
+def start_session_stats():
+    """
+    Starts a fresh stats dict for the session running on this thread (replacing any earlier one)
+    and returns it. Modules keep their per-session figures in it under their own key, alongside
+    their process-wide totals, so a session log only reports what that session did.
+    """
+    _session_stats.stats = {}
+    return _session_stats.stats
+
+def session_stats():
+    """The current session's stats dict, or a throwaway one when no session runs on this thread"""
+    stats = getattr(_session_stats, "stats", None)
+    return {} if stats is None else stats
+
+def record_cache(cache, hit):
+    cache_lookups.inc(cache=cache, result="hit" if hit else "miss")
+
+def _usage_tokens(result):
+    """(prompt, completion) tokens from a LangChain message or an OpenAI usage object, or None"""
+    usage = getattr(result, "usage_metadata", None)
+    if isinstance(usage, dict):
+        return usage.get("input_tokens") or 0, usage.get("output_tokens") or 0
+    if isinstance(result, dict):
+        if "prompt_tokens" not in result:
+            return None
+        return result.get("prompt_tokens") or 0, result.get("completion_tokens") or 0
+    if isinstance(getattr(result, "prompt_tokens", None), int):
+        return result.prompt_tokens, result.completion_tokens or 0
+    return None
+
+class _LLMCall:
+    __slots__ = ("chain", "model", "start", "tokens")
+
+    def __init__(self, chain, model):
+        self.chain, self.model = chain, model
+        self.tokens = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def usage(self, result):
+        """Counts the tokens of a finished call; accepts a LangChain message or an OpenAI usage object"""
+        tokens = self.tokens = _usage_tokens(result)
+        if tokens is not None:
+            llm_tokens.inc(tokens[0], chain=self.chain, model=self.model, kind="prompt")
+            llm_tokens.inc(tokens[1], chain=self.chain, model=self.model, kind="completion")
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        status = "error" if exc_type else "ok"
+        llm_latency.observe(seconds, chain=self.chain, model=self.model)
+        llm_calls.inc(chain=self.chain, model=self.model, status=status)
+        calls = getattr(_call_logs, "calls", None)
+        if calls is not None:
+            prompt_tokens, completion_tokens = self.tokens or (None, None)
+            calls.append({"chain": self.chain, "model": self.model, "status": status, "seconds": seconds,
+                          "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens})
+        return False
+
+def llm_call(chain, model):
+    """Context manager counting and timing one LLM call; call .usage(result) inside it to count tokens"""
+    return _LLMCall(chain, model)
+
+def write_textfile(path, reg=None):
+    """Writes the metrics atomically, for node_exporter's textfile collector"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        f.write((reg or registry).render())
+    os.replace(path + ".tmp", path)
+
+def serve_metrics(port, host="127.0.0.1", reg=None):
+    """Serves GET /metrics from a daemon thread; returns the server (call shutdown() to stop it)"""
+    reg = reg or registry
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = reg.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
@@ -0,0 +1,120 @@
+import os
+import io
+import json
+import time
+import pstats
+import cProfile
+import functools
+import threading
+from datetime import datetime
+from contextlib import nullcontext
+
+# Shared do-nothing context manager: when profiling is off, span() costs one global lookup
+_NOOP = nullcontext()
+_tracer = None
+
+class Tracer:
+    """Collects timed spans as Chrome trace "complete" events (viewable in chrome://tracing or Perfetto)"""
+    def __init__(self, cprofile=False):
+        self.events = []
+        self.thread_names = {}
+        self.started = time.perf_counter()
+        self.profiler = cProfile.Profile() if cprofile else None
+        if self.profiler is not None:
+            self.profiler.enable()
+
+    def record(self, name, category, start, end, args):
+        thread = threading.current_thread()
+        self.thread_names.setdefault(thread.ident, thread.name)
+        event = {"name": name, "cat": category, "ph": "X", "pid": os.getpid(), "tid": thread.ident,
+                 "ts": (start - self.started) * 1e6, "dur": (end - start) * 1e6}
+        if args:
+            event["args"] = {key: str(value) for key, value in args.items()}
+        # list.append is atomic, so spans from worker threads need no lock
+        self.events.append(event)
+
+    def trace(self):
+        metadata = [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+                    for tid, name in self.thread_names.items()]
+        return {"traceEvents": metadata + sorted(self.events, key=lambda e: e["ts"]), "displayTimeUnit": "ms"}
+
+    def totals(self):
+        """{span name: (count, total seconds)}, for a quick summary without opening the trace"""
+        totals = {}
+        for event in self.events:
+            count, seconds = totals.get(event["name"], (0, 0.0))
+            totals[event["name"]] = (count + 1, seconds + event["dur"] / 1e6)
+        return totals
+
+class _Span:
+    __slots__ = ("tracer", "name", "category", "args", "start")
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer, self.name, self.category, self.args = tracer, name, category, args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.record(self.name, self.category, self.start, time.perf_counter(), self.args)
+        return False
+
+def span(name, category="app", **args):
+    """Times the enclosed block as a trace span when profiling is enabled; a no-op otherwise"""
+    tracer = _tracer
+    if tracer is None:
+        return _NOOP
+    return _Span(tracer, name, category, args)
+
+def traced(name, category="app"):
+    """Decorator form of span() for whole functions"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer
+            if tracer is None:
+                return fn(*args, **kwargs)
+            with _Span(tracer, name, category, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def enable_profiling(cprofile=False):
+    global _tracer
+    _tracer = Tracer(cprofile)
+    return _tracer
+
+def profiling_enabled():
+    return _tracer is not None
+
+def default_trace_file(name="trace", directory="sessions"):
+    return os.path.join(directory, f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+
+def finish_profiling(trace_file, top=15):
+    """
+    Stops profiling and writes the Chrome trace to trace_file. With cProfile on, also writes
+    trace_file + ".prof" (for snakeviz/pstats). Returns a short text report of the slowest spans.
+    """
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is None:
+        return ""
+    directory = os.path.dirname(trace_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(trace_file, "w") as f:
+        json.dump(tracer.trace(), f)
+    lines = [f"Trace written to {trace_file} (open in https://ui.perfetto.dev or chrome://tracing)"]
+    for name, (count, seconds) in sorted(tracer.totals().items(), key=lambda item: -item[1][1])[:top]:
+        lines.append(f"    {seconds * 1000:10.1f} ms  {count:4d}x  {name}")
+    if tracer.profiler is not None:
+        tracer.profiler.disable()
+        tracer.profiler.dump_stats(trace_file + ".prof")
+        out = io.StringIO()
+        pstats.Stats(tracer.profiler, stream=out).sort_stats("cumulative").print_stats(top)
+        lines.append(f"cProfile stats written to {trace_file}.prof")
+        lines.append(out.getvalue())
+    return "\n".join(lines)
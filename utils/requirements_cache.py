@@ -0,0 +1,85 @@
+import os
+import json
+import hashlib
+import threading
+
+DEFAULT_CACHE_DIR = "resources/cache/jd_requirements"
+# Priority words models use instead of "preferred"
+PREFERRED_WORDS = ("prefer", "nice", "bonus", "plus", "optional", "desired")
+
+def jd_key(job_description):
+    """Hash of the job description with whitespace collapsed, so re-pasted copies of a posting share an entry"""
+    return hashlib.sha256(" ".join(job_description.split()).encode("utf-8")).hexdigest()[:32]
+
+def normalize_requirements(items):
+    """Keeps well-formed {"requirement", "priority"} entries from a stage-one reply, dropping duplicates"""
+    requirements, seen = [], set()
+    for item in items if isinstance(items, list) else []:
+        if isinstance(item, str):
+            item = {"requirement": item}
+        if not isinstance(item, dict) or not str(item.get("requirement", "")).strip():
+            continue
+        text = " ".join(str(item["requirement"]).split())
+        if text.lower() in seen:
+            continue
+        seen.add(text.lower())
+        priority = str(item.get("priority", "required")).lower()
+        preferred = any(word in priority for word in PREFERRED_WORDS)
+        requirements.append({"requirement": text, "priority": "preferred" if preferred else "required"})
+    return requirements
+
+def format_requirements(requirements):
+    """Renders the requirements as the bullet list the matching prompt receives"""
+    return "\n".join(f"- [{r['priority']}] {r['requirement']}" for r in requirements)
+
+def format_numbered_requirements(requirements):
+    """The same list labelled R1, R2, ... for compact replies that cite requirements by ID"""
+    return "\n".join(f"R{i} [{r['priority']}] {r['requirement']}" for i, r in enumerate(requirements, 1))
+
+class RequirementsCache:
+    """
+    Structured requirements extracted from each job description, keyed by jd_key. Entries are
+    kept in memory as well as on disk, so a daemon or service checking many resumes against one
+    posting reads the file once.
+    """
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._memory = {}
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def load(self, job_description):
+        key = jd_key(job_description)
+        with self._lock:
+            if key in self._memory:
+                return self._memory[key]
+        try:
+            with open(self._path(key), "r") as f:
+                requirements = normalize_requirements(json.load(f).get("requirements"))
+        except (OSError, ValueError, AttributeError):
+            return None
+        if not requirements:
+            return None
+        with self._lock:
+            self._memory[key] = requirements
+        return requirements
+
+    def save(self, job_description, requirements):
+        key = jd_key(job_description)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        with open(path + ".tmp", "w") as f:
+            json.dump({"requirements": requirements}, f, indent=2)
+        os.replace(path + ".tmp", path)
+        with self._lock:
+            self._memory[key] = requirements
+
+_default_cache = None
+
+def default_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = RequirementsCache()
+    return _default_cache
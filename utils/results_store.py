@@ -0,0 +1,256 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from utils.config import RESULTS_DB
+from utils.skill_index import canonical_skill
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS postings (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    external_id TEXT,
+    title TEXT,
+    company TEXT,
+    source TEXT,
+    description TEXT,
+    first_seen REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS resumes (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    path TEXT,
+    text TEXT,
+    first_seen REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    posting_id INTEGER NOT NULL REFERENCES postings(id),
+    resume_id INTEGER NOT NULL REFERENCES resumes(id),
+    created_at REAL NOT NULL,
+    mode TEXT,
+    session_file TEXT
+);
+CREATE TABLE IF NOT EXISTS alignment_items (
+    analysis_id INTEGER NOT NULL REFERENCES analyses(id),
+    position INTEGER NOT NULL,
+    item TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS gaps (
+    id INTEGER PRIMARY KEY,
+    analysis_id INTEGER NOT NULL REFERENCES analyses(id),
+    skill TEXT NOT NULL,
+    canonical_skill TEXT NOT NULL,
+    question TEXT,
+    skill_key TEXT
+);
+CREATE TABLE IF NOT EXISTS verdicts (
+    gap_id INTEGER PRIMARY KEY REFERENCES gaps(id),
+    answered INTEGER NOT NULL,
+    confidence REAL,
+    summary TEXT
+);
+CREATE TABLE IF NOT EXISTS call_metrics (
+    analysis_id INTEGER NOT NULL REFERENCES analyses(id),
+    chain TEXT NOT NULL,
+    model TEXT,
+    status TEXT,
+    seconds REAL,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER
+);
+-- Covering indexes for the time-bounded reports: analyses by date, then their gaps by skill
+CREATE INDEX IF NOT EXISTS analyses_created ON analyses(created_at, posting_id);
+CREATE INDEX IF NOT EXISTS analyses_posting ON analyses(posting_id);
+CREATE INDEX IF NOT EXISTS postings_company ON postings(company COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS alignment_analysis ON alignment_items(analysis_id);
+CREATE INDEX IF NOT EXISTS gaps_skill ON gaps(canonical_skill, analysis_id);
+CREATE INDEX IF NOT EXISTS gaps_analysis ON gaps(analysis_id, canonical_skill, skill);
+CREATE INDEX IF NOT EXISTS calls_analysis ON call_metrics(analysis_id);
+CREATE INDEX IF NOT EXISTS calls_chain ON call_metrics(chain, model);
+"""
+
+# Words LLM gap names wrap around the skill itself ("Experience with Kubernetes in production")
+GAP_FILLER_WORDS = {
+    "experience", "experienced", "with", "in", "of", "the", "a", "an", "using", "working", "hands", "on",
+    "knowledge", "understanding", "familiarity", "familiar", "proficiency", "proficient", "expertise",
+    "strong", "solid", "deep", "production", "skills", "skill", "background", "years", "year", "plus",
+}
+
+def text_key(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+def gap_skill_key(skill):
+    """The canonical skill without the wording around it: 'Experience with Kubernetes in production' -> 'kubernetes'"""
+    key = canonical_skill(skill)
+    core = [w for w in key.split() if w not in GAP_FILLER_WORDS and not re.fullmatch(r'\d+\+?', w)]
+    return canonical_skill(" ".join(core)) if core else key
+
+class ResultsStore:
+    """
+    Analyses in an indexed SQLite database: the posting and resume, the alignment items, the gaps
+    with their verdicts, and the LLM calls each analysis made. One connection is shared behind a
+    lock, so CLI runs, feed workers and service sessions can all write to it. A read_only store
+    opens an existing database for queries only.
+    """
+    def __init__(self, path=RESULTS_DB, read_only=False):
+        self.path = path
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        if read_only:
+            self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            return
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._add_skill_keys()
+
+    def _add_skill_keys(self):
+        """Adds and fills gaps.skill_key in databases written before gaps were matched by skill terms"""
+        with self._lock:
+            if "skill_key" not in {row[1] for row in self._conn.execute("PRAGMA table_info(gaps)")}:
+                self._conn.execute("ALTER TABLE gaps ADD COLUMN skill_key TEXT")
+            missing = self._conn.execute("SELECT id, skill FROM gaps WHERE skill_key IS NULL").fetchall()
+            if missing:
+                with self.batch():
+                    self._conn.executemany("UPDATE gaps SET skill_key = ? WHERE id = ?",
+                                           [(gap_skill_key(skill), gap_id) for gap_id, skill in missing])
+            self._conn.execute("CREATE INDEX IF NOT EXISTS gaps_skill_key ON gaps(skill_key, analysis_id)")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @contextmanager
+    def batch(self):
+        """Groups every insert inside the block into one transaction (nested blocks join the outer one)"""
+        with self._lock:
+            if self._batch_depth == 0:
+                self._conn.execute("BEGIN")
+            self._batch_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self._conn.execute("ROLLBACK")
+                raise
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._conn.execute("COMMIT")
+
+    def _upsert(self, table, key, columns, now):
+        row = self._conn.execute(f"SELECT id FROM {table} WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            return row[0]
+        names = ", ".join(("key", "first_seen") + tuple(columns))
+        marks = ", ".join("?" * (len(columns) + 2))
+        return self._conn.execute(f"INSERT INTO {table} ({names}) VALUES ({marks})",
+                                  (key, now) + tuple(columns.values())).lastrowid
+
+    def add_analysis(self, posting, resume_text, alignment, gaps, verdicts=(), calls=(), mode="full",
+                     resume_path=None, session_file=None, created_at=None):
+        """
+        Stores one analysis and returns its id. posting is a jd_feed-style dict ("description" plus
+        optional "key", "id", "title", "company", "source"); verdicts are {"skill", "answered",
+        "confidence", "summary"} dicts matched to the gaps by canonical skill; calls are entries from
+        metrics.start_call_log().
+        """
+        now = time.time() if created_at is None else created_at
+        with self.batch():
+            posting_id = self._upsert("postings", posting.get("key") or text_key(posting["description"]), {
+                "external_id": posting.get("id"),
+                "title": posting.get("title"),
+                "company": posting.get("company"),
+                "source": posting.get("source"),
+                "description": posting["description"],
+            }, now)
+            resume_id = self._upsert("resumes", text_key(resume_text), {"path": resume_path, "text": resume_text}, now)
+            analysis_id = self._conn.execute(
+                "INSERT INTO analyses (posting_id, resume_id, created_at, mode, session_file) VALUES (?, ?, ?, ?, ?)",
+                (posting_id, resume_id, now, mode, session_file)).lastrowid
+            self._conn.executemany("INSERT INTO alignment_items (analysis_id, position, item) VALUES (?, ?, ?)",
+                                   [(analysis_id, i, str(item)) for i, item in enumerate(alignment)])
+            by_skill = {canonical_skill(v.get("skill") or ""): v for v in verdicts}
+            for gap in gaps:
+                skill = gap.get("skill") or "(unknown skill)"
+                gap_id = self._conn.execute(
+                    "INSERT INTO gaps (analysis_id, skill, canonical_skill, question, skill_key) VALUES (?, ?, ?, ?, ?)",
+                    (analysis_id, skill, canonical_skill(skill), gap.get("question"), gap_skill_key(skill))).lastrowid
+                verdict = by_skill.get(canonical_skill(skill))
+                if verdict is not None:
+                    self._conn.execute("INSERT INTO verdicts (gap_id, answered, confidence, summary) VALUES (?, ?, ?, ?)",
+                                       (gap_id, bool(verdict.get("answered")), verdict.get("confidence"),
+                                        verdict.get("summary")))
+            self._conn.executemany(
+                "INSERT INTO call_metrics (analysis_id, chain, model, status, seconds, prompt_tokens, completion_tokens) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(analysis_id, c.get("chain"), c.get("model"), c.get("status"), c.get("seconds"),
+                  c.get("prompt_tokens"), c.get("completion_tokens")) for c in calls])
+        return analysis_id
+
+    def query(self, sql, params=()):
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params).fetchall()]
+
+    def gap_postings(self, skill, since=None, company=None, limit=100):
+        """
+        Postings analyzed since `since` (epoch seconds) that had a gap for `skill` (or a known alias of it).
+        A gap matches when its skill key contains every term of `skill`'s, so "Kubernetes" also finds
+        "Kubernetes experience" and "Experience with Kubernetes in production".
+        """
+        sql = """
+            SELECT p.external_id, p.title, p.company, g.skill, g.question, v.answered, v.confidence,
+                   MAX(a.created_at) AS analyzed_at
+            FROM gaps g
+            JOIN analyses a ON a.id = g.analysis_id
+            JOIN postings p ON p.id = a.posting_id
+            LEFT JOIN verdicts v ON v.gap_id = g.id
+            WHERE a.created_at >= ?"""
+        params = [since or 0]
+        for term in gap_skill_key(skill).split():
+            sql += " AND instr(' ' || g.skill_key || ' ', ?) > 0"
+            params.append(f" {term} ")
+        if company:
+            sql += " AND p.company = ? COLLATE NOCASE"
+            params.append(company)
+        sql += " GROUP BY p.id ORDER BY analyzed_at DESC LIMIT ?"
+        return self.query(sql, params + [limit])
+
+    def top_gaps(self, since=None, limit=20):
+        """
+        The most common gaps since `since`: postings affected and how often stories covered them. Gaps
+        are grouped by skill key and named by their shortest wording.
+        """
+        return self.query("""
+            SELECT skill, postings, answered, avg_confidence FROM (
+                SELECT g.skill AS skill, MIN(LENGTH(g.skill)) AS shortest, COUNT(DISTINCT a.posting_id) AS postings,
+                       SUM(COALESCE(v.answered, 0)) AS answered, AVG(v.confidence) AS avg_confidence
+                FROM gaps g
+                JOIN analyses a ON a.id = g.analysis_id
+                LEFT JOIN verdicts v ON v.gap_id = g.id
+                WHERE a.created_at >= ?
+                GROUP BY g.skill_key)
+            ORDER BY postings DESC, skill
+            LIMIT ?""", (since or 0, limit))
+
+    def call_summary(self, since=None):
+        """LLM calls since `since` by chain and model: count, failures, latency and tokens"""
+        return self.query("""
+            SELECT c.chain, c.model, COUNT(*) AS calls, SUM(c.status = 'error') AS errors,
+                   AVG(c.seconds) AS avg_seconds, MAX(c.seconds) AS max_seconds,
+                   SUM(c.prompt_tokens) AS prompt_tokens, SUM(c.completion_tokens) AS completion_tokens
+            FROM call_metrics c
+            JOIN analyses a ON a.id = c.analysis_id
+            WHERE a.created_at >= ?
+            GROUP BY c.chain, c.model
+            ORDER BY calls DESC""", (since or 0,))
@@ -0,0 +1,110 @@
+import re
+from utils.resume_sections import parse_resume_sections, find_section, section_key_for_heading
+from utils.text_parsing import find_json_span, loads_with_repair
+
+EDIT_OPS_INSTRUCTION = """Respond ONLY with a JSON array of edit operations on the current resume, not the rewritten resume:
+- {"op": "replace", "old": "<text copied exactly from the current resume>", "new": "<replacement text>"}
+- {"op": "insert_after", "after": "<a line copied exactly from the current resume>", "text": "<new line(s)>"}
+- {"op": "delete", "old": "<text copied exactly from the current resume>"}
+- {"op": "append", "section": "<section heading, e.g. Skills>", "text": "<new line(s) for the end of that section>"}
+Each "old" and "after" must match exactly one place in the current resume. Return [] if nothing should change."""
+
+_BULLET = re.compile(r'^(\s*(?:[-*•]|\d+[.)])?\s*)')
+# Fields each operation needs, all non-empty strings except "new" (replacing with "" is a delete)
+_REQUIRED_FIELDS = {"replace": ("old",), "insert_after": ("after", "text"), "delete": ("old",), "append": ("section", "text")}
+
+class EditError(Exception):
+    """An edit operation was malformed or didn't apply cleanly to the resume"""
+
+def _normalize(line):
+    return " ".join(_BULLET.sub("", line, count=1).split()).lower()
+
+def _locate(text, snippet):
+    """(start, end) of the one place `snippet` occurs; falls back to a single whole line that matches ignoring bullets and spacing"""
+    count = text.count(snippet)
+    if count == 1:
+        start = text.index(snippet)
+        return start, start + len(snippet)
+    if count > 1:
+        raise EditError(f"Text occurs {count} times: {snippet[:60]!r}")
+    target = _normalize(snippet)
+    matches, offset = [], 0
+    for line in text.splitlines(keepends=True):
+        if target and _normalize(line) == target:
+            matches.append((offset, offset + len(line.rstrip("\r\n"))))
+        offset += len(line)
+    if len(matches) != 1:
+        raise EditError(f"Text {'not found' if not matches else 'is ambiguous'}: {snippet[:60]!r}")
+    return matches[0]
+
+def _with_prefix(line_text, new_text):
+    """Keeps the replaced line's indentation and bullet when the new text comes without one"""
+    prefix = _BULLET.match(line_text).group(1)
+    if not prefix or _BULLET.match(new_text).group(1).strip():
+        return new_text
+    return prefix + new_text.lstrip()
+
+def validate_edits(edits):
+    if not isinstance(edits, list):
+        raise EditError("Expected a JSON array of edit operations")
+    for edit in edits:
+        if not isinstance(edit, dict) or edit.get("op") not in _REQUIRED_FIELDS:
+            raise EditError(f"Unknown edit operation: {edit!r}")
+        for field in _REQUIRED_FIELDS[edit["op"]]:
+            if not isinstance(edit.get(field), str) or not edit[field].strip():
+                raise EditError(f"{edit['op']} needs a non-empty {field!r}")
+        if edit["op"] == "replace" and not isinstance(edit.get("new", ""), str):
+            raise EditError("replace needs a string 'new'")
+    return edits
+
+def apply_edits(resume_text, edits):
+    """
+    Applies validated edit operations in order and returns (new resume, one note per edit).
+    Raises EditError if any edit doesn't apply cleanly, leaving the caller to fall back.
+    """
+    text = resume_text
+    notes = []
+    for edit in validate_edits(edits):
+        op = edit["op"]
+        if op in ("replace", "delete"):
+            start, end = _locate(text, edit["old"])
+            line_start = text.rfind("\n", 0, start) + 1
+            if op == "delete":
+                # Drop the whole line when the deleted text was the whole line, bullet aside
+                if _normalize(text[line_start:end]) == _normalize(text[start:end]) and text[end:end + 1] in ("\n", ""):
+                    start, end = line_start, min(end + 1, len(text))
+                text = text[:start] + text[end:]
+                notes.append(f"Deleted: {edit['old'].strip()}")
+            else:
+                new = edit.get("new", "")
+                if start == line_start:
+                    new = _with_prefix(text[start:end], new)
+                text = text[:start] + new + text[end:]
+                notes.append(f"Replaced: {edit['old'].strip()} -> {edit.get('new', '').strip()}")
+        elif op == "insert_after":
+            start, end = _locate(text, edit["after"])
+            line_start = text.rfind("\n", 0, start) + 1
+            line_end = text.find("\n", end)
+            line_end = len(text) if line_end == -1 else line_end
+            new_lines = "\n".join(_with_prefix(text[line_start:line_end], line) for line in edit["text"].splitlines())
+            text = text[:line_end] + "\n" + new_lines + text[line_end:]
+            notes.append(f"Inserted: {edit['text'].strip()}")
+        else:
+            key = section_key_for_heading(edit["section"]) or edit["section"].strip().lower()
+            section = find_section(parse_resume_sections(text), key)
+            if section is None:
+                raise EditError(f"No {edit['section']!r} section in the resume")
+            body = text[section["start"]:section["end"]]
+            kept = body.rstrip()
+            last_line = kept.splitlines()[-1] if kept.strip() else ""
+            new_lines = "\n".join(_with_prefix(last_line, line) for line in edit["text"].splitlines())
+            text = text[:section["start"]] + (kept + "\n" if kept.strip() else kept) + new_lines + body[len(kept):] + text[section["end"]:]
+            notes.append(f"Added to {edit['section'].strip()}: {edit['text'].strip()}")
+    return text, notes
+
+def parse_edit_response(response):
+    """The edit list from a model reply (code fences and chatter around it are ignored); raises EditError if there is none"""
+    start = (response or "").find("[")
+    if start == -1:
+        raise EditError("Reply has no JSON array of edit operations")
+    return loads_with_repair(find_json_span(response, start), EditError, "Edit operations are not valid JSON")
@@ -0,0 +1,99 @@
+import re
+
+# Canonical section keys and the headings resumes commonly use for them
+SECTION_ALIASES = {
+    "summary": ["summary", "professional summary", "career summary", "executive summary", "profile",
+                "professional profile", "objective", "about me", "about"],
+    "experience": ["experience", "work experience", "professional experience", "relevant experience",
+                   "work history", "employment history", "professional history", "employment", "career history"],
+    "skills": ["skills", "technical skills", "core skills", "key skills", "core competencies",
+               "competencies", "skills and tools", "technologies", "areas of expertise"],
+    "education": ["education", "education and training", "academic background"],
+    "certifications": ["certifications", "certificates", "licenses and certifications"],
+    "projects": ["projects", "selected projects", "key projects"],
+}
+
+# Which resume section each customization prompt rewrites (see prompts.txt)
+PROMPT_SECTIONS = {2: "summary", 3: "experience", 4: "experience", 5: "skills"}
+
+_ALIAS_TO_KEY = {alias: key for key, aliases in SECTION_ALIASES.items() for alias in aliases}
+
+# Words an ALL-CAPS line must contain to count as a heading outside the alias table; names and
+# employers ("JANE DOE", "AMAZON WEB SERVICES") are often written in capitals too
+HEADING_WORDS = {
+    "summary", "profile", "objective", "experience", "history", "employment", "skills", "competencies",
+    "expertise", "technologies", "education", "training", "certifications", "certificates", "licenses",
+    "projects", "work", "volunteer", "volunteering", "awards", "honors", "achievements", "accomplishments",
+    "publications", "presentations", "patents", "research", "teaching", "languages", "interests", "hobbies",
+    "activities", "leadership", "affiliations", "memberships", "courses", "coursework", "references",
+    "involvement", "information",
+}
+
+# Job titles are also written in capitals inside EXPERIENCE ("SENIOR RESEARCH ENGINEER"); a line naming
+# a role is never taken as an unknown heading
+ROLE_WORDS = {
+    "engineer", "developer", "scientist", "researcher", "manager", "director", "lead", "head", "analyst",
+    "architect", "consultant", "intern", "assistant", "associate", "specialist", "officer", "administrator",
+    "designer", "coordinator", "fellow", "professor", "lecturer", "instructor", "technician", "president",
+    "founder", "owner", "vp", "cto", "ceo",
+}
+
+def _heading_text(line):
+    """Strips markdown/bullet decoration and a trailing colon from a candidate heading line"""
+    text = line.strip().strip('#*_=-').strip()
+    return text[:-1].strip() if text.endswith(':') else text
+
+def section_key_for_heading(line):
+    """Returns the canonical section key if the line is a section heading, else None."""
+    if re.match(r'\s*[-*•]\s', line):
+        return None
+    text = _heading_text(line)
+    if not text or len(text) > 40:
+        return None
+    normalized = re.sub(r'\s+', ' ', text.lower().replace('&', 'and'))
+    if normalized in _ALIAS_TO_KEY:
+        return _ALIAS_TO_KEY[normalized]
+    # Unknown but clearly formatted as a heading, e.g. "VOLUNTEER WORK"
+    words = set(re.findall(r'[a-z]+', normalized))
+    if text.isupper() and len(text.split()) <= 4 and HEADING_WORDS & words and not ROLE_WORDS & words:
+        return normalized.replace(' ', '_')
+    return None
+
+def parse_resume_sections(text):
+    """
+    Splits a plain-text resume into sections. Returns a list of dicts with the canonical
+    `key`, the original `heading` line, the `body` and the character offsets of the body
+    (`start`, `end`). Text before the first heading is returned as a "header" section.
+    Headings outside the alias table only open a section after a blank line.
+    """
+    sections = []
+    offset = 0
+    current = {"key": "header", "heading": None, "start": 0}
+    after_blank = True
+    for line in text.splitlines(keepends=True):
+        key = section_key_for_heading(line)
+        if key and key not in SECTION_ALIASES and not after_blank:
+            key = None
+        after_blank = not line.strip()
+        if key:
+            current["end"] = offset
+            sections.append(current)
+            current = {"key": key, "heading": line.rstrip('\r\n'), "start": offset + len(line)}
+        offset += len(line)
+    current["end"] = len(text)
+    sections.append(current)
+    for section in sections:
+        section["body"] = text[section["start"]:section["end"]]
+    if not sections[0]["body"].strip():
+        sections.pop(0)
+    return sections
+
+def find_section(sections, key):
+    return next((s for s in sections if s["key"] == key), None)
+
+def splice_section(text, section, new_body):
+    """Replaces one section's body in `text`, keeping its heading and the surrounding layout."""
+    body = new_body.strip('\n')
+    trailing = section["body"][len(section["body"].rstrip()):]
+    leading = section["body"][:len(section["body"]) - len(section["body"].lstrip('\n'))]
+    return text[:section["start"]] + leading + body + (trailing or '\n') + text[section["end"]:]
@@ -1,6 +1,8 @@
 import os
 import datetime
 import logging
+from utils.profiling import traced
+from utils.metrics import sessions_completed
 
 class SessionLogger:
     def __init__(self, session_file=None, sessions_dir="sessions"):
@@ -42,8 +44,10 @@ class SessionLogger:
         self.log(job_description + "\n")
         self.log("\n--- Job Fit Analysis ---")
 
+    @traced("session:save")
     def save(self):
         os.makedirs(os.path.dirname(self.session_file), exist_ok=True)
         with open(self.session_file, "w") as f:
             for entry in self.entries:
-                f.write(entry + "\n") 
\ No newline at end of file
+                f.write(entry + "\n")
+        sessions_completed.inc() 
\ No newline at end of file
@@ -0,0 +1,178 @@
+import os
+import re
+import json
+import threading
+
+DEFAULT_INDEX_FILE = "resources/cache/skill_index.json"
+# A gap verdict must be at least this confident before its story link is learned
+LEARN_MIN_CONFIDENCE = 0.85
+# Index files without a version predate links; every alias in them was learned from a verdict
+INDEX_FILE_VERSION = 2
+
+# Common abbreviations and spellings, keyed by normalized text. Multi-word keys match a whole
+# skill; single words are also rewritten inside longer skills ("k8s operations").
+BUILTIN_ALIASES = {
+    "k8s": "kubernetes",
+    "kube": "kubernetes",
+    "js": "javascript",
+    "ecmascript": "javascript",
+    "ts": "typescript",
+    "py": "python",
+    "python3": "python",
+    "golang": "go",
+    "postgres": "postgresql",
+    "psql": "postgresql",
+    "mongo": "mongodb",
+    "node": "nodejs",
+    "node js": "nodejs",
+    "react js": "react",
+    "reactjs": "react",
+    "ci cd": "cicd",
+    "continuous integration": "cicd",
+    "continuous integration continuous delivery": "cicd",
+    "continuous integration continuous deployment": "cicd",
+    "ml": "machine learning",
+    "ai": "artificial intelligence",
+    "nlp": "natural language processing",
+    "gcp": "google cloud",
+    "google cloud platform": "google cloud",
+    "amazon web services": "aws",
+    "ms azure": "azure",
+    "microsoft azure": "azure",
+    "pm": "project management",
+    "mgmt": "management",
+    "eng": "engineering",
+    "dev ops": "devops",
+}
+
+def normalize_skill(skill):
+    """Case- and whitespace-insensitive key so 'Project  management' matches 'project management'"""
+    return " ".join(str(skill).lower().split())
+
+def _strip_acronym(words):
+    """Drops a trailing acronym of the preceding words: 'machine learning ml' -> 'machine learning'"""
+    if len(words) > 2 and words[-1] == "".join(w[0] for w in words[:-1]):
+        return words[:-1]
+    return words
+
+class SkillIndex:
+    """
+    Maps skill names to a canonical key: casing, punctuation, abbreviations and synonyms
+    ("K8s", "kubernetes.") all land on the same key. Added aliases are persisted to a JSON
+    file, and every resolved name is memoized, so repeat lookups are a single dict access.
+
+    Links learned from gap verdicts ("the Docker story answered the Kubernetes gap") are kept
+    apart from aliases: a story covering one question doesn't make two skills the same, so
+    links never change canonical keys, story lookup or compaction.
+    """
+    def __init__(self, index_file=DEFAULT_INDEX_FILE, aliases=BUILTIN_ALIASES):
+        self.index_file = index_file
+        self._aliases = dict(aliases)
+        self._learned = {}
+        self._links = {}
+        self._memo = {}
+        self._lock = threading.Lock()
+        if index_file and os.path.exists(index_file):
+            try:
+                with open(index_file, "r") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = {}
+            if data.get("version"):
+                self._learned = data.get("aliases", {})
+                self._links = data.get("links", {})
+            else:
+                self._links = data.get("aliases", {})
+            self._aliases.update(self._learned)
+
+    def _resolve(self, text):
+        # Follow alias chains (learned aliases may point at another alias), guarding against cycles
+        seen = set()
+        while text in self._aliases and text not in seen:
+            seen.add(text)
+            text = self._aliases[text]
+        return text
+
+    def _key(self, text):
+        words = _strip_acronym(re.sub(r"[^\w+#]+", " ", str(text).lower()).split())
+        phrase = " ".join(words)
+        if phrase in self._aliases:
+            return self._resolve(phrase)
+        return self._resolve(" ".join(self._aliases.get(w, w) for w in words))
+
+    def canonical(self, skill):
+        key = self._memo.get(skill)
+        if key is None:
+            key = self._memo[skill] = self._key(skill)
+        return key
+
+    def same(self, a, b):
+        return self.canonical(a) == self.canonical(b)
+
+    def add_alias(self, alias, skill, save=True):
+        """Records that `alias` means the same as `skill`; returns False if it already did"""
+        alias_key, target = self.canonical(alias), self.canonical(skill)
+        if alias_key == target:
+            return False
+        with self._lock:
+            self._learned[alias_key] = target
+            self._aliases[alias_key] = target
+            self._memo.clear()
+        if save:
+            self.save()
+        return True
+
+    def add_link(self, gap_skill, story_skill, save=True):
+        """Records that a story for `story_skill` answered a gap for `gap_skill`; returns False if already known"""
+        gap_key, story_key = self.canonical(gap_skill), self.canonical(story_skill)
+        if gap_key == story_key or self._links.get(gap_key) == story_key:
+            return False
+        with self._lock:
+            self._links[gap_key] = story_key
+        if save:
+            self.save()
+        return True
+
+    def linked_skill(self, gap_skill):
+        """The canonical skill of the story that last confidently answered this gap skill, or None"""
+        return self._links.get(self.canonical(gap_skill))
+
+    def learn_from_verdict(self, gap_skill, relevant_stories, is_answered, confidence, summary=""):
+        """
+        When a gap was confidently answered and the verdict's summary names exactly one story
+        skill, links the gap skill to it so later checks of that skill send that story first.
+        """
+        if not is_answered or confidence is None or confidence < LEARN_MIN_CONFIDENCE:
+            return False
+        mentioned = f" {self._key(summary)} "
+        skills = {self.canonical(s.get("skill", "")): s.get("skill", "") for s in relevant_stories}
+        skills = {key: skill for key, skill in skills.items() if key and f" {key} " in mentioned}
+        if len(skills) != 1:
+            return False
+        return self.add_link(gap_skill, next(iter(skills.values())))
+
+    def save(self):
+        if not self.index_file:
+            return
+        directory = os.path.dirname(self.index_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            data = {"version": INDEX_FILE_VERSION, "aliases": dict(sorted(self._learned.items())),
+                    "links": dict(sorted(self._links.items()))}
+        tmp_file = self.index_file + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_file, self.index_file)
+
+_default_index = None
+
+def default_index():
+    """The process-wide index backed by DEFAULT_INDEX_FILE, loaded on first use"""
+    global _default_index
+    if _default_index is None:
+        _default_index = SkillIndex()
+    return _default_index
+
+def canonical_skill(skill):
+    return default_index().canonical(skill)
@@ -0,0 +1,63 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="speculation")
+
+class SpeculativeTask:
+    """
+    Runs fn(cancel_event) in the background on the assumption that its result will be
+    wanted. Call take() to use the result or discard() to cancel it and throw it away.
+    """
+    def __init__(self, fn, executor=None):
+        self.cancel_event = threading.Event()
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+        self.future = (executor or _executor).submit(self._run, fn)
+
+    def _run(self, fn):
+        try:
+            return fn(self.cancel_event)
+        finally:
+            self.finished_at = time.perf_counter()
+
+    def take(self):
+        """Waits for and returns the result, plus the seconds of work already done before it was needed."""
+        head_start = time.perf_counter() - self.started_at
+        result = self.future.result()
+        return result, min(head_start, self.finished_at - self.started_at)
+
+    def discard(self, on_done=None):
+        """Cancels the task; on_done(task) runs once it has actually stopped (e.g. to count wasted tokens)."""
+        self.cancel_event.set()
+        self.future.cancel()
+        if on_done is not None:
+            self.future.add_done_callback(lambda _: on_done(self))
+
+class SpeculationStats:
+    """Hit rate, time saved and tokens wasted by speculative execution"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self.wasted_tokens = 0
+
+    def record_hit(self, saved_seconds):
+        with self._lock:
+            self.hits += 1
+            self.saved_seconds += saved_seconds
+
+    def record_miss(self, wasted_tokens):
+        with self._lock:
+            self.misses += 1
+            self.wasted_tokens += wasted_tokens
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def summary(self):
+        return (f"{self.hits}/{self.hits + self.misses} prefetches used ({self.hit_rate:.0%}), "
+                f"~{self.saved_seconds:.1f}s saved, ~{self.wasted_tokens} tokens wasted")
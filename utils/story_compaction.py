@@ -0,0 +1,72 @@
+from difflib import SequenceMatcher
+from utils.skill_index import normalize_skill, default_index
+from utils.token_budget import count_tokens, format_story
+
+# Skills at least this similar (after normalization) are treated as the same skill
+SKILL_MERGE_RATIO = 0.9
+# Stories for the same skill at least this similar are edits of one story; only the latest is kept
+STORY_EDIT_RATIO = 0.8
+
+def skill_key(skill, index=None):
+    """Canonical skill from the skill index, so 'CI/CD', 'ci cd' and 'Continuous Integration' compare equal"""
+    return (index or default_index()).canonical(skill)
+
+def _similar(a, b, ratio):
+    return a == b or SequenceMatcher(None, a, b).ratio() >= ratio
+
+def group_by_skill(stories, index=None):
+    """Groups story indexes whose skills are near-identical; returns {representative key: [indexes]}"""
+    groups = {}
+    for i, story in enumerate(stories):
+        key = skill_key(story.get("skill", ""), index)
+        match = key if key in groups else next((k for k in groups if _similar(k, key, SKILL_MERGE_RATIO)), None)
+        groups.setdefault(match or key, []).append(i)
+    return groups
+
+def _is_edit(older, newer):
+    a, b = normalize_skill(older.get("story", "")), normalize_skill(newer.get("story", ""))
+    return a in b or b in a or _similar(a, b, STORY_EDIT_RATIO)
+
+def compact_stories(stories, index=None):
+    """
+    Returns (kept stories in their original order, {removed index: reason}).
+
+    Within each group of near-identical skills, negatives are collapsed to the latest one
+    (or dropped if the group has a positive story), and a story superseded by a later edit
+    of itself is dropped. Merged stories take the skill name of the group's latest entry.
+    """
+    removed = {}
+    renamed = {}
+    for indexes in group_by_skill(stories, index).values():
+        positives = [i for i in indexes if stories[i].get("has_experience")]
+        negatives = [i for i in indexes if not stories[i].get("has_experience")]
+        for i in (negatives if positives else negatives[:-1]):
+            removed[i] = "repeated negative" if not positives else "negative superseded by a story"
+        for position, i in enumerate(positives):
+            if any(_is_edit(stories[i], stories[later]) for later in positives[position + 1:]):
+                removed[i] = "older version of an edited story"
+        latest_skill = stories[indexes[-1]].get("skill")
+        for i in indexes:
+            if i not in removed and stories[i].get("skill") != latest_skill:
+                renamed[i] = latest_skill
+    kept = [{**story, "skill": renamed[i]} if i in renamed else story
+            for i, story in enumerate(stories) if i not in removed]
+    return kept, removed
+
+def prompt_tokens(stories):
+    """Tokens the stories add to a gap-check prompt (only stories with experience are sent)"""
+    return count_tokens("".join(format_story(s) for s in stories if s.get("has_experience")))
+
+def compaction_report(before, after, removed):
+    reasons = {}
+    for reason in removed.values():
+        reasons[reason] = reasons.get(reason, 0) + 1
+    tokens_before, tokens_after = prompt_tokens(before), prompt_tokens(after)
+    return {
+        "stories_before": len(before),
+        "stories_after": len(after),
+        "removed": reasons,
+        "prompt_tokens_before": tokens_before,
+        "prompt_tokens_after": tokens_after,
+        "prompt_token_reduction": (tokens_before - tokens_after) / tokens_before if tokens_before else 0.0,
+    }
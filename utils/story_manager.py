@@ -1,33 +1,137 @@
 import os
 import json
+import hashlib
+import threading
 from datetime import datetime
+from utils.story_compaction import compact_stories, compaction_report
+from utils.skill_index import default_index
+from utils.profiling import traced
+from utils.metrics import story_store_latency, record_cache
+
+def story_id(story):
+    """Stable id for a story, used to key its vector in the embedding index"""
+    text = f"{story.get('skill', '')}\x1f{story.get('story', '')}\x1f{story.get('timestamp', '')}"
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+def _embedding_text(story):
+    return f"{story.get('skill', '')}\n{story.get('story', '')}"
 
 class StoryManager:
-    def __init__(self, stories_file='resources/stories/stories.json'):
+    def __init__(self, stories_file='resources/stories/stories.json', skill_index=None, embedding_index=None):
         self.stories_file = stories_file
+        self.skill_index = skill_index or default_index()
+        self.embedding_index = embedding_index
         os.makedirs(os.path.dirname(self.stories_file), exist_ok=True)
+        # One manager can be shared by many sessions, so writes are serialized and reads
+        # are served from memory until the file changes on disk
+        self._lock = threading.RLock()
+        self._cache = None
+        self._cache_key = None
+        self._skill_lookup = None
+
+    def _file_key(self):
+        try:
+            stat = os.stat(self.stories_file)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
 
     def load_stories(self):
-        if os.path.exists(self.stories_file):
-            with open(self.stories_file, 'r') as sf:
-                try:
-                    stories_data = json.load(sf)
-                except Exception:
-                    stories_data = {"stories": []}
-        else:
-            stories_data = {"stories": []}
-        return stories_data
+        with self._lock:
+            key = self._file_key()
+            record_cache("story_file", self._cache is not None and key == self._cache_key)
+            if self._cache is None or key != self._cache_key:
+                self._cache = self._read_stories() if key is not None else {"stories": []}
+                self._cache_key = key
+                self._skill_lookup = None
+            # Callers get their own list, so appending to it can't corrupt the cache
+            return {**self._cache, "stories": list(self._cache.get("stories", []))}
+
+    @traced("stories:read")
+    def _read_stories(self):
+        with story_store_latency.time(operation="read"), open(self.stories_file, 'r') as sf:
+            try:
+                return json.load(sf)
+            except Exception:
+                return {"stories": []}
+
+    @traced("stories:write")
+    def _write(self, stories_data):
+        tmp_file = self.stories_file + '.tmp'
+        with story_store_latency.time(operation="write"):
+            with open(tmp_file, 'w') as sf:
+                json.dump(stories_data, sf, indent=2)
+            os.replace(tmp_file, self.stories_file)
+        self._cache = stories_data
+        self._cache_key = self._file_key()
+        self._skill_lookup = None
 
     def save_story(self, skill, story, has_experience=True):
-        stories_data = self.load_stories()
-        stories_data["stories"].append({
-            "skill": skill,
-            "story": story,
-            "has_experience": has_experience,
-            "timestamp": datetime.now().isoformat()
-        })
-        with open(self.stories_file, 'w') as sf:
-            json.dump(stories_data, sf, indent=2)
+        with self._lock:
+            # A repeated "no experience" answer adds nothing, so it isn't stored again
+            if not has_experience and self.has_no_experience(skill):
+                return
+            stories_data = self.load_stories()
+            entry = {
+                "skill": skill,
+                "story": story,
+                "has_experience": has_experience,
+                "timestamp": datetime.now().isoformat()
+            }
+            stories_data["stories"].append(entry)
+            self._write(stories_data)
+            if has_experience and self.embedding_index is not None:
+                self.embedding_index.add(story_id(entry), _embedding_text(entry))
+
+    def _lookup(self):
+        """{canonical skill: latest story} for skills with experience, and the negative-only skills"""
+        with self._lock:
+            self.load_stories()
+            if self._skill_lookup is None:
+                positives, negatives = {}, set()
+                for s in self._cache.get("stories", []):
+                    key = self.skill_index.canonical(s.get("skill", ""))
+                    if s.get("has_experience"):
+                        positives[key] = s
+                    else:
+                        negatives.add(key)
+                self._skill_lookup = (positives, negatives - positives.keys())
+            return self._skill_lookup
+
+    def sync_embedding_index(self, force=False):
+        """Rebuilds the embedding index if its row count no longer matches the stories with experience"""
+        with self._lock:
+            relevant = self.get_relevant_stories()
+            if force or len(self.embedding_index) != len(relevant):
+                self.embedding_index.rebuild((story_id(s), _embedding_text(s)) for s in relevant)
+
+    def similar_stories(self, text, k=5):
+        """The k stories with experience most similar to `text`, by embedding cosine similarity"""
+        by_id = {story_id(s): s for s in self.get_relevant_stories()}
+        # Ask for a few extra rows: vectors of stories removed by hand are skipped
+        matches = self.embedding_index.search(text, k + 5)
+        return [by_id[item_id] for item_id, _ in matches if item_id in by_id][:k]
+
+    def has_no_experience(self, skill):
+        """True if the user said they have no experience with this skill and has no story for it"""
+        return self.skill_index.canonical(skill) in self._lookup()[1]
+
+    def find_story(self, skill):
+        """The latest story for this skill or any of its aliases, or None"""
+        return self._lookup()[0].get(self.skill_index.canonical(skill))
+
+    def compact(self, dry_run=False):
+        """Merges near-identical skills, collapses repeated negatives and drops superseded story
+        versions; returns a report with the prompt-token reduction."""
+        with self._lock:
+            stories_data = self.load_stories()
+            before = stories_data["stories"]
+            after, removed = compact_stories(before, self.skill_index)
+            if after != before and not dry_run:
+                self._write({**stories_data, "stories": after})
+                if self.embedding_index is not None:
+                    self.sync_embedding_index(force=True)
+            return compaction_report(before, after, removed)
 
     def get_relevant_stories(self):
         stories_data = self.load_stories()
@@ -1,6 +1,9 @@
 import re
 import json
 import logging
+from collections import Counter
+from utils.profiling import span
+from utils.metrics import json_parse_failures, session_stats
 
 class FileReadError(Exception):
     pass
@@ -11,12 +14,36 @@ class LLMJsonParseError(Exception):
 class GapsJsonParseError(Exception):
     pass
 
+# How often each JSON parsing path is taken: parsed as-is, fixed locally,
+# fixed by a targeted LLM re-ask, or given up on. Process-wide; the current
+# session's share is in session_parse_stats().
+json_parse_stats = Counter()
+
+_OPEN_QUOTES = {'"': '"“”', '“': '"”“', '„': '"”“',
+                "'": "'’‘", '‘': "'’‘"}
+_STRING_TERMINATORS = ',:}]'
+_PYTHON_LITERALS = {'True': 'true', 'False': 'false', 'None': 'null'}
+
+def session_parse_stats():
+    return session_stats().setdefault("json_parsing", Counter())
+
+def _count_parse(path):
+    json_parse_stats[path] += 1
+    session_parse_stats()[path] += 1
+
 def extract_llm_content(result):
     """Extracts the main content from an LLM result, handling both dict and string."""
     if isinstance(result, dict):
         return result.get('content') or result.get('text') or str(result)
     return str(result)
 
+def finish_reason(result):
+    """Why the model stopped ("stop", "length", ...), from a LangChain message or a result dict; None if unknown"""
+    metadata = result.get('response_metadata') if isinstance(result, dict) else getattr(result, 'response_metadata', None)
+    if isinstance(metadata, dict) and metadata.get('finish_reason'):
+        return metadata['finish_reason']
+    return result.get('finish_reason') if isinstance(result, dict) else None
+
 def extract_alignment_section(output):
     """Extracts the ALIGNMENT section as a list of strings using regex."""
     match = re.search(r'ALIGNMENT:\s*(.*?)(?:GAPS:|$)', output, re.DOTALL | re.IGNORECASE)
@@ -29,16 +56,53 @@ def extract_alignment_section(output):
                 alignment.append(line)
     return alignment
 
-def extract_gaps_json(output):
-    """Extracts the GAPS section as a JSON array using regex."""
-    match = re.search(r'GAPS:\s*(\[.*?\])', output, re.DOTALL | re.IGNORECASE)
+def extract_list_section(output, name):
+    """Extracts a bulleted section such as REMOVED: as a list of strings; it ends at the next ALL-CAPS heading."""
+    match = re.search(rf'^\s*{name}:[ \t]*\n?(.*?)(?=^\s*[A-Z_]+:|\Z)', output, re.DOTALL | re.MULTILINE)
     if not match:
         return []
-    json_str = match.group(1)
-    try:
-        return json.loads(json_str)
-    except Exception as e:
-        raise GapsJsonParseError(f"Failed to parse GAPS JSON: {e}\nRaw: {json_str}")
+    items = []
+    for line in match.group(1).splitlines():
+        line = line.strip().lstrip('-').strip()
+        if line and line.lower() not in ('none', '(none)'):
+            items.append(line)
+    return items
+
+def extract_gaps_json(output, reask=None):
+    """Extracts the GAPS section as a JSON array, repairing malformed JSON where possible."""
+    match = re.search(r'GAPS:\s*(?:```(?:json)?\s*)?(?=\[)', output, re.IGNORECASE)
+    if not match:
+        return []
+    json_str = find_json_span(output, match.end())
+    return loads_with_repair(json_str, GapsJsonParseError, "Failed to parse GAPS JSON", reask=reask)
+
+def extract_compact_job_fit(output, requirements):
+    """
+    Expands a compact job-fit reply ("ALIGNED: R1, R3" and "GAPS: [{"id": "R2", "skill": ..., "q": ...}]")
+    into (alignment, gaps) using the numbered requirements it cites. A gap without a short "skill"
+    falls back to its requirement text. Unknown IDs are ignored.
+    """
+    def requirement(ref):
+        match = re.search(r'(\d+)', str(ref))
+        index = int(match.group(1)) - 1 if match else -1
+        return requirements[index]["requirement"] if 0 <= index < len(requirements) else None
+
+    aligned = re.search(r'ALIGNED:(.*?)(?:GAPS:|$)', output, re.IGNORECASE | re.DOTALL)
+    alignment = []
+    for ref in re.findall(r'R\d+', aligned.group(1) if aligned else ''):
+        text = requirement(ref)
+        if text and text not in alignment:
+            alignment.append(text)
+    gaps = []
+    for item in extract_gaps_json(output):
+        text = requirement(item.get("id")) if isinstance(item, dict) else None
+        if not text or text in alignment:
+            continue
+        skill = item.get("skill")
+        skill = skill.strip() if isinstance(skill, str) and skill.strip() else text
+        if not any(gap["skill"] == skill for gap in gaps):
+            gaps.append({"skill": skill, "question": item.get("q") or item.get("question", "")})
+    return alignment, gaps
 
 def cleanse_llm_response(result):
     """Cleanses the LLM response, handling dict or string and normalizing newlines."""
@@ -58,21 +122,191 @@ def extract_json_from_string(s):
         return content
     return s
 
-def extract_json_from_llm_result(result):
+def extract_json_from_llm_result(result, reask=None):
     """
     Given an LLM result (dict or string), extract and parse the JSON object/array from the content.
+    Malformed JSON is repaired locally first; if that fails and a `reask` callable is given,
+    it is asked once for corrected JSON.
     Returns the parsed JSON (dict or list), or raises LLMJsonParseError if parsing fails.
     """
+    if isinstance(result, dict) and not (result.get('content') or result.get('text')):
+        _count_parse("failed")
+        json_parse_failures.inc(error="LLMJsonParseError")
+        raise LLMJsonParseError(f"LLM result has no content to parse: {result}")
     content = extract_llm_content(result)
     json_str = extract_json_from_string(content)
+    return loads_with_repair(json_str, LLMJsonParseError, "Failed to parse JSON from LLM result", reask=reask)
+
+def find_json_span(text, start):
+    """Returns the JSON array/object starting at `start`, or the rest of the text if it is never closed."""
+    depth = 0
+    in_string = False
+    i = start
+    while i < len(text):
+        ch = text[i]
+        if in_string:
+            if ch == '\\':
+                i += 1
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in '[{':
+            depth += 1
+        elif ch in ']}':
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+        i += 1
+    return text[start:]
+
+def _closes_string(text, i):
+    """A quote only ends a string when followed by a JSON delimiter, so stray inner quotes are kept."""
+    rest = text[i + 1:].lstrip()
+    return not rest or rest[0] in _STRING_TERMINATORS
+
+def _normalize_json_text(text):
+    """
+    Single pass over near-JSON text: converts smart/single quotes to double quotes, escapes
+    raw control characters inside strings, drops trailing commas and maps Python literals.
+    Returns the normalized text, the stack of still-open brackets, and the comma positions
+    (with the bracket stack at each) for truncation recovery.
+    """
+    out = []
+    stack = []
+    commas = []
+    closers = None
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if closers:
+            if ch == '\\' and i + 1 < len(text):
+                nxt = text[i + 1]
+                out.append("'" if nxt == "'" else ch + nxt)
+                i += 2
+                continue
+            if ch in closers and _closes_string(text, i):
+                out.append('"')
+                closers = None
+            elif ch == '"':
+                out.append('\\"')
+            elif ch == '\n':
+                out.append('\\n')
+            elif ch == '\t':
+                out.append('\\t')
+            elif ord(ch) < 0x20:
+                out.append('' if ch == '\r' else f'\\u{ord(ch):04x}')
+            else:
+                out.append(ch)
+        elif ch in _OPEN_QUOTES:
+            closers = _OPEN_QUOTES[ch]
+            out.append('"')
+        elif ch in '[{':
+            stack.append(ch)
+            out.append(ch)
+        elif ch in ']}':
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ',':
+                out.pop()
+                commas.pop()
+            if stack:
+                stack.pop()
+            out.append(ch)
+        elif ch == ',':
+            commas.append((len(out), list(stack)))
+            out.append(ch)
+        else:
+            for literal, replacement in _PYTHON_LITERALS.items():
+                if text.startswith(literal, i) and not (i and text[i - 1].isalnum()) \
+                        and not text[i + len(literal):i + len(literal) + 1].isalnum():
+                    out.append(replacement)
+                    i += len(literal)
+                    break
+            else:
+                out.append(ch)
+                i += 1
+            continue
+        i += 1
+    if closers:
+        out.append('"')
+    return ''.join(out), stack, commas
+
+def _close_brackets(text, stack):
+    text = text.rstrip().rstrip(',').rstrip()
+    return text + ''.join('}' if b == '{' else ']' for b in reversed(stack))
+
+def repair_json(json_str):
+    """
+    Best-effort local repair of LLM-produced JSON: code fences, leading and trailing prose, smart
+    quotes, single quotes, trailing commas, unescaped newlines and a truncated final element.
+    Returns the repaired string; callers still json.loads() it.
+    """
+    text = re.sub(r'^\s*```(?:json)?\s*|\s*```\s*$', '', json_str.strip(), flags=re.IGNORECASE)
+    start = min((i for i in (text.find('['), text.find('{')) if i >= 0), default=-1)
+    if start > 0:
+        text = text[start:]
+    normalized, stack, commas = _normalize_json_text(text)
+    # Prose after the value ("... } Hope this helps!"): cut at the value's end once quotes are normalized
+    span = find_json_span(normalized, 0)
+    if span != normalized:
+        try:
+            json.loads(span)
+            return span
+        except ValueError:
+            pass
+    if not stack:
+        return normalized
+    # Truncated output: close what is open, and only if that doesn't parse cut back to the last
+    # complete element, preferring the outermost level.
+    closed = _close_brackets(normalized, stack)
+    candidates = [closed] + [_close_brackets(normalized[:pos], snapshot)
+                             for pos, snapshot in sorted(commas, key=lambda c: (len(c[1]), -c[0]))]
+    for candidate in candidates:
+        try:
+            json.loads(candidate)
+            return candidate
+        except ValueError:
+            continue
+    return closed
+
+def is_truncated_json(text):
+    """True when a JSON value is cut off before its closing brackets; repairing it drops the cut-off elements"""
+    return bool(_normalize_json_text(text)[1])
+
+def loads_with_repair(json_str, error_cls=LLMJsonParseError, error_message="Failed to parse JSON", reask=None):
+    """
+    Parses JSON, falling back to local repair and then (if given) one `reask(json_str)` call
+    that should return corrected JSON text. Raises `error_cls` if every path fails.
+    """
+    try:
+        result = json.loads(json_str)
+        _count_parse("clean")
+        return result
+    except ValueError as e:
+        error = e
     try:
-        return json.loads(json_str)
-    except Exception as e:
-        raise LLMJsonParseError(f"Failed to parse JSON from LLM result: {e}\nRaw string: {json_str}")
+        result = json.loads(repair_json(json_str))
+        _count_parse("repaired")
+        return result
+    except ValueError as e:
+        error = e
+    if reask is not None:
+        try:
+            fixed = reask(json_str)
+            result = json.loads(repair_json(fixed))
+            _count_parse("reask")
+            return result
+        except Exception as e:
+            logging.warning("JSON re-ask failed", exc_info=True)
+            error = e
+    _count_parse("failed")
+    json_parse_failures.inc(error=error_cls.__name__)
+    raise error_cls(f"{error_message}: {error}\nRaw: {json_str}")
 
 def read_file_or_exit(path, description="file"):
     try:
-        with open(path, "r") as f:
+        with span("read_file", path=path), open(path, "r") as f:
             return f.read()
     except FileNotFoundError as e:
         raise FileReadError(f"Could not find {description} at {path}: {e}")
@@ -0,0 +1,125 @@
+import re
+import logging
+from functools import lru_cache
+from utils.config import OPENAI_MODEL, OPENAI_MAX_TOKENS, OPENAI_CONTEXT_LIMIT
+
+MODEL_CONTEXT_LIMITS = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "gpt-4-turbo": 128000,
+    "gpt-4-turbo-preview": 128000,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+}
+DEFAULT_CONTEXT_LIMIT = 8192
+# Chat formatting (roles, separators) adds a few tokens per message on top of the text itself
+MESSAGE_OVERHEAD_TOKENS = 50
+SUMMARY_TOKENS = 60
+
+def context_limit(model):
+    """Returns the context window for a model, honouring OPENAI_CONTEXT_LIMIT if set."""
+    if OPENAI_CONTEXT_LIMIT:
+        return OPENAI_CONTEXT_LIMIT
+    for name in sorted(MODEL_CONTEXT_LIMITS, key=len, reverse=True):
+        if model.startswith(name):
+            return MODEL_CONTEXT_LIMITS[name]
+    return DEFAULT_CONTEXT_LIMIT
+
+@lru_cache(maxsize=None)
+def _encoder(model):
+    # Imported on first use: tiktoken is slow to import and optional
+    try:
+        import tiktoken
+    except ImportError:  # pragma: no cover
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        # Unknown model or the encoding can't be fetched (offline); fall back to the estimate
+        logging.debug("No tiktoken encoding for %s, estimating token counts", model)
+        return None
+
+def count_tokens(text, model=OPENAI_MODEL):
+    """Counts tokens with tiktoken when available, otherwise estimates ~4 characters per token."""
+    if not text:
+        return 0
+    encoder = _encoder(model)
+    if encoder is None:
+        return len(text) // 4 + 1
+    return len(encoder.encode(text))
+
+def format_story(story):
+    return f"\nSkill: {story.get('skill', '')}\nStory: {story.get('story', '')}\n"
+
+def _words(text):
+    return set(re.findall(r"[a-z0-9+#]+", text.lower()))
+
+def story_priority(story, relevance_words):
+    """Higher is more important: keyword overlap with the task, then recency."""
+    story_words = _words(f"{story.get('skill', '')} {story.get('story', '')}")
+    skill_words = _words(story.get('skill', ''))
+    overlap = len(story_words & relevance_words) + 2 * len(skill_words & relevance_words)
+    return overlap, story.get('timestamp', '')
+
+def summarize_story(story, max_tokens=SUMMARY_TOKENS, model=OPENAI_MODEL):
+    """Cheap local summary: keeps leading sentences of the story up to `max_tokens`."""
+    sentences = re.split(r'(?<=[.!?])\s+', story.get('story', '').strip())
+    summary = ""
+    for sentence in sentences:
+        candidate = f"{summary} {sentence}".strip()
+        if summary and count_tokens(candidate, model) > max_tokens:
+            break
+        summary = candidate
+    if count_tokens(summary, model) > max_tokens:
+        summary = summary[:max_tokens * 4].rsplit(' ', 1)[0] + "..."
+    return {**story, "story": summary}
+
+def output_budget(items, per_item_tokens, base_tokens, cap=OPENAI_MAX_TOKENS):
+    """max_tokens for a reply of `items` bounded-size entries, instead of always reserving the maximum"""
+    return max(1, min(cap, base_tokens + items * per_item_tokens))
+
+def prompt_budget(model, fixed_parts, max_output_tokens=OPENAI_MAX_TOKENS):
+    """
+    Measures each fixed prompt part (resume, job description, instructions, ...) and returns
+    (tokens left for optional context, {part name: tokens}).
+    """
+    part_tokens = {name: count_tokens(text, model) for name, text in fixed_parts.items()}
+    remaining = context_limit(model) - max_output_tokens - MESSAGE_OVERHEAD_TOKENS - sum(part_tokens.values())
+    if remaining < 0:
+        logging.warning("Prompt for %s exceeds its context budget by %d tokens: %s", model, -remaining, part_tokens)
+    return remaining, part_tokens
+
+def pack_stories(stories, model, fixed_parts, max_output_tokens=OPENAI_MAX_TOKENS, relevance_text="", pinned=()):
+    """
+    Fits stories into whatever context is left after the fixed prompt parts. The
+    highest-priority stories are kept whole; lower-priority ones are summarized and, if even
+    the summary doesn't fit, dropped. Stories in `pinned` go before every other story.
+    Returns (stories in original order, report dict).
+    """
+    remaining, part_tokens = prompt_budget(model, fixed_parts, max_output_tokens)
+    report = {"budget": remaining, "parts": part_tokens, "summarized": [], "dropped": []}
+    if not stories:
+        return [], report
+    relevance_words = _words(relevance_text)
+    ranked = sorted(range(len(stories)), key=lambda i: (stories[i] in pinned, story_priority(stories[i], relevance_words)),
+                    reverse=True)
+    packed = {}
+    for i in ranked:
+        story = stories[i]
+        tokens = count_tokens(format_story(story), model)
+        if tokens <= remaining:
+            packed[i] = story
+            remaining -= tokens
+            continue
+        summary = summarize_story(story, model=model)
+        tokens = count_tokens(format_story(summary), model)
+        if tokens <= remaining:
+            packed[i] = summary
+            remaining -= tokens
+            report["summarized"].append(story.get('skill'))
+        else:
+            report["dropped"].append(story.get('skill'))
+    if report["summarized"] or report["dropped"]:
+        logging.info("Trimmed stories to fit %s context (parts: %s): summarized %s, dropped %s",
+                     model, part_tokens, report["summarized"], report["dropped"])
+    return [packed[i] for i in sorted(packed)], report